@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+AMI parser benchmark
+====================
+
+Yozib olingan (yoki sun'iy) AMI event oqimini 4 KB / 64 KB bo'laklarda qayta o'ynab,
+eski (str + split) va yangi (AMIFrameParser) usulni solishtirish.
+Maqsad: 10k+ event/s.
+
+Oqimni yozib olish (Asterisk serverida):
+    ncat 127.0.0.1 5038 < login.txt > ami_stream.txt
+
+Ishlatish:
+    python bench_ami_parser.py                  # sun'iy oqim
+    python bench_ami_parser.py ami_stream.txt   # yozib olingan oqim
+"""
+
+import sys
+import time
+sys.stdout.reconfigure(encoding='utf-8')
+sys.path.insert(0, 'src')
+
+from services.asterisk_service import AMIFrameParser
+
+# 4 KB - oddiy o'qish, 64 KB - event portlashi (bufer to'lib qolganda)
+CHUNK_SIZES = (4096, 65536)
+# CallManager ishlatadigan eventlar
+HANDLED = {"OriginateResponse", "DialEnd", "Hangup"}
+
+
+def synthetic_stream(calls: int) -> bytes:
+    """Parallel qo'ng'iroqlar paytidagi event oqimi (Newchannel/VarSet/... shovqini bilan)"""
+    frames = []
+    for i in range(calls):
+        channel = f"PJSIP/99890{i % 10000:07d}@sarkor-endpoint-{i:08x}"
+        uniqueid = f"1700000000.{i}"
+        common = f"Channel: {channel}\r\nUniqueid: {uniqueid}\r\nLinkedid: {uniqueid}\r\nPrivilege: call,all\r\n"
+        frames.append(f"Event: Newchannel\r\n{common}ChannelState: 0\r\nChannelStateDesc: Down\r\nContext: autodialer-dynamic\r\n")
+        for var in ("AUDIO_FILE", "CALLERID", "DIALSTATUS", "PJSIP_HEADER", "RTPAUDIOQOS"):
+            frames.append(f"Event: VarSet\r\n{common}Variable: {var}\r\nValue: /var/lib/asterisk/sounds/autodialer/{i:08x}\r\n")
+        frames.append(f"Event: Newstate\r\n{common}ChannelState: 5\r\nChannelStateDesc: Ringing\r\n")
+        frames.append(f"Event: DialEnd\r\n{common}DestChannel: {channel}\r\nDialStatus: ANSWER\r\n")
+        frames.append(f"Event: OriginateResponse\r\nActionID: {i}\r\nResponse: Success\r\n{common}Reason: 4\r\n")
+        frames.append(f"Event: Hangup\r\n{common}Cause: 16\r\nCause-txt: Normal Clearing\r\n")
+    return ("\r\n".join(frames) + "\r\n").encode()
+
+
+def chunks(stream: bytes, size: int):
+    return [stream[i:i + size] for i in range(0, len(stream), size)]
+
+
+def legacy_parse(parts) -> int:
+    """Eski usul: str bufer, split("\\r\\n\\r\\n", 1), har bir freym uchun to'liq dict"""
+    buffer = ""
+    count = 0
+    for data in parts:
+        buffer += data.decode('utf-8', errors='ignore')
+        while "\r\n\r\n" in buffer:
+            message, buffer = buffer.split("\r\n\r\n", 1)
+            parsed = {}
+            for line in message.strip().split("\r\n"):
+                if ": " in line:
+                    key, value = line.split(": ", 1)
+                    parsed[key] = value
+            count += 1
+    return count
+
+
+def parser_parse(parts, wanted=None) -> int:
+    parser = AMIFrameParser(wanted=wanted)
+    for data in parts:
+        parser.feed(data)
+    return parser.frames
+
+
+def measure(fn, *args, repeat: int = 3):
+    best = float("inf")
+    result = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "rb") as f:
+            stream = f.read()
+        print(f"Oqim: {sys.argv[1]} ({len(stream) / 1024:.0f} KB)")
+    else:
+        stream = synthetic_stream(5000)
+        print(f"Sun'iy oqim: {len(stream) / 1024:.0f} KB")
+
+    print(f"{'chunk':>6} | {'usul':<24} | {'eventlar':>9} | {'vaqt (ms)':>10} | {'event/s':>12}")
+    print("-" * 73)
+    for size in CHUNK_SIZES:
+        parts = chunks(stream, size)
+        rows = [
+            ("eski (str)", legacy_parse, (parts,)),
+            ("AMIFrameParser", parser_parse, (parts,)),
+            ("AMIFrameParser + filtr", parser_parse, (parts, HANDLED.__contains__)),
+        ]
+        for name, fn, args in rows:
+            elapsed, frames = measure(fn, *args)
+            print(f"{size:>6} | {name:<24} | {frames:>9} | {elapsed * 1000:>10.1f} | {frames / elapsed:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+OrderLedger micro-benchmark
+===========================
+
+_on_new_orders / _on_orders_resolved dagi buyurtmalar hisobini eski (list asosidagi)
+va yangi (OrderLedger) usulda solishtirish. Yangi usulda vaqt buyurtmalar soniga
+chiziqli o'sishi kerak (n ikki baravar -> vaqt ~ikki baravar).
+
+Ishlatish:
+    python bench_order_ledger.py
+"""
+
+import sys
+import time
+sys.stdout.reconfigure(encoding='utf-8')
+sys.path.insert(0, 'src')
+
+from services.order_ledger import OrderLedger
+
+SELLERS = 50
+
+
+def legacy_cycle(n: int):
+    """Eski usul: pending list, {seller: [order_ids]} va list bo'yicha `in`"""
+    pending = list(range(n))
+    communicated = {}
+    for oid in pending:
+        communicated.setdefault(f"+99890{oid % SELLERS:07d}", []).append(oid)
+
+    # _on_new_orders: TOZALASH va xabar berilmaganlarni topish
+    new_order_ids = set(pending)
+    for sp in list(communicated):
+        communicated[sp] = [oid for oid in communicated[sp] if oid in new_order_ids]
+    all_communicated = set()
+    for ids in communicated.values():
+        all_communicated.update(ids)
+    _ = new_order_ids - all_communicated
+
+    # _on_orders_resolved: yarmi hal qilindi (resolved_ids - list)
+    resolved = pending[::2]
+    for sp in list(communicated):
+        communicated[sp] = [oid for oid in communicated[sp] if oid not in resolved]
+        if not communicated[sp]:
+            del communicated[sp]
+    pending = [oid for oid in pending if oid not in resolved]
+
+
+def ledger_cycle(n: int):
+    """Yangi usul: OrderLedger"""
+    ledger = OrderLedger()
+    ledger.set_pending(range(n))
+    for oid in range(n):
+        ledger.mark_communicated(f"+99890{oid % SELLERS:07d}", (oid,))
+
+    # _on_new_orders
+    new_order_ids = set(ledger.pending_view())
+    ledger.retain_communicated(new_order_ids)
+    _ = new_order_ids - ledger.communicated_ids()
+
+    # _on_orders_resolved
+    ledger.resolve(range(0, n, 2))
+
+
+def measure(fn, n: int, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(n)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    sizes = [1000, 2000, 4000, 8000]
+    print(f"{'n':>6} | {'eski (ms)':>10} | {'ledger (ms)':>11} | {'ledger / n (us)':>15}")
+    print("-" * 52)
+    for n in sizes:
+        legacy = measure(legacy_cycle, n)
+        ledger = measure(ledger_cycle, n)
+        print(f"{n:>6} | {legacy * 1000:>10.1f} | {ledger * 1000:>11.2f} | {ledger / n * 1e6:>15.3f}")
+    print("\nledger / n ustuni taxminan o'zgarmas bo'lsa - chiziqli.")
+
+
+if __name__ == "__main__":
+    main()
@@ -14,7 +14,7 @@ from dotenv import load_dotenv
 # .env yuklash
 load_dotenv(Path(__file__).parent / ".env")
 
-from src.services.telegram_service import TelegramService
+from src.services.telegram_service import TelegramService, PRIORITY_BROADCAST
 
 
 async def cleanup_old_messages():
@@ -45,7 +45,8 @@ async def cleanup_old_messages():
 
     for msg_id in message_ids:
         try:
-            success = await telegram.delete_message(msg_id)
+            # Rate limit - TelegramService dispetcheri (token bucket + retry_after)
+            success = await telegram.delete_message(msg_id, priority=PRIORITY_BROADCAST)
             if success:
                 print(f"✅ Xabar #{msg_id} o'chirildi")
                 deleted_count += 1
@@ -56,14 +57,13 @@ async def cleanup_old_messages():
             print(f"❌ Xabar #{msg_id} o'chirishda xato: {e}")
             failed_count += 1
 
-        # Telegram API rate limit uchun kichik pauza
-        await asyncio.sleep(0.5)
-
     print(f"\n📊 Natija:")
     print(f"   ✅ O'chirildi: {deleted_count} ta")
     print(f"   ❌ Muvaffaqiyatsiz: {failed_count} ta")
     print(f"   📝 Jami: {len(message_ids)} ta")
 
+    await telegram.close()
+
 
 if __name__ == "__main__":
     asyncio.run(cleanup_old_messages())
@@ -0,0 +1,86 @@
+"""
+Nonbor webhook uchun buyurtma hodisalarini qayta yuborish scripti
+================================================================
+
+Nonbor serverisiz (offline) webhook rejimini sinash uchun.
+Hodisalarni JSONL fayldan o'qiydi yoki namunaviy stsenariyni yuboradi.
+
+Ishlatish:
+    python replay_order_events.py                      # namunaviy stsenariy
+    python replay_order_events.py events.jsonl         # fayldan
+    python replay_order_events.py events.jsonl 0.5     # hodisalar orasida 0.5s
+
+JSONL qatori (ixtiyoriy "delay" - shu hodisadan oldingi pauza, soniyada):
+    {"event": "order.created", "order": {"id": 1, "state": "CHECKING"}, "delay": 1}
+"""
+
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+
+import aiohttp
+from dotenv import load_dotenv
+
+# .env yuklash
+load_dotenv(Path(__file__).parent / ".env")
+
+WEBHOOK_URL = "http://127.0.0.1:{port}{path}".format(
+    port=os.getenv("NONBOR_WEBHOOK_PORT", "8085"),
+    path=os.getenv("NONBOR_WEBHOOK_PATH", "/nonbor/orders"),
+)
+SECRET = os.getenv("NONBOR_SECRET", "nonbor-secret-key")
+
+# Namunaviy stsenariy: yangi buyurtma -> qabul qilindi, ikkinchisi -> bekor qilindi
+DEMO_EVENTS = [
+    {"event": "order.created", "order": {
+        "id": 900001, "state": "CHECKING", "total_price": 4500000,
+        "business": {"title": "Test biznes", "phone_number": "+998901234567"},
+        "user": {"first_name": "Test", "last_name": "Mijoz", "phone": "+998901112233"},
+        "order_item": [{"product": {"title": "Osh"}, "count": 2}],
+    }},
+    {"event": "order.created", "order": {"id": 900002, "state": "CHECKING"}, "delay": 2},
+    {"event": "order.state_changed", "order": {"id": 900001, "state": "ACCEPTED"}, "delay": 5},
+    {"event": "order.deleted", "order_id": 900002, "delay": 2},
+]
+
+
+def load_events(path: str) -> list:
+    """JSONL fayldan hodisalarni o'qish"""
+    events = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                events.append(json.loads(line))
+    return events
+
+
+async def replay(events: list, default_delay: float = 1.0):
+    """Hodisalarni webhook ga ketma-ket yuborish"""
+    print(f"📡 {len(events)} ta hodisa -> {WEBHOOK_URL}")
+
+    headers = {"X-Nonbor-Secret": SECRET}
+    async with aiohttp.ClientSession() as session:
+        for item in events:
+            item = dict(item)
+            await asyncio.sleep(float(item.pop("delay", default_delay)))
+            try:
+                async with session.post(WEBHOOK_URL, json=item, headers=headers) as resp:
+                    body = await resp.text()
+                    mark = "✅" if resp.status == 200 else "❌"
+                    print(f"{mark} {item.get('event')}: {resp.status} {body}")
+            except aiohttp.ClientError as e:
+                print(f"❌ {item.get('event')}: ulanib bo'lmadi: {e}")
+                return
+
+
+async def main():
+    events = load_events(sys.argv[1]) if len(sys.argv) > 1 else DEMO_EVENTS
+    delay = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+    await replay(events, delay)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -21,8 +21,11 @@ import logging
 import signal
 import sys
 import os
+import time
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Dict
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Optional, Dict, List
 from pathlib import Path
 from collections import OrderedDict
 from dotenv import load_dotenv
@@ -34,16 +37,36 @@ from services import (
     TTSService,
     NonborService,
     NonborPoller,
+    NonborWebhookReceiver,
     AsteriskAMI,
+    AMIPool,
     CallManager,
     CallStatus,
+    DialGovernor,
     TelegramService,
     TelegramNotificationManager,
     TelegramStatsHandler,
     StatsService,
     StatsCallResult,
-    OrderResult
+    OrderResult,
+    OrderEvent,
+    OrderView,
+    DeadlineScheduler,
+    DeadlineHeap,
+    OrderLedger,
+    JsonJournal,
+    PersistenceService,
 )
+from services.telegram_service import PRIORITY_ALERT, PRIORITY_BROADCAST
+from services.asterisk_service import AMI_NODES, DIAL_PRIORITY_REMINDER
+from services.nonbor_service import (
+    NONBOR_POLL_ADAPTIVE,
+    NONBOR_WEBHOOK_ENABLED,
+    NONBOR_WEBHOOK_RECONCILE_INTERVAL,
+)
+
+# Ish vaqti metrikalarini (Telegram va qo'ng'iroq navbatlari) log ga yozish oralig'i (sekundda, 0 - o'chirilgan)
+RUNTIME_STATS_INTERVAL = int(os.getenv("RUNTIME_STATS_INTERVAL", "300"))
 
 # Logging - UTF-8 encoding (Windows cp1251 muammosini hal qilish)
 import sys as _sys
@@ -84,12 +107,11 @@ class BoundedOrderCache:
         """Buyurtmani keshga qo'shish"""
         now = datetime.now()
 
-        # Eskirgan yozuvlarni o'chirish
-        expired_keys = [
-            k for k, v in self.cache.items()
-            if now - v > self.ttl
-        ]
-        for key in expired_keys:
+        # Eskirgan yozuvlarni o'chirish - qo'shilish tartibida, shuning uchun faqat boshidan
+        while self.cache:
+            key, added = next(iter(self.cache.items()))
+            if now - added <= self.ttl:
+                break
             del self.cache[key]
             logger.debug(f"Eskirgan buyurtma o'chirildi: #{key}")
 
@@ -98,7 +120,8 @@ class BoundedOrderCache:
             removed_id = self.cache.popitem(last=False)[0]  # Eng eskisini o'chirish
             logger.debug(f"Kesh to'ldi, eng eski buyurtma o'chirildi: #{removed_id}")
 
-        # Yangi buyurtmani qo'shish
+        # Yangi buyurtmani qo'shish (qayta qo'shilsa oxiriga o'tadi - tartib saqlanadi)
+        self.cache.pop(order_id, None)
         self.cache[order_id] = now
         logger.debug(f"Buyurtma keshga qo'shildi: #{order_id}")
 
@@ -126,21 +149,28 @@ class AutodialerState:
 
     def __init__(self):
         self.pending_orders_count: int = 0
-        self.pending_order_ids: list = []  # Buyurtma IDlari
-        self.last_new_order_time: Optional[datetime] = None
+        # Buyurtmalar daftari: TEKSHIRILMOQDA dagilar va sotuvchilarga xabar berilganlar
+        # (O(1) tekshiruv, order <-> seller teskari indekslari)
+        self.orders = OrderLedger()
         self.call_attempts: int = 0
-        self.call_started: bool = False  # Qo'ng'iroq jarayoni boshlandi
+        # Biror sotuvchining 90s timeri ishlayapti (sotuvchi jarayonlaridan hisoblanadi)
         self.waiting_for_call: bool = False
         self.telegram_notified: bool = False
         self.telegram_notify_time: Optional[datetime] = None
-        self.new_order_ids_for_call: list = []  # Yangi qo'ng'iroq qilish uchun buyurtmalar
+        self.new_order_ids_for_call: set = set()  # Yangi qo'ng'iroq qilish uchun buyurtmalar
         self.order_timestamps: dict = {}  # {order_id: datetime} - Har bir buyurtmaning kelgan vaqti
-        self.last_communicated_orders: dict = {}  # {seller_phone: [order_ids]} - Har bir sotuvchiga oxirgi marta qaysi buyurtmalar haqida xabar berilgan
         self.call_in_progress: bool = False  # Hozir qo'ng'iroq jarayonida
         self.global_retry_count: int = 0  # Global qayta urinish hisoblagichi - barcha buyurtmalar uchun
         self.last_telegram_order_ids: set = set()  # Oxirgi marta Telegram ga yuborilgan buyurtmalar ID lari
-        self.last_180s_check_time: Optional[datetime] = None  # Oxirgi 180s timer tekshiruv vaqti
-        self.last_group_status_check: Optional[datetime] = None  # Guruh xabarlari status tekshiruvi
+
+    @property
+    def pending_order_ids(self) -> list:
+        """TEKSHIRILMOQDA dagi buyurtma ID lari (daftardan nusxa)"""
+        return self.orders.pending_ids
+
+    @pending_order_ids.setter
+    def pending_order_ids(self, order_ids):
+        self.orders.set_pending(order_ids)
 
     def reset(self):
         """Holatni tozalash - FAQAT qo'ng'iroq state, 180s timer uchun pending_order_ids saqlanadi"""
@@ -148,18 +178,14 @@ class AutodialerState:
         # Chunki buyurtmalar hali TEKSHIRILMOQDA da bo'lishi mumkin va 180s timer davom etishi kerak
         # self.pending_orders_count = 0  # DISABLED - 180s timer uchun
         # self.pending_order_ids = []  # DISABLED - 180s timer uchun kerak
-        self.last_new_order_time = None
         self.call_attempts = 0
-        self.call_started = False
-        self.waiting_for_call = False
         self.telegram_notified = False
         # MUHIM: telegram_notify_time va order_timestamps ni SAQLAB qolamiz
         # 180s timer uchun kerak - buyurtmalar TEKSHIRILMOQDA da qolsa davom etadi
         # self.telegram_notify_time = None  # DISABLED - 180s timer davom etishi uchun
-        self.new_order_ids_for_call = []
+        self.new_order_ids_for_call = set()
         # self.order_timestamps = {}  # DISABLED - 180s timer davom etishi uchun
-        # MUHIM: last_communicated_orders ni SAQLAB qolamiz - takroriy qo'ng'iroqlarni oldini olish uchun
-        # self.last_communicated_orders = {}  # DISABLED - eski buyurtmalar haqida qayta xabar bermaslik uchun
+        # MUHIM: orders daftaridagi xabar berilgan buyurtmalar SAQLAB qolinadi - takroriy qo'ng'iroqlarni oldini olish uchun
         self.call_in_progress = False
         self.global_retry_count = 0  # Global retry ni ham reset qilamiz
         # self.last_telegram_order_ids = set()  # DISABLED - 180s timer davom etishi uchun saqlab qolamiz
@@ -169,18 +195,57 @@ class AutodialerState:
         self.pending_orders_count = count
         self.pending_order_ids = order_ids
 
-        # Agar kutish boshlanmagan YOKI (oldingi qo'ng'iroq tugagan bo'lsa VA qo'ng'iroq jarayonida EMAS)
-        # MUHIM: call_in_progress tekshirish - ikki qo'ng'iroq bir vaqtda bo'lmasligi uchun
-        if not self.waiting_for_call or (self.call_started and not self.call_in_progress):
-            self.last_new_order_time = datetime.now()
-            self.waiting_for_call = True
-            self.call_started = False  # Yangi qo'ng'iroq uchun reset
+        # Hech bir sotuvchi 90s timerini kutmayotgan bo'lsa - yangi qo'ng'iroq sikli
+        if not self.waiting_for_call:
             self.call_attempts = 0
             self.telegram_notified = False
             self.global_retry_count = 0  # Yangi buyurtmalar uchun global retry ni reset qilamiz
             # telegram_notify_time ni o'rnatmaymiz - 180s timer avtomatik ishlaydi
 
 
+@dataclass
+class SellerPipeline:
+    """
+    Bitta sotuvchining mustaqil qo'ng'iroq jarayoni
+
+    Har bir sotuvchi o'z 90s timeri, qo'ng'iroq holati, urinishlari va natijasiga ega -
+    sekin yoki javob bermayotgan sotuvchi boshqa sotuvchilarga qo'ng'iroqni kechiktirmaydi.
+    """
+    seller_phone: str
+    seller_name: str = "Noma'lum"
+    business_id: Optional[int] = None
+    language: str = "uz"
+    orders: Dict[int, dict] = field(default_factory=dict)  # {order_id: order_data} - qo'ng'iroq kutayotganlar
+    timer_started: Optional[datetime] = None  # 90s timer boshlangan vaqt (None - timer yo'q)
+    scheduled_for: Optional[datetime] = None  # Rejalashtiruvchiga qo'yilgan timer
+    calling: bool = False
+    attempts: int = 0
+    answered: Optional[bool] = None
+
+    @property
+    def waiting(self) -> bool:
+        return self.timer_started is not None and not self.calling
+
+
+@dataclass
+class GroupMessageChange:
+    """
+    Guruh xabaridagi bitta o'zgarish (yangi xabar yoki status tahriri)
+
+    Lock ichida hisoblanadi, Telegram ga lock siz yuboriladi, natija yana lock ichida qo'llanadi.
+    """
+    order_id: int
+    kind: str  # "send" - yangi xabar, "edit" - mavjud xabarni yangilash
+    chat_id: str
+    biz_id: str
+    status: str  # API dagi status
+    display_status: str  # Guruhda ko'rsatiladigan status (ACCEPT_EXPIRED bo'lishi mumkin)
+    view: OrderView
+    msg_id: Optional[int] = None  # edit - mavjud xabar, send - yuborilgan xabar ID si
+    order_data: Optional[dict] = None
+    ok: bool = False
+
+
 class AutodialerPro:
     """
     Autodialer Pro - Asosiy klass
@@ -240,14 +305,22 @@ class AutodialerPro:
         # Lock - guruh xabarlarini yangilashda race condition oldini olish uchun
         self._group_messages_lock = asyncio.Lock()
 
-        # In-progress set - xabar yuborilayotgan buyurtmalar (duplicate oldini olish)
-        self._sending_order_messages: set = set()
+        # In-progress set - xabari yuborilayotgan/yangilanayotgan buyurtmalar (duplicate oldini olish)
+        self._group_inflight_ids: set = set()
 
         # Guruh xabari kutayotgan yangi buyurtmalar (2s loopda yuboriladi)
         self._pending_group_message_orders: set = set()
 
+        # Guruh xabarlari uchun o'zgargan buyurtmalar (OrderStateTracker hodisalaridan)
+        self._group_dirty_order_ids: set = set()
+        # Fayldan yuklangan tracking birinchi snapshot bilan solishtirildimi
+        self._group_messages_reconciled = False
+
         # Reja buyurtmalar uchun 20 daqiqa oldin eslatma yuborilgan buyurtmalar
         self._planned_reminders_sent: set = set()
+        # Eslatma muddatlari (min-heap): {order_id: eslatma vaqti}, payload - reja vaqti (timestamp)
+        self._planned_reminders = DeadlineHeap()
+        self._planned_reminder_due: Optional[float] = None  # Rejalashtirilgan eng yaqin muddat
 
         # Qo'ng'iroq urinishlari soni - HAR BIR SOTUVCHI UCHUN ALOHIDA
         # {seller_phone: call_attempts}
@@ -257,34 +330,62 @@ class AutodialerPro:
         # {seller_phone: True/False} - javob berdi yoki yo'q
         self._seller_call_answered: Dict[str, bool] = {}
 
-        # Vaqt tekshiruv markerlar - hasattr() dan qochish uchun __init__ da e'lon
-        self._last_notif_check = None
-        self._last_planned_check = None
+        # Muddatlar rejalashtiruvchisi - 90s qo'ng'iroq, 180s Telegram va davriy vazifalar
+        self.scheduler = DeadlineScheduler()
+        self._order_deadlines: Dict[int, datetime] = {}  # order_timestamps ning rejalashtirilgan nusxasi
+        self._telegram_due_ids: set = set()  # 180s muddati kelgan buyurtmalar
+        self._last_telegram_flush: Optional[float] = None
+        # Sotuvchi bo'yicha mustaqil qo'ng'iroq jarayonlari
+        self._seller_pipelines: Dict[str, SellerPipeline] = {}
+        self._order_seller: Dict[int, Optional[str]] = {}  # {order_id: seller_phone} (None - telefon yo'q)
         self._debug_logged = False
 
         # Servislar
         self.tts = TTSService(self.audio_dir, provider="edge")
 
         self.nonbor = NonborService(status_name="CHECKING")
+        # Buyurtma hodisalari - guruh xabarlari faqat o'zgargan buyurtmalar uchun yangilanadi
+        self.nonbor.order_tracker.subscribe(self._on_order_event)
 
         self.nonbor_poller = NonborPoller(
             nonbor_service=self.nonbor,
-            polling_interval=5,
+            # Webhook yoqilganda polling faqat sekin tekshiruv (reconciliation) uchun
+            polling_interval=NONBOR_WEBHOOK_RECONCILE_INTERVAL if NONBOR_WEBHOOK_ENABLED else 5,
             on_new_orders=self._on_new_orders,
-            on_orders_resolved=self._on_orders_resolved
+            on_orders_resolved=self._on_orders_resolved,
+            adaptive=NONBOR_POLL_ADAPTIVE and not NONBOR_WEBHOOK_ENABLED,
+            # Moslashuvchan rejimda: 90s timer yoki qo'ng'iroq jarayonida tez polling
+            is_busy=lambda: self.state.waiting_for_call or self.state.call_in_progress,
         )
-
-        self.ami = AsteriskAMI(
-            host=sip_host,
-            port=ami_port,
-            username=ami_username,
-            password=ami_password
+        # Push/webhook qabul qiluvchi (ixtiyoriy) - poller bilan bir xil callback lar
+        self.nonbor_webhook = (
+            NonborWebhookReceiver(self.nonbor_poller) if NONBOR_WEBHOOK_ENABLED else None
         )
 
+        if AMI_NODES:
+            # Bir nechta Asterisk serveri - qo'ng'iroqlar eng kam yuklangan sog'lom serverga
+            self.ami = AMIPool.from_spec(
+                AMI_NODES,
+                username=ami_username,
+                password=ami_password,
+                default_port=ami_port
+            )
+        else:
+            self.ami = AsteriskAMI(
+                host=sip_host,
+                port=ami_port,
+                username=ami_username,
+                password=ami_password
+            )
+
+        # Trunk cheklovlari: bir vaqtdagi kanallar, CPS, buyurtmalar eslatmalardan oldin
+        self.dial_governor = DialGovernor()
+
         self.call_manager = CallManager(
             ami=self.ami,
             max_attempts=max_call_attempts,
-            retry_interval=retry_interval
+            retry_interval=retry_interval,
+            governor=self.dial_governor
         )
 
         # Statistika servisi
@@ -292,22 +393,34 @@ class AutodialerPro:
         project_root = Path(__file__).parent.parent
         data_dir = str(project_root / "data")
 
+        # Holat fayllari fon da, birlashtirilib yoziladi (event loop disk ni kutmaydi)
+        self.persistence = PersistenceService()
+
         # Guruh xabarlarini saqlash fayli
-        self._group_messages_file = project_root / "data" / "group_order_messages.json"
+        # Har o'zgarish jurnalga bitta qator, vaqti-vaqti bilan snapshotga siqiladi
+        self._group_journal = JsonJournal(
+            project_root / "data" / "group_order_messages.json"
+        )
         self._load_group_messages()
 
         # Reja eslatmalar fayli
         self._planned_reminders_file = project_root / "data" / "planned_reminders.json"
         self._load_planned_reminders()
+        self.persistence.register(
+            "planned_reminders", self._planned_reminders_file,
+            lambda: {"sent": list(self._planned_reminders_sent)}, indent=2
+        )
 
-        self.stats = StatsService(data_dir=data_dir)
+        self.stats = StatsService(data_dir=data_dir, persistence=self.persistence)
 
         if telegram_token:
             self.telegram = TelegramService(
                 bot_token=telegram_token,
                 default_chat_id=telegram_chat_id
             )
-            self.notification_manager = TelegramNotificationManager(self.telegram, data_dir=data_dir)
+            self.notification_manager = TelegramNotificationManager(
+                self.telegram, data_dir=data_dir, persistence=self.persistence
+            )
             self.stats_handler = TelegramStatsHandler(self.telegram, self.stats, self.nonbor)
         else:
             self.telegram = None
@@ -317,35 +430,14 @@ class AutodialerPro:
         logger.info("AutodialerPro yaratildi")
 
     def _load_group_messages(self):
-        """Guruh xabarlarini fayldan yuklash (restart da davom etish uchun)"""
+        """Guruh xabarlarini yuklash: snapshot + jurnalni qayta o'ynash (restart da davom etish uchun)"""
         try:
-            if self._group_messages_file.exists():
-                import json
-                with open(self._group_messages_file, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    # JSON key lar string bo'lgani uchun int ga o'tkazamiz
-                    loaded = {}
-                    for k, v in data.items():
-                        try:
-                            loaded[int(k)] = v
-                        except (ValueError, TypeError):
-                            logger.warning(f"Noto'g'ri guruh xabar kaliti o'tkazib yuborildi: {k}")
-                    self._group_order_messages = loaded
-                    logger.info(f"Guruh xabarlari yuklandi: {len(self._group_order_messages)} ta buyurtma")
+            self._group_order_messages = self._group_journal.load()
+            logger.info(f"Guruh xabarlari yuklandi: {len(self._group_order_messages)} ta buyurtma")
         except Exception as e:
             logger.error(f"Guruh xabarlarini yuklashda xato: {e}")
             self._group_order_messages = {}
-
-    def _save_group_messages(self):
-        """Guruh xabarlarini faylga saqlash"""
-        try:
-            import json
-            # Katalog mavjudligini tekshirish
-            self._group_messages_file.parent.mkdir(exist_ok=True)
-            with open(self._group_messages_file, "w", encoding="utf-8") as f:
-                json.dump(self._group_order_messages, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            logger.error(f"Guruh xabarlarini saqlashda xato: {e}")
+        self._group_journal.attach(lambda: self._group_order_messages)
 
     def _load_planned_reminders(self):
         """Reja eslatmalarini fayldan yuklash"""
@@ -361,74 +453,119 @@ class AutodialerPro:
             self._planned_reminders_sent = set()
 
     def _save_planned_reminders(self):
-        """Reja eslatmalarini faylga saqlash"""
+        """Reja eslatmalarini saqlash (fon yozuvchi orqali)"""
+        self.persistence.mark_dirty("planned_reminders")
+
+    # Eslatma yuborilmaydigan statuslar (faqat qabul qilingan reja buyurtmalar uchun eslatma)
+    _PLANNED_REMINDER_SKIP_STATUSES = frozenset({
+        "CHECKING", "ACCEPT_EXPIRED", "CANCELLED", "CANCELLED_SELLER",
+        "CANCELLED_CLIENT", "CANCELLED_USER", "CANCELLED_ADMIN",
+        "COMPLETED", "DELIVERED", "PAYMENT_EXPIRED",
+    })
+    PLANNED_REMINDER_LEAD = timedelta(minutes=20)  # Reja vaqtidan qancha oldin eslatish
+
+    def _planned_reminder_target(self, order_id: int) -> Optional[datetime]:
+        """Buyurtma uchun eslatma kerak bo'lsa - reja vaqti, aks holda None"""
+        tracked = self._group_order_messages.get(order_id)
+        if not tracked or order_id in self._planned_reminders_sent:
+            return None
+        order_data = tracked.get("order_data", {})
+        if not order_data.get("is_planned"):
+            return None
+        if order_data.get("status", "").upper() in self._PLANNED_REMINDER_SKIP_STATUSES:
+            return None
+        if not (tracked.get("chat_id") and tracked.get("biz_id")):
+            return None
+        raw_dt = order_data.get("planned_datetime_raw", "")
+        if not raw_dt:
+            return None
         try:
-            import json
-            self._planned_reminders_file.parent.mkdir(exist_ok=True)
-            with open(self._planned_reminders_file, "w", encoding="utf-8") as f:
-                json.dump({"sent": list(self._planned_reminders_sent)}, f, indent=2)
-        except Exception as e:
-            logger.error(f"Reja eslatmalarini saqlashda xato: {e}")
+            planned_dt = datetime.fromisoformat(str(raw_dt).replace('Z', '+00:00'))
+        except ValueError:
+            return None
+        if planned_dt.tzinfo is None:
+            planned_dt = planned_dt.replace(tzinfo=timezone(timedelta(hours=5)))  # UZ vaqt zonasi
+        return planned_dt
+
+    def _index_planned_reminder(self, order_id: int):
+        """
+        Guruh tracking o'zgarganda eslatma muddatini yangilash - O(log n)
+
+        Tracking dan chiqqan buyurtma eslatma ro'yxatidan ham o'chiriladi
+        (_planned_reminders_sent cheksiz o'smasligi uchun).
+        """
+        if order_id not in self._group_order_messages and order_id in self._planned_reminders_sent:
+            self._planned_reminders_sent.discard(order_id)
+            self._save_planned_reminders()
+
+        planned_dt = self._planned_reminder_target(order_id) if self.telegram else None
+        if planned_dt is None or planned_dt.timestamp() <= time.time():
+            self._planned_reminders.discard(order_id)
+        else:
+            remind_at = (planned_dt - self.PLANNED_REMINDER_LEAD).timestamp()
+            self._planned_reminders.push(order_id, remind_at, planned_dt.timestamp())
+        self._sync_planned_reminder_deadline()
+
+    def _rebuild_planned_reminders(self):
+        """Ishga tushganda: yuklangan tracking dan eslatma indeksini qurish"""
+        stale = self._planned_reminders_sent - self._group_order_messages.keys()
+        if stale:
+            self._planned_reminders_sent -= stale
+            self._save_planned_reminders()
+        for order_id in list(self._group_order_messages):
+            self._index_planned_reminder(order_id)
+        if self._planned_reminders:
+            logger.info(f"Reja eslatmalari rejalashtirildi: {len(self._planned_reminders)} ta buyurtma")
+
+    def _sync_planned_reminder_deadline(self):
+        """Rejalashtiruvchida eng yaqin eslatma muddatini yangilash (o'zgargan bo'lsa)"""
+        due = self._planned_reminders.peek()
+        if due == self._planned_reminder_due:
+            return
+        self._planned_reminder_due = due
+        if due is None:
+            self.scheduler.cancel("planned_reminders")
+        else:
+            self.scheduler.schedule_in("planned_reminders", due - time.time(), self._check_planned_reminders)
 
     async def _check_planned_reminders(self):
         """
         Reja buyurtmalar uchun 20 daqiqa oldin eslatma yuborish VA QO'NG'IROQ QILISH.
         Qabul qilingan (ACCEPTED/READY) reja buyurtmalarning vaqti yaqinlashganda
         biznes guruhiga eslatma xabar yuboriladi va sotuvchiga qo'ng'iroq qilinadi.
+
+        Eng yaqin eslatma muddatida rejalashtiruvchi tomonidan chaqiriladi -
+        faqat muddati kelgan buyurtmalar heap dan olinadi (to'liq skanerlash yo'q).
+        Bir vaqtda muddati kelganlar biznes bo'yicha bitta xabarga birlashtiriladi,
+        muddatidan oldin hech qaysi eslatma yuborilmaydi.
         """
+        self._planned_reminder_due = None
         try:
-            now = datetime.now(timezone(timedelta(hours=5)))  # UZ vaqt zonasi
+            now_ts = time.time()
 
             # Biznes bo'yicha reja buyurtmalarni yig'ish
             # {biz_id: {"chat_id": str, "orders": [...], "biz_title": str}}
             biz_planned: Dict[str, dict] = {}
 
-            for order_id, tracked in self._group_order_messages.items():
-                order_data = tracked.get("order_data", {})
-
-                # Faqat reja buyurtmalar
-                if not order_data.get("is_planned"):
-                    continue
-
-                # Faqat qabul qilingan buyurtmalar (CHECKING emas)
-                status = order_data.get("status", "").upper()
-                if status in ("CHECKING", "ACCEPT_EXPIRED", "CANCELLED", "CANCELLED_SELLER",
-                              "CANCELLED_CLIENT", "CANCELLED_USER", "CANCELLED_ADMIN",
-                              "COMPLETED", "DELIVERED", "PAYMENT_EXPIRED"):
-                    continue
-
-                # Allaqachon eslatma yuborilgan
-                if order_id in self._planned_reminders_sent:
-                    continue
-
-                # planned_datetime_raw ni tekshirish
-                raw_dt = order_data.get("planned_datetime_raw", "")
-                if not raw_dt:
-                    continue
-
-                try:
-                    planned_dt = datetime.fromisoformat(str(raw_dt).replace('Z', '+00:00'))
-                    minutes_left = (planned_dt - now).total_seconds() / 60
-
-                    # 20 daqiqa yoki kamroq qolgan bo'lsa (lekin o'tmagan bo'lsa)
-                    if 0 <= minutes_left <= 20:
-                        biz_id = tracked.get("biz_id", "")
-                        chat_id = tracked.get("chat_id", "")
-                        if chat_id and biz_id:
-                            if biz_id not in biz_planned:
-                                biz_planned[biz_id] = {
-                                    "chat_id": chat_id,
-                                    "orders": [],
-                                    "biz_title": order_data.get("seller_name", ""),
-                                }
-                            biz_planned[biz_id]["orders"].append({
-                                "order_id": order_id,
-                                "order_number": order_data.get("order_number", ""),
-                                "delivery_time": order_data.get("delivery_time", ""),
-                                "product_name": order_data.get("product_name", ""),
-                            })
-                except Exception:
+            for order_id, _, planned_ts in self._planned_reminders.pop_due(now_ts):
+                tracked = self._group_order_messages.get(order_id)
+                # Reja vaqti o'tib ketgan - eslatma endi kerak emas
+                if tracked is None or planned_ts < now_ts:
                     continue
+                order_data = tracked.get("order_data", {})
+                biz_id = tracked.get("biz_id", "")
+                if biz_id not in biz_planned:
+                    biz_planned[biz_id] = {
+                        "chat_id": tracked.get("chat_id", ""),
+                        "orders": [],
+                        "biz_title": order_data.get("seller_name", ""),
+                    }
+                biz_planned[biz_id]["orders"].append({
+                    "order_id": order_id,
+                    "order_number": order_data.get("order_number", ""),
+                    "delivery_time": order_data.get("delivery_time", ""),
+                    "product_name": order_data.get("product_name", ""),
+                })
 
             # Har bir biznesga eslatma yuborish + qo'ng'iroq qilish
             for biz_id, biz_data in biz_planned.items():
@@ -453,7 +590,7 @@ class AutodialerPro:
 
                 try:
                     await self.telegram.send_message(
-                        text=text, chat_id=chat_id, parse_mode="HTML"
+                        text=text, chat_id=chat_id, parse_mode="HTML", priority=PRIORITY_ALERT
                     )
                     logger.info(f"Reja eslatma yuborildi: chat={chat_id}, {count} ta buyurtma")
                 except Exception as e:
@@ -471,27 +608,27 @@ class AutodialerPro:
 
         except Exception as e:
             logger.error(f"Reja eslatma tekshirish xatosi: {e}")
+        finally:
+            self._sync_planned_reminder_deadline()
 
     async def _planned_reminder_call(self, biz_id: str, order_count: int):
         """Reja eslatma uchun qo'ng'iroq (alohida task da ishlaydi - main loop bloklanmaydi)"""
         try:
             seller_phone = None
             seller_lang = "uz"  # Default til
-            businesses = await self.nonbor.get_businesses()
-            if businesses:
-                for b in businesses:
-                    if str(b.get("id")) == str(biz_id):
-                        seller_phone = b.get("phone_number", "")
-                        # Biznes egasi tilini olish
-                        raw_lang = (
-                            b.get("language") or
-                            b.get("owner_language") or
-                            b.get("tg_language") or
-                            b.get("language_code") or
-                            "uz"
-                        )
-                        seller_lang = str(raw_lang).lower()[:2]
-                        break
+            await self.nonbor.businesses.ensure_fresh()
+            b = self.nonbor.businesses.get(str(biz_id))
+            if b:
+                seller_phone = b.get("phone_number", "")
+                # Biznes egasi tilini olish
+                raw_lang = (
+                    b.get("language") or
+                    b.get("owner_language") or
+                    b.get("tg_language") or
+                    b.get("language_code") or
+                    "uz"
+                )
+                seller_lang = str(raw_lang).lower()[:2]
 
             if not seller_phone:
                 logger.warning(f"Reja eslatma: biz #{biz_id} telefon raqami topilmadi")
@@ -522,6 +659,7 @@ class AutodialerPro:
             result = await self.call_manager.make_call_with_retry(
                 phone_number=seller_phone,
                 audio_file=str(audio_path),
+                priority=DIAL_PRIORITY_REMINDER,
             )
             if result and result.is_answered:
                 logger.info(f"Reja eslatma qo'ng'iroq: {seller_phone} - JAVOB BERILDI, til: {seller_lang}")
@@ -538,6 +676,8 @@ class AutodialerPro:
         logger.info("=" * 60)
 
         self._running = True
+        await self.persistence.start()
+        await self._group_journal.start()
 
         # Signal handlers (faqat Unix uchun, Windows da ishlamaydi)
         if sys.platform != "win32":
@@ -575,6 +715,8 @@ class AutodialerPro:
         # Nonbor API polling boshlash
         logger.info("Nonbor API polling boshlash...")
         await self.nonbor_poller.start()
+        if self.nonbor_webhook:
+            await self.nonbor_webhook.start()
 
         # Stats handler polling boshlash
         if self.stats_handler:
@@ -606,8 +748,11 @@ class AutodialerPro:
         # Tasks ni bekor qilish
         for task in self._tasks:
             task.cancel()
+        await self.scheduler.stop()
 
         # Servislarni yopish
+        if self.nonbor_webhook:
+            await self.nonbor_webhook.stop()
         await self.nonbor_poller.stop()
         if self.stats_handler:
             await self.stats_handler.stop_polling()
@@ -616,6 +761,8 @@ class AutodialerPro:
         await self.nonbor.close()
         if self.telegram:
             await self.telegram.close()
+        await self._group_journal.close()
+        await self.persistence.stop()
 
         logger.info("Autodialer to'xtatildi")
 
@@ -692,16 +839,10 @@ class AutodialerPro:
             if time_since_oldest >= self.wait_before_call:
                 # 90s o'tgan - darhol qo'ng'iroq qilish
                 logger.info(f"Sinxronizatsiya: {time_since_oldest:.0f}s > {self.wait_before_call}s - DARHOL qo'ng'iroq qilinadi")
-                self.state.last_new_order_time = oldest_time
-                self.state.waiting_for_call = True
-                self.state.call_started = False  # call_started=False → qo'ng'iroq qilinadi
             else:
                 # 90s hali o'tmagan - timer davom etadi
                 remaining = self.wait_before_call - time_since_oldest
                 logger.info(f"Sinxronizatsiya: {time_since_oldest:.0f}s < {self.wait_before_call}s - {remaining:.0f}s kutiladi")
-                self.state.last_new_order_time = oldest_time
-                self.state.waiting_for_call = True
-                self.state.call_started = False  # call_started=False → timer tugaganda qo'ng'iroq qilinadi
 
             # MUHIM: Agar Telegram xabarlari mavjud bo'lsa, telegram_notified = True qilish
             # Bu autodialer qayta ishga tushganda kerak - oldingi Telegram xabarlari saqlanadi
@@ -716,118 +857,225 @@ class AutodialerPro:
 
 
     async def _main_loop(self):
-        """Asosiy ishlash sikli"""
-        while self._running:
+        """Asosiy ishlash sikli - eng yaqin muddatgacha uxlaydi"""
+        self.scheduler.every("group_status", 5, self._check_group_status)  # Server yuklamasini kamaytirish
+        self.scheduler.every("notifications", 30, self._check_scheduled_notifications)
+        if RUNTIME_STATS_INTERVAL > 0:
+            self.scheduler.every("runtime_stats", RUNTIME_STATS_INTERVAL, self._log_runtime_stats, run_now=False)
+        self._rebuild_planned_reminders()
+        try:
+            # Ishga tushganda topilgan buyurtmalarni sotuvchi jarayonlariga taqsimlash
+            await self._route_pending_orders()
+        except Exception as e:
+            logger.error(f"Buyurtmalarni sotuvchilarga taqsimlashda xato: {e}")
+        self._sync_deadlines()
+        await self.scheduler.run()
+
+    def _sync_deadlines(self):
+        """
+        order_timestamps (180s) va qo'ng'iroq holatini (90s) rejalashtiruvchi bilan moslashtirish
+
+        Holat o'zgaradigan joylardan keyin chaqiriladi (yangi/hal qilingan buyurtmalar,
+        qo'ng'iroq tugashi) - har soniyada skanerlash o'rniga.
+        """
+        now_dt = datetime.now()
+        now = self.scheduler.now()
+        timestamps = self.state.order_timestamps
+
+        # Chiqib ketgan buyurtmalar - muddatlarini bekor qilish
+        for order_id in [oid for oid in self._order_deadlines if oid not in timestamps]:
+            del self._order_deadlines[order_id]
+            self.scheduler.cancel(("telegram", order_id))
+            self._telegram_due_ids.discard(order_id)
+
+        # Yangi buyurtmalar - 180s Telegram muddatini ro'yxatdan o'tkazish
+        for order_id, timestamp in timestamps.items():
+            if self._order_deadlines.get(order_id) == timestamp:
+                continue
+            self._order_deadlines[order_id] = timestamp
+            self._telegram_due_ids.discard(order_id)
+            delay = (timestamp - now_dt).total_seconds() + self.telegram_alert_time
+            self.scheduler.schedule_at(
+                ("telegram", order_id), now + delay, partial(self._on_telegram_deadline, order_id)
+            )
+
+    @staticmethod
+    def _format_seller_phone(seller_phone: Optional[str]) -> Optional[str]:
+        """Sotuvchi telefonini +998XXXXXXXXX formatiga keltirish (topilmasa None)"""
+        if not seller_phone or seller_phone == "Noma'lum":
+            return None
+        phone_digits = ''.join(filter(str.isdigit, seller_phone))
+        if len(phone_digits) < 9:
+            return None
+        if len(phone_digits) == 9:
+            return f"+998{phone_digits}"
+        return f"+{phone_digits}"
+
+    def _is_order_awaiting_call(self, order_id: int) -> bool:
+        """Buyurtma o'z sotuvchisining 90s timeri yoki qo'ng'irog'ini kutayaptimi"""
+        pipeline = self._seller_pipelines.get(self._order_seller.get(order_id))
+        return pipeline is not None and order_id in pipeline.orders
+
+    def _refresh_call_flags(self):
+        """Umumiy holat bayroqlarini sotuvchi jarayonlaridan hisoblash (poller, guruh xabarlari uchun)"""
+        pipelines = self._seller_pipelines.values()
+        self.state.call_in_progress = any(p.calling for p in pipelines)
+        self.state.waiting_for_call = any(p.waiting for p in pipelines)
+
+    async def _route_pending_orders(self):
+        """
+        TEKSHIRILMOQDA dagi buyurtmalarni sotuvchi jarayonlariga taqsimlash
+
+        Yangi buyurtma o'z sotuvchisining jarayoniga qo'shiladi. Jarayon bo'sh bo'lsa
+        90s timeri shu buyurtma vaqtidan boshlanadi, timer ishlayotgan bo'lsa buyurtma
+        to'plamga qo'shiladi, qo'ng'iroq jarayonida bo'lsa keyingi qo'ng'iroqqa qoladi.
+        """
+        pending_ids = set(self.state.orders.pending_view())
+        tracker = self.nonbor.order_tracker
+        if tracker.initialized:
+            # Hal qilingan, lekin pending_order_ids da qolgan buyurtmalar (masalan, hammasi tekshirilganda)
+            pending_ids &= tracker.ids_in_state(self.nonbor.status_name)
+
+        # TEKSHIRILMOQDA dan chiqqanlarni jarayonlardan olib tashlash
+        for order_id in [oid for oid in self._order_seller if oid not in pending_ids]:
+            phone = self._order_seller.pop(order_id)
+            pipeline = self._seller_pipelines.get(phone) if phone else None
+            if pipeline:
+                pipeline.orders.pop(order_id, None)
+
+        new_ids = [
+            oid for oid in self.state.pending_order_ids
+            if oid in pending_ids and oid not in self._order_seller
+        ]
+        if new_ids and not self.skip_asterisk:
             try:
-                await self._check_and_process()
-                await asyncio.sleep(1)
-            except asyncio.CancelledError:
-                break
+                orders_full_data = await self.nonbor.get_orders_full_data(new_ids)
             except Exception as e:
-                logger.error(f"Main loop xatosi: {e}")
-                await asyncio.sleep(5)
+                logger.error(f"Buyurtmalar ma'lumotini olishda xato: {e}")
+                orders_full_data = {}
 
-    async def _check_and_process(self):
-        """Holatni tekshirish va qayta ishlash"""
-        now = datetime.now()
+            now = datetime.now()
+            for order_id in new_ids:
+                order_data = orders_full_data.get(order_id)
+                if not order_data:
+                    # Keyingi safar qayta urinish
+                    logger.warning(f"Buyurtma #{order_id}: ma'lumot topilmadi, qo'ng'iroq o'tkazib yuborildi")
+                    continue
+                seller_name = order_data.get("seller_name", "")
+                seller_phone = self._format_seller_phone(order_data.get("seller_phone"))
+                self._order_seller[order_id] = seller_phone
+                logger.info(f"Buyurtma #{order_id}: seller_name='{seller_name}', seller_phone='{seller_phone}'")
 
-        # 90s TIMER: Qo'ng'iroq qilish
-        if self.state.waiting_for_call and self.state.last_new_order_time:
-            elapsed = (now - self.state.last_new_order_time).total_seconds()
-
-            # Qo'ng'iroq qilish vaqti (faqat bir marta chaqiriladi - ichida barcha urinishlar)
-            if elapsed >= self.wait_before_call and not self.state.call_started:
-                self.state.call_started = True
-                await self._make_call()
-
-        # 180s TIMER: Telegram yuborish - waiting_for_call ga BOG'LIQ EMAS
-        # MUHIM: Har 10 sekundda bir marta tekshirish (spam bo'lmaslik uchun)
-        if len(self.state.order_timestamps) > 0:
-            # Oxirgi tekshiruvdan 10 sekund o'tdimi?
-            should_check = False
-            if self.state.last_180s_check_time is None:
-                should_check = True
-            else:
-                time_since_last_check = (now - self.state.last_180s_check_time).total_seconds()
-                if time_since_last_check >= 10:
-                    should_check = True
-
-            if should_check:
-                self.state.last_180s_check_time = now
-
-                # Eng eski buyurtmaning vaqtini topish
-                oldest_order_time = min(self.state.order_timestamps.values())
-                time_since_oldest = (now - oldest_order_time).total_seconds()
-
-                # Agar eng eski buyurtma telegram_alert_time+ bo'lsa
-                if time_since_oldest >= self.telegram_alert_time:
-                    # Tekshirish: telegram_alert_time+ buyurtmalar bor va ular hali yuborilmagan
-                    old_order_ids = []
-                    for order_id, timestamp in self.state.order_timestamps.items():
-                        if (now - timestamp).total_seconds() >= self.telegram_alert_time:
-                            old_order_ids.append(order_id)
-
-                    # Agar 180s+ buyurtmalar bor
-                    if old_order_ids:
-                        current_old_ids = set(old_order_ids)
-                        # MUHIM FIX: Yangi 180s+ buyurtmalar bormi tekshirish
-                        # (ya'ni hali Telegram'da yo'q buyurtmalar)
-                        new_old_ids = current_old_ids - self.state.last_telegram_order_ids
-                        if new_old_ids:
-                            logger.info(f"{self.telegram_alert_time}s timer: {len(new_old_ids)} ta YANGI buyurtma {self.telegram_alert_time}s+ eski, Telegram yuborilmoqda")
-                            await self._send_telegram_for_remaining()
-
-        # GURUH XABARLARI: Status o'zgarishlarini kuzatish (har 2 soniyada)
+                if not seller_phone:
+                    logger.warning(f"Buyurtma #{order_id}: sotuvchi telefoni topilmadi, qo'ng'iroq o'tkazib yuborildi")
+                    continue
+
+                # MUHIM: Agar bu buyurtma haqida sotuvchiga allaqachon xabar berilgan bo'lsa, uni o'tkazib yuboramiz
+                if self.state.orders.is_communicated(order_id, seller_phone):
+                    logger.debug(f"Buyurtma #{order_id} sotuvchi {seller_phone} ga allaqachon xabar berilgan, o'tkazib yuborildi")
+                    continue
+
+                pipeline = self._seller_pipelines.get(seller_phone)
+                if pipeline is None:
+                    pipeline = self._seller_pipelines[seller_phone] = SellerPipeline(
+                        seller_phone=seller_phone,
+                        seller_name=order_data.get("seller_name", "Noma'lum"),
+                        business_id=order_data.get("business_id"),
+                        language=(order_data.get("seller_language") or "uz").lower(),
+                    )
+                pipeline.orders[order_id] = order_data
+
+                order_time = self.state.order_timestamps.get(order_id, now)
+                if pipeline.calling:
+                    logger.info(f"{pipeline.seller_name}: qo'ng'iroq jarayonida, buyurtma #{order_id} keyingi qo'ng'iroqqa qoldi")
+                elif pipeline.timer_started is None or order_time < pipeline.timer_started:
+                    if pipeline.timer_started is None:
+                        logger.info(f"{pipeline.seller_name} ({seller_phone}): {self.wait_before_call}s timer boshlandi")
+                    pipeline.timer_started = order_time
+
+        self._sync_seller_deadlines()
+
+    def _sync_seller_deadlines(self):
+        """Har bir sotuvchi jarayonining 90s qo'ng'iroq muddatini rejalashtiruvchiga qo'yish"""
+        for phone, pipeline in list(self._seller_pipelines.items()):
+            key = ("call", phone)
+            if pipeline.calling:
+                continue
+            if not pipeline.orders:
+                # Qo'ng'iroq qilinadigan buyurtma qolmadi - jarayonni yopish
+                self.scheduler.cancel(key)
+                del self._seller_pipelines[phone]
+                continue
+            if pipeline.timer_started is None:
+                pipeline.timer_started = datetime.now()
+            if key in self.scheduler and pipeline.scheduled_for == pipeline.timer_started:
+                continue
+            pipeline.scheduled_for = pipeline.timer_started
+            delay = (pipeline.timer_started - datetime.now()).total_seconds() + self.wait_before_call
+            self.scheduler.schedule_in(key, delay, partial(self._run_seller_pipeline, phone))
+
+        self._refresh_call_flags()
+
+    async def _on_telegram_deadline(self, order_id: int):
+        """180s TIMER: buyurtma muddati keldi - Telegram yuborishni navbatga qo'yish"""
+        if order_id not in self.state.order_timestamps:
+            return
+        self._telegram_due_ids.add(order_id)
+        if "telegram_flush" in self.scheduler or self.scheduler.is_active("telegram_flush"):
+            return
+        self._schedule_telegram_flush()
+
+    def _schedule_telegram_flush(self):
+        # MUHIM: Ketma-ket yuborishlar orasida kamida 10 sekund (spam bo'lmaslik uchun)
+        now = self.scheduler.now()
+        when = now if self._last_telegram_flush is None else max(now, self._last_telegram_flush + 10)
+        self.scheduler.schedule_at("telegram_flush", when, self._flush_telegram_deadlines)
+
+    async def _flush_telegram_deadlines(self):
+        """180s TIMER: Telegram yuborish - waiting_for_call ga BOG'LIQ EMAS"""
+        self._last_telegram_flush = self.scheduler.now()
+        self._telegram_due_ids &= self.state.order_timestamps.keys()
+
+        # MUHIM FIX: Yangi 180s+ buyurtmalar bormi tekshirish
+        # (ya'ni hali Telegram'da yo'q buyurtmalar)
+        new_old_ids = self._telegram_due_ids - self.state.last_telegram_order_ids
+        if new_old_ids:
+            logger.info(f"{self.telegram_alert_time}s timer: {len(new_old_ids)} ta YANGI buyurtma {self.telegram_alert_time}s+ eski, Telegram yuborilmoqda")
+            await self._send_telegram_for_remaining()
+
+        # Yuborilmay qolganlar bo'lsa - 10 sekunddan keyin qayta urinish
+        self._telegram_due_ids &= self.state.order_timestamps.keys()
+        if self._telegram_due_ids - self.state.last_telegram_order_ids:
+            self._schedule_telegram_flush()
+
+    async def _check_group_status(self):
+        """GURUH XABARLARI: Status o'zgarishlarini kuzatish (har 5 soniyada)"""
         # Biznes guruhlar mavjud bo'lsa yoki xabarlar track qilinayotgan bo'lsa
         has_business_groups = self.stats_handler and self.stats_handler._business_groups
-        if has_business_groups or self._group_order_messages:
-            should_check_status = False
-            if self.state.last_group_status_check is None:
-                should_check_status = True
-            else:
-                time_since_check = (now - self.state.last_group_status_check).total_seconds()
-                if time_since_check >= 5:  # Har 5 soniyada tekshirish (server yuklamasini kamaytirish)
-                    should_check_status = True
-
-            if should_check_status:
-                self.state.last_group_status_check = now
-                # Pending buyurtmalarni olish va tozalash (atomik)
-                pending_orders = set(self._pending_group_message_orders)
-                self._pending_group_message_orders.clear()
-                # MUHIM: Allaqachon tracking da bo'lgan buyurtmalarni olib tashlash
-                pending_orders = pending_orders - set(self._group_order_messages.keys())
-                # Guruh xabarlarini yangilash (pending bilan)
-                if pending_orders:
-                    logger.info(f"Guruh xabarlari: {len(pending_orders)} ta yangi buyurtma yuborilmoqda")
-                await self._update_group_messages(new_order_ids=pending_orders if pending_orders else None)
-
-        # XABARNOMALAR SCHEDULER: Har 30 sekundda tekshirish
-        if self.stats_handler:
-            should_check_notif = False
-            if self._last_notif_check is None:
-                should_check_notif = True
-            else:
-                time_since_notif = (now - self._last_notif_check).total_seconds()
-                if time_since_notif >= 30:
-                    should_check_notif = True
-
-            if should_check_notif:
-                self._last_notif_check = now
-                await self._process_scheduled_notifications()
-
-        # REJA ESLATMA: Har 60 sekundda reja buyurtmalarni tekshirish
-        if self.telegram and self._group_order_messages:
-            should_check_planned = False
-            if self._last_planned_check is None:
-                should_check_planned = True
-            else:
-                time_since_planned = (now - self._last_planned_check).total_seconds()
-                if time_since_planned >= 60:
-                    should_check_planned = True
+        if not (has_business_groups or self._group_order_messages):
+            return
 
-            if should_check_planned:
-                self._last_planned_check = now
-                await self._check_planned_reminders()
+        # Pending buyurtmalarni olish va tozalash (atomik)
+        pending_orders = set(self._pending_group_message_orders)
+        self._pending_group_message_orders.clear()
+        # MUHIM: Allaqachon tracking da bo'lgan buyurtmalarni olib tashlash
+        pending_orders = pending_orders - set(self._group_order_messages.keys())
+        # Guruh xabarlarini yangilash (pending bilan)
+        if pending_orders:
+            logger.info(f"Guruh xabarlari: {len(pending_orders)} ta yangi buyurtma yuborilmoqda")
+        await self._update_group_messages(new_order_ids=pending_orders if pending_orders else None)
+
+    async def _log_runtime_stats(self):
+        """Navbat metrikalarini davriy log qilish"""
+        if self.telegram:
+            logger.info(f"Telegram navbat: {self.telegram.get_queue_stats()}")
+        if not self.skip_asterisk:
+            logger.info(f"Qo'ng'iroq navbati: {self.dial_governor.get_stats()}")
+
+    async def _check_scheduled_notifications(self):
+        """XABARNOMALAR SCHEDULER: Har 30 sekundda tekshirish"""
+        if self.stats_handler:
+            await self._process_scheduled_notifications()
 
     async def _process_scheduled_notifications(self):
         """Rejalashtirilgan xabarnomalarni tekshirish va yuborish"""
@@ -858,10 +1106,10 @@ class AutodialerPro:
                         await self.telegram.send_message(
                             text=f"📢 <b>XABARNOMA</b>\n━━━━━━━━━━━━━━━━━━━━\n\n{text}",
                             chat_id=group_id,
-                            parse_mode="HTML"
+                            parse_mode="HTML",
+                            priority=PRIORITY_BROADCAST  # Rate limit - dispetcher navbatida
                         )
                         sent_count += 1
-                        await asyncio.sleep(0.5)  # Telegram rate limit
                     except Exception as e:
                         logger.error(f"Xabarnoma yuborish xatosi (biz={biz_id}, group={group_id}): {e}")
 
@@ -871,49 +1119,95 @@ class AutodialerPro:
         except Exception as e:
             logger.error(f"Xabarnomalar scheduler xatosi: {e}")
 
+    GROUP_UPDATE_CONCURRENCY = 4  # Bir vaqtda yangilanadigan guruhlar (chat) soni
+
     async def _update_group_messages(self, new_order_ids: set = None):
         """
         Biriktirilgan guruhlarga har bir buyurtma uchun alohida xabar yuborish/yangilash.
         new_order_ids: yangi kelgan buyurtma ID lari (faqat ular uchun xabar yuboriladi)
-        """
-        # Lock bilan ishlaymiz - race condition oldini olish
-        async with self._group_messages_lock:
-            await self._update_group_messages_internal(new_order_ids)
 
-    async def _update_group_messages_internal(self, new_order_ids: set = None):
-        """Internal: Lock ichida chaqiriladi"""
+        1. O'zgarishlar to'plami hisoblanadi (lock ichida, faqat xotira)
+        2. Telegram yuborish/tahrirlash - chat bo'yicha guruhlanib, parallel (lock siz)
+        3. Natijalar holatga qo'llanadi (lock ichida)
+        """
         if not self.stats_handler:
             return
+        if not self.nonbor.order_tracker.initialized:
+            # Hali birinchi snapshot kelmagan - tracking ni o'chirib yubormaslik uchun kutamiz
+            return
+
         try:
-            orders = await self.nonbor.get_orders()
-            if not orders:
-                return
+            # Bizneslar katalogi (title -> ID indeksi) - bo'sh yoki eskirgan bo'lsa yuklanadi
+            await self.nonbor.businesses.ensure_fresh()
+        except Exception as e:
+            logger.error(f"Bizneslar katalogini yangilashda xato: {e}")
 
-            # Biznes title -> ID mapping (businesses cache dan)
-            title_to_id = {}
-            for bid, bdata in self.nonbor._businesses_cache.items():
-                title = bdata.get("title", "").strip().lower()
-                if title:
-                    title_to_id[title] = str(bid)
-
-            # Agar cache bo'sh bo'lsa, API dan yuklash
-            if not title_to_id:
-                await self.nonbor.get_businesses()
-                for bid, bdata in self.nonbor._businesses_cache.items():
-                    title = bdata.get("title", "").strip().lower()
-                    if title:
-                        title_to_id[title] = str(bid)
-
-            for order in orders:
-                order_id = order.get("id")
-                business = order.get("business") or {}
+        # Lock faqat xotiradagi holat bilan ishlash uchun - race condition oldini olish
+        async with self._group_messages_lock:
+            changes = self._plan_group_changes(new_order_ids)
+        if not changes:
+            return
+
+        try:
+            await self._dispatch_group_changes(changes)
+        finally:
+            async with self._group_messages_lock:
+                self._apply_group_changes(changes)
+
+    def _on_order_event(self, event: OrderEvent):
+        """OrderStateTracker hodisasi - guruh xabari qayta ko'rib chiqilishi kerak"""
+        self._group_dirty_order_ids.add(event.order_id)
+
+    def _plan_group_changes(self, new_order_ids: set = None) -> List[GroupMessageChange]:
+        """
+        Lock ichida chaqiriladi: guruh xabarlaridagi o'zgarishlar to'plamini hisoblash
+
+        Faqat hodisa kelgan (yangi / status o'zgargan / yo'qolgan) buyurtmalar,
+        yangi yuboriladigan buyurtmalar va muddati tugashi mumkin bo'lgan
+        CHECKING buyurtmalar ko'rib chiqiladi - butun ro'yxat qayta skanerlanmaydi.
+        API da yo'q buyurtmalar shu yerda tracking dan o'chiriladi; tarmoq so'rovlari yo'q.
+        """
+        tracker = self.nonbor.order_tracker
+        dirty_ids = self._group_dirty_order_ids
+        self._group_dirty_order_ids = set()
+        changes: List[GroupMessageChange] = []
+        try:
+            candidate_ids = set(dirty_ids)
+            if new_order_ids:
+                candidate_ids |= new_order_ids
+            # ACCEPT_EXPIRED vaqtga bog'liq - CHECKING dagi tracked buyurtmalar har safar tekshiriladi
+            candidate_ids |= tracker.ids_in_state("CHECKING") & self._group_order_messages.keys()
+            if not self._group_messages_reconciled:
+                # Fayldan yuklangan tracking - birinchi marta hammasini solishtirish
+                candidate_ids |= self._group_order_messages.keys()
+                self._group_messages_reconciled = True
+
+            for order_id in candidate_ids:
+                # DUPLICATE OLDINI OLISH: xabari hozir yuborilayotgan/yangilanayotgan buyurtma
+                # keyingi tekshiruvda qayta ko'rib chiqiladi
+                if order_id in self._group_inflight_ids:
+                    self._group_dirty_order_ids.add(order_id)
+                    continue
+
+                order = tracker.get_order(order_id)
+                if order is None:
+                    # API da yo'q - tracking dan o'chirish
+                    # MUHIM: Final statusdagi buyurtmalar API da bo'lsa ham qoladi (yangi xabar yuborilmasligi uchun)
+                    tracked = self._group_order_messages.pop(order_id, None)
+                    if tracked is not None:
+                        self._group_journal.delete(order_id)
+                        self._index_planned_reminder(order_id)
+                        logger.info(f"Guruh tracking tozalandi (API da yo'q): buyurtma #{order_id}, status={tracked.get('status', '')}")
+                    continue
+
+                view = tracker.get_view(order_id)
 
                 # Business ID ni aniqlash: avval to'g'ridan-to'g'ri, keyin title orqali
-                biz_id = str(business.get("id", ""))
-                biz_title = business.get("title", "")
+                biz_id = str(view.business_id) if view.business_id is not None else ""
+                biz_title = view.business_title
                 if not biz_id:
-                    biz_title_lower = biz_title.strip().lower()
-                    biz_id = title_to_id.get(biz_title_lower, "")
+                    catalog_biz = self.nonbor.businesses.get_by_title(biz_title)
+                    biz_id = str(catalog_biz["id"]) if catalog_biz else ""
 
                 # Buyurtma va biznes ma'lumotlarini ko'rsatish
                 if biz_id:
@@ -937,238 +1231,183 @@ class AutodialerPro:
                     continue
 
                 group_chat_id = self.stats_handler._business_groups[biz_id]
-                status = order.get("state", "CHECKING").upper()
+                status = view.state
 
                 # PENDING va to'lov kutilayotgan buyurtmalarni o'tkazib yuborish
                 skip_statuses = ["PENDING", "WAITING_PAYMENT", "PAYMENTPENDING", "PAYMENT_PENDING"]
                 if status in skip_statuses:
                     continue
 
-                # Buyurtma ma'lumotlarini tayyorlash
-                user = order.get("user") or {}
-                items = order.get("order_item") or order.get("items") or []
-                delivery = order.get("delivery") or {}
-                client_name = f"{user.get('first_name', '')} {user.get('last_name', '')}".strip() or "Noma'lum"
-                product_name = ""
-                quantity = 1
-                if items:
-                    first_item = items[0]
-                    product = first_item.get("product") or {}
-                    product_name = product.get("title", "") or product.get("name", "")
-                    quantity = first_item.get("count", 1) or first_item.get("quantity", 1)
-
-                # Telefon raqami - user, delivery, order yoki boshqa maydonlardan
-                client_phone = (
-                    user.get("phone") or
-                    user.get("phone_number") or
-                    user.get("mobile") or
-                    user.get("tel") or
-                    delivery.get("phone") or
-                    delivery.get("phone_number") or
-                    delivery.get("recipient_phone") or
-                    order.get("phone") or
-                    order.get("client_phone") or
-                    order.get("customer_phone") or
-                    ""
-                )
-
-                # Agar telefon topilmasa va status READY yoki undan keyin - /orders/{id}/ dan olish
-                need_phone_statuses = ["READY", "DELIVERING", "DELIVERED", "COMPLETED"]
-                if not client_phone and status in need_phone_statuses:
-                    try:
-                        details = await self.nonbor.get_order_details(order_id)
-                        if details:
-                            # Turli joylarda telefon qidirish
-                            detail_user = details.get("user") or {}
-                            detail_delivery = details.get("delivery") or {}
-                            client_phone = (
-                                detail_user.get("phone") or
-                                detail_user.get("phone_number") or
-                                detail_delivery.get("phone") or
-                                detail_delivery.get("phone_number") or
-                                detail_delivery.get("recipient_phone") or
-                                details.get("phone") or
-                                details.get("client_phone") or
-                                ""
-                            )
-                            if client_phone:
-                                logger.info(f"Buyurtma #{order_id}: telefon /orders/ dan olindi: {client_phone}")
-                            else:
-                                logger.debug(f"Buyurtma #{order_id}: /orders/ da ham telefon yo'q. Keys: {list(details.keys())}")
-                    except Exception as e:
-                        logger.debug(f"Buyurtma #{order_id}: /orders/ endpoint xato: {e}")
-
-                # Yetkazib berish manzili
-                delivery_address = delivery.get("address") or delivery.get("location") or ""
-                delivery_lat = delivery.get("lat") or delivery.get("latitude") or ""
-                delivery_lon = delivery.get("lon") or delivery.get("longitude") or delivery.get("lng") or ""
-
-                # Yetkazib berish vaqti (rejalashtirilgan buyurtmalar uchun)
-                # planned_datetime - asosiy field
-                raw_planned_time = order.get("planned_datetime") or order.get("planned_time") or ""
-
-                # Vaqtni formatlash (2026-01-29T11:00:00+05:00 -> 29.01 11:00)
-                # MUHIM: UTC dan O'zbekiston vaqtiga (UTC+5) o'tkazish
-                delivery_time = ""
-                if raw_planned_time:
-                    try:
-                        from datetime import timezone, timedelta
-                        uz_tz = timezone(timedelta(hours=5))
-                        dt = datetime.fromisoformat(str(raw_planned_time).replace('Z', '+00:00'))
-                        # O'zbekiston vaqtiga o'tkazish
-                        dt_uz = dt.astimezone(uz_tz)
-                        delivery_time = dt_uz.strftime("%d.%m %H:%M")
-                    except:
-                        delivery_time = str(raw_planned_time)
-
-                # Agar planned_datetime yo'q bo'lsa, boshqa fieldlardan qidirish
-                if not delivery_time:
-                    delivery_time = (
-                        delivery.get("time") or
-                        delivery.get("scheduled_time") or
-                        delivery.get("delivery_time") or
-                        order.get("delivery_time") or
-                        order.get("scheduled_at") or
-                        ""
-                    )
-
-                # Debug: is_planned buyurtmalar uchun
-                is_planned = order.get("is_planned") or order.get("is_planner")
-                if is_planned:
-                    logger.info(f"Buyurtma #{order_id} PLANNED: delivery_time='{delivery_time}', ready_time={order.get('ready_time')}")
-                    if not delivery_time:
-                        logger.warning(f"Buyurtma #{order_id} is_planned=True lekin delivery_time topilmadi. Order keys: {list(order.keys())}")
-
                 # Qabul qilish muddati tugadimi tekshirish
                 display_status = status
                 if status == "CHECKING" and order_id in self.state.order_timestamps:
                     order_age = (datetime.now() - self.state.order_timestamps[order_id]).total_seconds()
                     # Qo'ng'iroqlar tugagan va muddat o'tgan bo'lsa
-                    if order_age >= self.telegram_alert_time and not self.state.waiting_for_call:
+                    if order_age >= self.telegram_alert_time and not self._is_order_awaiting_call(order_id):
                         display_status = "ACCEPT_EXPIRED"
                         logger.debug(f"Buyurtma #{order_id} qabul muddati tugadi ({order_age:.0f}s)")
 
-                order_data = {
-                    "order_number": str(order_id),
-                    "status": display_status,
-                    "seller_name": biz_title or "Noma'lum",
-                    "client_name": client_name,
-                    "client_phone": client_phone,
-                    "product_name": product_name,
-                    "quantity": quantity,
-                    "price": (order.get("total_price", 0) or 0) / 100,
-                    "delivery_address": delivery_address,
-                    "delivery_lat": delivery_lat,
-                    "delivery_lon": delivery_lon,
-                    "delivery_time": delivery_time,
-                    "delivery_method": order.get("delivery_method", ""),
-                    "payment_method": order.get("payment_method", ""),
-                    "is_planned": bool(is_planned),
-                    "planned_datetime_raw": str(raw_planned_time) if raw_planned_time else "",
-                }
-
-                if order_id in self._group_order_messages:
-                    # Mavjud xabar - status o'zgargan bo'lsa yangilash
-                    tracked = self._group_order_messages[order_id]
-                    if tracked.get("status") != display_status:
-                        success = await self.telegram.update_business_order_message(
-                            message_id=tracked["msg_id"],
-                            order_data=order_data,
-                            chat_id=group_chat_id
-                        )
-                        if success:
-                            tracked["status"] = display_status
-                            tracked["order_data"] = order_data
-                            self._save_group_messages()
-                            logger.info(f"Guruh: buyurtma #{order_id} status yangilandi: {display_status}")
+                tracked = self._group_order_messages.get(order_id)
+                if tracked is not None:
+                    if tracked.get("status") == display_status:
+                        # O'zgarish yo'q - order_data qurilmaydi
+                        continue
+                    # Mavjud xabar - status o'zgargan, yangilash
+                    kind = "edit"
                 else:
                     # Yangi buyurtma - tracking da yo'q
+                    # MUHIM: Yangi xabar FAQAT new_order_ids berilganda yuboriladi
+                    # Status tekshirish loopida (new_order_ids=None) yangi xabar YUBORILMAYDI
+                    if not (new_order_ids and order_id in new_order_ids):
+                        continue
                     # MUHIM: Agar buyurtma allaqachon yakuniy statusda bo'lsa, yangi xabar yubormaymiz
                     # (bu buyurtmani tracking qilishni o'tkazib yubordik)
                     final_statuses_for_skip = ["COMPLETED", "CANCELLED", "DELIVERED", "CANCELLED_SELLER", "CANCELLED_USER", "CANCELLED_ADMIN", "PAYMENT_EXPIRED"]
                     if status in final_statuses_for_skip:
-                        # Yakuniy statusdagi buyurtma - yangi xabar yubormaymiz
                         continue
+                    kind = "send"
 
-                    # MUHIM: Yangi xabar FAQAT new_order_ids berilganda yuboriladi
-                    # Status tekshirish loopida (new_order_ids=None) yangi xabar YUBORILMAYDI
-                    should_send = (new_order_ids is not None) and (order_id in new_order_ids)
+                # Debug: is_planned buyurtmalar uchun
+                if view.is_planned:
+                    logger.info(f"Buyurtma #{order_id} PLANNED: delivery_time='{view.delivery_time}', ready_time={order.get('ready_time')}")
+                    if not view.delivery_time:
+                        logger.warning(f"Buyurtma #{order_id} is_planned=True lekin delivery_time topilmadi. Order keys: {list(order.keys())}")
 
-                    # DUPLICATE OLDINI OLISH: Agar xabar allaqachon yuborilayotgan bo'lsa, o'tkazib yuboring
-                    if order_id in self._sending_order_messages:
-                        logger.debug(f"Buyurtma #{order_id} uchun xabar allaqachon yuborilmoqda, o'tkazib yuborildi")
-                        continue
+                # Xabari yuborilayotgan buyurtma sifatida belgilash
+                self._group_inflight_ids.add(order_id)
+                changes.append(GroupMessageChange(
+                    order_id=order_id,
+                    kind=kind,
+                    chat_id=group_chat_id,
+                    biz_id=biz_id,
+                    status=status,
+                    display_status=display_status,
+                    view=view,
+                    msg_id=tracked["msg_id"] if tracked is not None else None,
+                ))
+        except Exception as e:
+            # Ko'rib chiqilmagan hodisalar keyingi tekshiruvda qayta ishlanadi
+            self._group_dirty_order_ids |= dirty_ids
+            for change in changes:
+                self._group_inflight_ids.discard(change.order_id)
+            logger.error(f"Guruh xabarlarini yangilashda xato: {e}")
+            return []
+        return changes
 
-                    # Qayta tekshirish: tracking da bormi (lock ichida ham)
-                    if order_id in self._group_order_messages:
-                        logger.debug(f"Buyurtma #{order_id} allaqachon tracking da, o'tkazib yuborildi")
-                        continue
+    async def _dispatch_group_changes(self, changes: List[GroupMessageChange]):
+        """
+        O'zgarishlarni Telegram ga yuborish - lock siz
 
-                    if should_send:
-                        # Xabar yuborilayotgan buyurtma sifatida belgilash
-                        self._sending_order_messages.add(order_id)
-                        try:
-                            msg_id = await self.telegram.send_business_order_message(
-                                order_data=order_data, chat_id=group_chat_id
-                            )
-                            if msg_id:
-                                self._group_order_messages[order_id] = {
-                                    "msg_id": msg_id,
-                                    "biz_id": biz_id,
-                                    "chat_id": group_chat_id,
-                                    "status": display_status,
-                                    "order_data": order_data,
-                                }
-                                self._save_group_messages()
-                                logger.info(f"Guruhga xabar yuborildi: buyurtma #{order_id}, status: {display_status}")
-                        finally:
-                            # Yuborish tugadi - ro'yxatdan o'chirish
-                            self._sending_order_messages.discard(order_id)
-
-            # For loop tugadi - endi API dan yo'qolgan buyurtmalarni tozalash
-            # MUHIM: Faqat API da YO'Q bo'lgan buyurtmalarni o'chiramiz
-            # Final statusdagi buyurtmalar API da bo'lsa ham qoladi (yangi xabar yuborilmasligi uchun)
-            current_order_ids = {order.get("id") for order in orders if order.get("id")}
-
-            deleted_any = False
-            for tracked_order_id in list(self._group_order_messages.keys()):
-                # Faqat API da yo'q bo'lgan buyurtmalarni tracking dan o'chirish
-                if tracked_order_id not in current_order_ids:
-                    tracked = self._group_order_messages[tracked_order_id]
-                    tracked_status = tracked.get("status", "")
-                    del self._group_order_messages[tracked_order_id]
-                    deleted_any = True
-                    logger.info(f"Guruh tracking tozalandi (API da yo'q): buyurtma #{tracked_order_id}, status={tracked_status}")
-
-            if deleted_any:
-                self._save_group_messages()
+        Bitta chat ichida tartib saqlanadi (ketma-ket), turli chatlar parallel
+        (GROUP_UPDATE_CONCURRENCY tadan ko'p emas).
+        """
+        by_chat: Dict[str, List[GroupMessageChange]] = {}
+        for change in changes:
+            by_chat.setdefault(change.chat_id, []).append(change)
+
+        semaphore = asyncio.Semaphore(self.GROUP_UPDATE_CONCURRENCY)
+
+        async def run_chat(chat_changes: List[GroupMessageChange]):
+            async with semaphore:
+                for change in chat_changes:
+                    await self._perform_group_change(change)
+
+        await asyncio.gather(*(run_chat(chat_changes) for chat_changes in by_chat.values()))
 
+    async def _perform_group_change(self, change: GroupMessageChange):
+        """Bitta o'zgarish: telefon (kerak bo'lsa) + Telegram yuborish/tahrirlash"""
+        order_id = change.order_id
+        view = change.view
+        try:
+            # Agar telefon topilmasa va status READY yoki undan keyin - /orders/{id}/ dan olish
+            need_phone_statuses = ["READY", "DELIVERING", "DELIVERED", "COMPLETED"]
+            if not view.client_phone and change.status in need_phone_statuses:
+                try:
+                    details = await self.nonbor.get_order_details(order_id)
+                    if details:
+                        client_phone = OrderView.from_order(details).client_phone
+                        if client_phone:
+                            view = view.with_phone(client_phone)
+                            logger.info(f"Buyurtma #{order_id}: telefon /orders/ dan olindi: {client_phone}")
+                        else:
+                            logger.debug(f"Buyurtma #{order_id}: /orders/ da ham telefon yo'q. Keys: {list(details.keys())}")
+                except Exception as e:
+                    logger.debug(f"Buyurtma #{order_id}: /orders/ endpoint xato: {e}")
+
+            change.order_data = view.to_order_data(change.display_status)
+
+            if change.kind == "edit":
+                change.ok = await self.telegram.update_business_order_message(
+                    message_id=change.msg_id,
+                    order_data=change.order_data,
+                    chat_id=change.chat_id
+                )
+            else:
+                msg_id = await self.telegram.send_business_order_message(
+                    order_data=change.order_data, chat_id=change.chat_id
+                )
+                change.msg_id = msg_id
+                change.ok = bool(msg_id)
         except Exception as e:
-            logger.error(f"Guruh xabarlarini yangilashda xato: {e}")
+            change.ok = False
+            logger.error(f"Guruh xabari xatosi (buyurtma #{order_id}): {e}")
+
+    def _apply_group_changes(self, changes: List[GroupMessageChange]):
+        """Lock ichida chaqiriladi: Telegram natijalarini tracking holatiga qo'llash"""
+        for change in changes:
+            order_id = change.order_id
+            # Yuborish tugadi - ro'yxatdan o'chirish
+            self._group_inflight_ids.discard(order_id)
+
+            if change.kind == "edit":
+                tracked = self._group_order_messages.get(order_id)
+                if not change.ok:
+                    # Keyingi tekshiruvda qayta urinish
+                    self._group_dirty_order_ids.add(order_id)
+                    continue
+                if tracked is None:
+                    continue
+                tracked["status"] = change.display_status
+                tracked["order_data"] = change.order_data
+                self._group_journal.patch(order_id, {"status": change.display_status, "order_data": change.order_data})
+                self._index_planned_reminder(order_id)
+                logger.info(f"Guruh: buyurtma #{order_id} status yangilandi: {change.display_status}")
+            elif change.ok:
+                self._group_order_messages[order_id] = {
+                    "msg_id": change.msg_id,
+                    "biz_id": change.biz_id,
+                    "chat_id": change.chat_id,
+                    "status": change.display_status,
+                    "order_data": change.order_data,
+                }
+                self._group_journal.put(order_id, self._group_order_messages[order_id])
+                self._index_planned_reminder(order_id)
+                logger.info(f"Guruhga xabar yuborildi: buyurtma #{order_id}, status: {change.display_status}")
 
     async def _on_new_orders(self, count: int, new_ids: list):
-        """Yangi buyurtmalar callback"""
+        """Yangi buyurtmalar callback - holat o'zgargach muddatlar qayta moslashtiriladi"""
+        try:
+            await self._apply_new_orders(count, new_ids)
+            await self._route_pending_orders()
+        finally:
+            self._sync_deadlines()
+
+    async def _apply_new_orders(self, count: int, new_ids: list):
+        """Yangi buyurtmalarni holatga qo'llash"""
         logger.info(f"Yangi buyurtmalar: {len(new_ids)} ta, Jami: {count} ta")
 
         # Holatni yangilash
         old_count = self.state.pending_orders_count
-        old_ids = set(self.state.pending_order_ids)
+        old_ids = set(self.state.orders.pending_view())
         new_order_ids = set(new_ids)
 
-        # TOZALASH (BIRINCHI): TEKSHIRILMOQDA statusidan chiqqan buyurtmalarni last_communicated_orders dan o'chirish
+        # TOZALASH (BIRINCHI): TEKSHIRILMOQDA statusidan chiqqan buyurtmalarni xabar berilganlardan o'chirish
         # Bu AVVAL qilinishi kerak - uncommunicated_ids ni to'g'ri hisoblash uchun
-        for _sp in list(self.state.last_communicated_orders.keys()):
-            _still = [oid for oid in self.state.last_communicated_orders[_sp] if oid in new_order_ids]
-            if _still:
-                self.state.last_communicated_orders[_sp] = _still
-            else:
-                del self.state.last_communicated_orders[_sp]
-                logger.debug(f"Sotuvchi {_sp}: barcha buyurtmalari hal qilindi, tozalandi")
+        for _sp in self.state.orders.retain_communicated(new_order_ids):
+            logger.debug(f"Sotuvchi {_sp}: barcha buyurtmalari hal qilindi, tozalandi")
 
-        # MUHIM: Allaqachon qo'ng'iroq qilingan/xabar berilgan buyurtmalarni topish (tozalangan ma'lumot bilan)
-        all_communicated_ids = set()
-        for seller_phone, communicated_ids in self.state.last_communicated_orders.items():
-            all_communicated_ids.update(communicated_ids)
+        # MUHIM: Allaqachon qo'ng'iroq qilingan/xabar berilgan buyurtmalar (tozalangan ma'lumot bilan)
+        all_communicated_ids = self.state.orders.communicated_ids()
 
         # MUHIM: Faqat YANGI (hali xabar berilmagan) buyurtmalarni aniqlash
         # 1. Haqiqatan yangi kelgan buyurtmalar (ilgari yo'q edi)
@@ -1187,20 +1426,11 @@ class AutodialerPro:
             # Holatni yangilash (faqat pending_order_ids)
             self.state.pending_order_ids = new_ids
             self.state.pending_orders_count = count
-            # MUHIM: waiting_for_call ni False qoldiramiz, chunki qo'ng'iroq kerak emas
-            # Agar waiting_for_call allaqachon True bo'lsa, uni False qilamiz
-            if self.state.waiting_for_call:
-                self.state.waiting_for_call = False
-                logger.debug("waiting_for_call = False (barcha buyurtmalar xabar berilgan)")
             # MUHIM: order_timestamps ni O'CHIRMAYMIZ!
             # Chunki Telegram hali yuborilmagan bo'lishi mumkin (180s kutish kerak)
             # Faqat qo'ng'iroq qilingan, lekin Telegram hali kutilmoqda
             # order_timestamps faqat _on_orders_resolved() da o'chiriladi
             # yoki _send_telegram_for_remaining() dan keyin o'chiriladi
-            # Agar order_timestamps bo'sh bo'lsa, last_180s_check_time ni ham reset qilamiz
-            if len(self.state.order_timestamps) == 0:
-                self.state.last_180s_check_time = None
-                logger.debug("order_timestamps bo'sh, 180s timer to'xtatildi")
             # MUHIM: return qilamiz - bu buyurtmalar uchun hech narsa qilmaymiz
             return
 
@@ -1224,9 +1454,7 @@ class AutodialerPro:
                 logger.info(f"Birinchi buyurtmalar keldi: {len(truly_new_ids)} ta")
 
             # Yangi buyurtmalarni to'plash listiga qo'shish
-            for new_id in truly_new_ids:
-                if new_id not in self.state.new_order_ids_for_call:
-                    self.state.new_order_ids_for_call.append(new_id)
+            self.state.new_order_ids_for_call |= truly_new_ids
 
             logger.info(f"To'planayotgan yangi buyurtmalar: {len(self.state.new_order_ids_for_call)} ta")
 
@@ -1243,24 +1471,11 @@ class AutodialerPro:
                     logger.info(f"Guruh xabari navbatiga qo'shildi: {added_count} ta buyurtma")
 
             # 1. MUHIM: Yangi buyurtma kelganda Telegram xabar DARHOL yangilanmaydi
-            # Har bir buyurtma uchun 180s kutish kerak - _check_and_process() da 180s timer ishlaydi
+            # Har bir buyurtma uchun 180s kutish kerak - rejalashtiruvchida 180s muddat qo'yiladi
             logger.info(f"Yangi buyurtmalar uchun 180s timer boshlandi: {len(truly_new_ids)} ta buyurtma")
 
-            # 2. Timer/qo'ng'iroq holati bo'yicha harakat
-            if self.state.call_in_progress:
-                # Qo'ng'iroq jarayonida - yangi buyurtmalar KEYINGI qo'ng'iroqqa qoladi
-                logger.info(f"Qo'ng'iroq jarayonida, yangi buyurtmalar keyingi qo'ng'iroq uchun to'planmoqda: {len(truly_new_ids)} ta")
-            elif not self.state.call_started:
-                if not self.state.waiting_for_call:
-                    # Timer hali boshlanmagan - yangi timer boshlash
-                    logger.info(f"Yangi buyurtmalar uchun 90s timer boshlandi")
-                    logger.info(f"90 soniyadan keyin BARCHA yangi buyurtmalar uchun BITTA qo'ng'iroq")
-                    self.state.last_new_order_time = now
-                    self.state.waiting_for_call = True
-                    self.state.call_started = False
-                else:
-                    # Timer allaqachon ishlayapti - buyurtma to'plamga qo'shiladi (timer QAYTA BOSHLANMAYDI)
-                    logger.info(f"90s timer ishlayapti, yangi buyurtma to'plamga qo'shildi (Jami: {len(self.state.new_order_ids_for_call)} ta)")
+            # 2. 90s timer / qo'ng'iroq - har bir sotuvchi uchun alohida (_route_pending_orders)
+            # Sotuvchi qo'ng'iroq jarayonida bo'lsa - yangi buyurtmalar uning KEYINGI qo'ng'iroqiga qoladi
 
         elif old_count > 0:
             logger.debug(f"Buyurtmalar soni yangilandi: {old_count} -> {count}")
@@ -1291,7 +1506,15 @@ class AutodialerPro:
             logger.debug(f"O'zgarish yo'q")
 
     async def _on_orders_resolved(self, resolved_ids: list, remaining_count: int):
-        """Buyurtmalar tekshirildi callback"""
+        """Hal qilingan buyurtmalar callback - holat o'zgargach muddatlar qayta moslashtiriladi"""
+        try:
+            await self._apply_orders_resolved(resolved_ids, remaining_count)
+            await self._route_pending_orders()
+        finally:
+            self._sync_deadlines()
+
+    async def _apply_orders_resolved(self, resolved_ids: list, remaining_count: int):
+        """Tekshirilgan buyurtmalarni holatga qo'llash"""
         resolved_count = len(resolved_ids)
         logger.info(f"Tekshirildi: {resolved_count} ta, Qoldi: {remaining_count} ta")
 
@@ -1303,7 +1526,50 @@ class AutodialerPro:
         affected_sellers = set()
 
         # Har bir hal qilingan buyurtma uchun statistika
-        resolved_order_ids = resolved_ids
+        resolved_order_ids = list(dict.fromkeys(resolved_ids))
+
+        # MUHIM: Avval keshdan olish (guruh xabarlaridan), to'liq bo'lmaganlarini
+        # BITTA snapshotdan birga to'ldirish (har bir buyurtma uchun alohida so'rov emas)
+        cached_order_data: Dict[int, dict] = {}
+        need_api_ids = set()
+        need_status_ids = set()
+        for order_id in resolved_order_ids:
+            if self._recorded_orders.contains(order_id):
+                continue
+            cached_data = (self._group_order_messages.get(order_id) or {}).get("order_data", {})
+            if cached_data:
+                cached_order_data[order_id] = cached_data
+            # Keshda yo'q bo'lsa yoki ma'lumotlar to'liq emas ("Noma'lum") - API dan olish
+            has_unknown = (
+                not cached_data or
+                cached_data.get("client_name", "Noma'lum") == "Noma'lum" or
+                cached_data.get("seller_name", "Noma'lum") == "Noma'lum" or
+                cached_data.get("product_name", "Noma'lum") == "Noma'lum"
+            )
+            if has_unknown:
+                need_api_ids.add(order_id)
+            # Tracker va keshda aniq status yo'q (yoki hali CHECKING) - statusni API dan so'rash kerak
+            known_status = (
+                self.nonbor.order_tracker.state_of(order_id) or
+                cached_data.get("state", cached_data.get("status", ""))
+            )
+            if known_status in ("", "CHECKING"):
+                need_status_ids.add(order_id)
+
+        api_full_data: Dict[int, dict] = {}
+        if need_api_ids:
+            try:
+                api_full_data = await self.nonbor.get_orders_full_data(list(need_api_ids))
+            except Exception as e:
+                logger.error(f"Hal qilingan buyurtmalar ma'lumotini olishda xato: {e}")
+
+        api_statuses: Dict[int, Optional[str]] = {}
+        if need_status_ids:
+            try:
+                api_statuses = await self.nonbor.get_order_statuses(need_status_ids)
+            except Exception as e:
+                logger.error(f"Hal qilingan buyurtmalar statusini olishda xato: {e}")
+
         for order_id in resolved_order_ids:
             # Agar bu buyurtma allaqachon qayd etilgan bo'lsa, o'tkazib yuborish
             if self._recorded_orders.contains(order_id):
@@ -1311,24 +1577,12 @@ class AutodialerPro:
                 continue
 
             try:
-                # MUHIM: Avval keshdan olish (guruh xabarlaridan)
-                order_data = None
-                if order_id in self._group_order_messages:
-                    cached = self._group_order_messages[order_id]
-                    cached_data = cached.get("order_data", {})
-                    if cached_data:
-                        order_data = cached_data
-                        logger.debug(f"Buyurtma #{order_id} keshdan olindi")
-
-                # Keshda yo'q bo'lsa yoki ma'lumotlar to'liq emas ("Noma'lum") - API dan olish
-                has_unknown = (
-                    not order_data or
-                    order_data.get("client_name", "Noma'lum") == "Noma'lum" or
-                    order_data.get("seller_name", "Noma'lum") == "Noma'lum" or
-                    order_data.get("product_name", "Noma'lum") == "Noma'lum"
-                )
-                if has_unknown:
-                    api_data = await self.nonbor.get_order_full_data(order_id)
+                order_data = cached_order_data.get(order_id)
+                if order_data:
+                    logger.debug(f"Buyurtma #{order_id} keshdan olindi")
+
+                if order_id in need_api_ids:
+                    api_data = api_full_data.get(order_id) or self.nonbor.empty_order_full_data(order_id)
                     if not order_data:
                         order_data = api_data
                     else:
@@ -1345,10 +1599,20 @@ class AutodialerPro:
                 affected_sellers.add(seller_phone)
 
                 # MUHIM: Buyurtma statusiga qarab natijani aniqlash
-                # Avval order_data dan, keyin individual API dan status olish
-                order_status = order_data.get("state", order_data.get("status", ""))
+                # Avval OrderStateTracker dan (snapshotlar farqi), keyin order_data dan,
+                # oxirgi chora - individual API dan status olish
+                order_status = (
+                    self.nonbor.order_tracker.state_of(order_id) or
+                    order_data.get("state", order_data.get("status", ""))
+                )
+                if order_status == "CHECKING":
+                    # Ro'yxatdan yo'qolgan - oxirgi ma'lum status hali CHECKING, haqiqiysini so'rash
+                    order_status = ""
                 if not order_status:
-                    api_status = await self.nonbor.get_order_status(order_id)
+                    if order_id in api_statuses:
+                        api_status = api_statuses[order_id]
+                    else:
+                        api_status = await self.nonbor.get_order_status(order_id)
                     if api_status:
                         order_status = api_status
                         logger.info(f"Buyurtma #{order_id} status API dan olindi: {order_status}")
@@ -1370,7 +1634,9 @@ class AutodialerPro:
                     product_name=order_data.get("product_name", "Noma'lum"),
                     price=order_data.get("price", 0),
                     result=order_result,
-                    call_attempts=self.state.call_attempts,
+                    call_attempts=self._seller_call_attempts.get(
+                        self._format_seller_phone(seller_phone), self.state.call_attempts
+                    ),
                     telegram_sent=telegram_was_sent,
                     order_status=order_status
                 )
@@ -1391,23 +1657,10 @@ class AutodialerPro:
                 self.state.last_telegram_order_ids.discard(order_id)
                 logger.debug(f"Buyurtma #{order_id} Telegram tracking dan o'chirildi")
 
-        # Tekshirilgan buyurtmalarni last_communicated_orders dan ham o'chirish
+        # Tekshirilgan buyurtmalarni daftardan ommaviy o'chirish (pending va xabar berilganlar)
         # (agar buyurtma tekshirilgan bo'lsa, uni qayta xabar berish kerak emas)
-        for seller_phone in list(self.state.last_communicated_orders.keys()):
-            # Tekshirilgan buyurtmalarni olib tashlash
-            original_count = len(self.state.last_communicated_orders[seller_phone])
-            self.state.last_communicated_orders[seller_phone] = [
-                oid for oid in self.state.last_communicated_orders[seller_phone]
-                if oid not in resolved_order_ids
-            ]
-            removed_count = original_count - len(self.state.last_communicated_orders[seller_phone])
-            if removed_count > 0:
-                logger.debug(f"Sotuvchi {seller_phone}: {removed_count} ta tekshirilgan buyurtma tracking dan o'chirildi")
-
-            # Agar sotuvchining hech qanday buyurtmasi qolmagan bo'lsa, uni ham o'chirish
-            if len(self.state.last_communicated_orders[seller_phone]) == 0:
-                del self.state.last_communicated_orders[seller_phone]
-                logger.debug(f"Sotuvchi {seller_phone} tracking dan butunlay o'chirildi (buyurtmalar qolmagan)")
+        for seller_phone, removed_count in self.state.orders.resolve(resolved_order_ids).items():
+            logger.debug(f"Sotuvchi {seller_phone}: {removed_count} ta tekshirilgan buyurtma tracking dan o'chirildi")
 
         # Agar hammasi tekshirilgan bo'lsa
         if remaining_count == 0:
@@ -1420,11 +1673,6 @@ class AutodialerPro:
         else:
             # Qolgan buyurtmalar - holatni yangilash va Telegram ni yangilash
             self.state.pending_orders_count = remaining_count
-            # Resolved ID larni pending dan o'chirish
-            self.state.pending_order_ids = [
-                oid for oid in self.state.pending_order_ids
-                if oid not in resolved_order_ids
-            ]
             logger.info(f"Qolgan {remaining_count} ta buyurtma, Telegram yangilanmoqda")
 
             # Buyurtma hal qilinganda Telegram yangilanadi
@@ -1443,283 +1691,165 @@ class AutodialerPro:
         # Xabar faqat yakuniy statusda (COMPLETED, CANCELLED, DELIVERED) o'chiriladi
         # Bu _update_group_messages da avtomatik amalga oshiriladi
 
-    async def _make_call(self):
-        """Har bir sotuvchiga alohida qo'ng'iroq qilish"""
+    async def _run_seller_pipeline(self, seller_phone: str):
+        """90s TIMER: bitta sotuvchiga qo'ng'iroq qilish (boshqa sotuvchilardan mustaqil)"""
+        pipeline = self._seller_pipelines.get(seller_phone)
+        if not pipeline or pipeline.calling or not pipeline.orders:
+            return
 
         # Windows rejimda qo'ng'iroq o'tkazib yuboriladi
         if self.skip_asterisk:
             logger.info("⚠ QO'NG'IROQ O'TKAZIB YUBORILDI (Windows rejim) - faqat Telegram xabar yuboriladi")
-            self.state.call_in_progress = False
-            self.state.reset()  # call_started=False va waiting_for_call=False - qo'ng'iroq siklini tugatish
+            pipeline.orders.clear()
+            self._sync_seller_deadlines()
             return
 
         # Qo'ng'iroq jarayonini boshlash - yangi buyurtmalar keyingi qo'ng'iroqqa qoladi
-        self.state.call_in_progress = True
-
-        # 90s da: FAQAT TELEFON (Telegram 180s da yuboriladi)
+        pipeline.calling = True
+        pipeline.timer_started = None
+        pipeline.scheduled_for = None
+        pipeline.attempts = 0
+        pipeline.answered = None
+        self._refresh_call_flags()
+        call_orders = dict(pipeline.orders)
+        try:
+            await self._call_seller(pipeline, call_orders)
+        except Exception as e:
+            logger.error(f"Qo'ng'iroq xatosi (istisno): {pipeline.seller_name} ({seller_phone}): {e}", exc_info=e)
+        finally:
+            pipeline.calling = False
+            for order_id in call_orders:
+                pipeline.orders.pop(order_id, None)
+            if pipeline.orders:
+                # Qo'ng'iroq davomida kelgan buyurtmalar - yangi 90s timer
+                logger.info(f"{pipeline.seller_name}: {len(pipeline.orders)} ta yangi buyurtma uchun {self.wait_before_call}s timer boshlandi")
+                pipeline.timer_started = datetime.now()
+            self._sync_seller_deadlines()
+            if not self._seller_pipelines:
+                # Barcha sotuvchilar jarayoni tugadi - qo'ng'iroq sikli holatini tozalash
+                # (xabar berilgan buyurtmalar saqlanadi, 180s timer davom etadi)
+                self.state.reset()
+            self._sync_deadlines()
 
-        # QO'NG'IROQ VAQTIDAGI BARCHA buyurtmalarni olish (90s davomida to'plangan)
-        # Bu yerda pending_order_ids ni ishlatamiz - bu hozirgi holatdagi BARCHA buyurtmalar
-        order_ids = list(self.state.pending_order_ids)
-        logger.info(f"QO'NG'IROQ vaqtida: {len(order_ids)} ta buyurtma (90s davomida to'plangan)")
+    async def _call_seller(self, pipeline: SellerPipeline, call_orders: Dict[int, dict]):
+        """Bitta sotuvchiga qo'ng'iroq (statusni tekshirish, TTS, retry, statistika)"""
+        seller_phone = pipeline.seller_phone
+        seller_name = pipeline.seller_name
+        seller_biz_id = pipeline.business_id
+        seller_lang = pipeline.language
 
         # MUHIM: Qo'ng'iroq qilishdan oldin statusni tekshirish
         # Buyurtmalar qabul qilingan bo'lishi mumkin (TEKSHIRILMOQDA dan chiqgan)
-        current_leads = await self.nonbor.get_leads_by_status()
-        if current_leads is None:
-            current_leads = []
-        current_lead_ids = {lead["id"] for lead in current_leads}
-
-        logger.info(f"Nonbor API dan hozirgi CHECKING statusidagi buyurtmalar: {len(current_lead_ids)} ta")
-
-        # Faqat hali TEKSHIRILMOQDA statusida bo'lgan buyurtmalar uchun qo'ng'iroq qilish
-        order_ids = [oid for oid in order_ids if oid in current_lead_ids]
-
-        if len(order_ids) < len(self.state.pending_order_ids):
-            removed_count = len(self.state.pending_order_ids) - len(order_ids)
-            logger.info(f"Qo'ng'iroq qilishdan oldin {removed_count} ta buyurtma qabul qilindi, ular o'tkazib yuboriladi")
-
+        statuses = await self.nonbor.get_order_statuses(call_orders.keys())
+        order_ids = [oid for oid in call_orders if statuses.get(oid) == "CHECKING"]
+        if len(order_ids) < len(call_orders):
+            logger.info(f"{seller_name}: qo'ng'iroqdan oldin {len(call_orders) - len(order_ids)} ta buyurtma qabul qilindi, o'tkazib yuboriladi")
         if not order_ids:
-            logger.info("Barcha buyurtmalar allaqachon qabul qilindi, qo'ng'iroq qilish kerak emas")
-            self.state.call_in_progress = False
-            # Pending buyurtmalarni yangilash - ular qabul qilindi
-            self.state.pending_order_ids = []
-            self.state.pending_orders_count = 0
-            return
-
-        # Barcha buyurtmalarni olish va sotuvchi bo'yicha guruhlash
-        sellers = {}
-        for order_id in order_ids:
-            try:
-                order_data = await self.nonbor.get_order_full_data(order_id)
-                seller_phone = order_data.get("seller_phone", "Noma'lum")
-                seller_name = order_data.get("seller_name", "")
-                logger.info(f"Buyurtma #{order_id}: seller_name='{seller_name}', seller_phone='{seller_phone}'")
-
-                # Telefon raqamini formatlash
-                if seller_phone and seller_phone != "Noma'lum":
-                    # Faqat raqamlarni olish
-                    phone_digits = ''.join(filter(str.isdigit, seller_phone))
-                    if len(phone_digits) >= 9:
-                        # +998 formatiga o'tkazish
-                        if len(phone_digits) == 9:
-                            seller_phone = f"+998{phone_digits}"
-                        elif len(phone_digits) == 12 and phone_digits.startswith("998"):
-                            seller_phone = f"+{phone_digits}"
-                        else:
-                            seller_phone = f"+{phone_digits}"
-                    else:
-                        seller_phone = None
-                else:
-                    # "Noma'lum" yoki bo'sh → None
-                    seller_phone = None
-
-                if not seller_phone:
-                    logger.warning(f"Buyurtma #{order_id}: sotuvchi telefoni topilmadi, qo'ng'iroq o'tkazib yuborildi")
-                    continue
-
-                # MUHIM: Agar bu buyurtma haqida sotuvchiga allaqachon xabar berilgan bo'lsa, uni o'tkazib yuboramiz
-                if seller_phone in self.state.last_communicated_orders:
-                    if order_id in self.state.last_communicated_orders[seller_phone]:
-                        logger.debug(f"Buyurtma #{order_id} sotuvchi {seller_phone} ga allaqachon xabar berilgan, o'tkazib yuborildi")
-                        continue
-
-                if seller_phone not in sellers:
-                    sellers[seller_phone] = {
-                        "seller_name": order_data.get("seller_name", "Noma'lum"),
-                        "seller_phone": seller_phone,
-                        "business_id": order_data.get("business_id"),
-                        "language": order_data.get("seller_language", "uz"),
-                        "orders": []
-                    }
-                sellers[seller_phone]["orders"].append(order_data)
-
-            except Exception as e:
-                logger.error(f"Buyurtma #{order_id} ma'lumotini olishda xato: {e}")
+            logger.info(f"{seller_name}: barcha buyurtmalar allaqachon qabul qilindi, qo'ng'iroq qilish kerak emas")
+            return None
+
+        order_count = len(order_ids)
+
+        # Biznes uchun avtoqo'ng'iroq o'chirilganmi tekshirish
+        if seller_biz_id and self.stats_handler and not self.stats_handler.is_call_enabled(seller_biz_id):
+            logger.info(f"Avtoqo'ng'iroq O'CHIRILGAN: {seller_name} (biz_id={seller_biz_id}) - qo'ng'iroq qilinmaydi")
+            return None
+
+        # Per-business config (fayldan o'qish, bo'lmasa global)
+        biz_config = {}
+        if seller_biz_id and self.stats_handler:
+            biz_config = self.stats_handler.get_business_config(seller_biz_id)
+        biz_max_attempts = biz_config.get("max_call_attempts", self.max_call_attempts)
+        biz_retry_interval = biz_config.get("retry_interval", self.retry_interval)
+        logger.info(f"Config: {seller_name} (biz={seller_biz_id}) max_attempts={biz_max_attempts}, retry={biz_retry_interval}s")
+
+        logger.info(f"Qo'ng'iroq: {seller_name} ({seller_phone}), {order_count} ta buyurtma, til: {seller_lang}")
+
+        # TTS audio olish (tilga qarab)
+        audio_path = await self.tts.generate_order_message(order_count, lang=seller_lang)
+        if not audio_path:
+            logger.error(f"TTS audio yaratilmadi: {seller_phone}")
+            return None
+
+        async def check_orders_still_pending():
+            # API dan hozirgi CHECKING buyurtmalarni olish
+            current_orders = await self.nonbor.get_orders()
+            if current_orders is None:
+                logger.warning("API so'rov muvaffaqiyatsiz, qo'ng'iroq davom ettirilmoqda")
+                return (True, None)
+            checking_orders = [o for o in current_orders if o.get("state") == "CHECKING"]
+
+            # Shu sotuvchining CHECKING buyurtmalari (business ID bo'yicha)
+            seller_checking = [
+                o for o in checking_orders
+                if (o.get("business") or {}).get("id") == seller_biz_id
+            ]
 
-        if not sellers:
-            logger.info("Barcha buyurtmalar haqida allaqachon xabar berilgan, qo'ng'iroq qilish kerak emas")
-            # Qo'ng'iroq jarayonini tugatish
-            self.state.call_in_progress = False
-            # State ni tozalash (last_communicated_orders saqlanadi)
-            self.state.reset()
-            return
+            new_count = len(seller_checking)
+            logger.info(f"Qayta tekshirish: {seller_name} ({seller_phone}, biz_id={seller_biz_id}) - {new_count} ta CHECKING buyurtma")
 
-        # Har bir sotuvchiga PARALLEL qo'ng'iroq qilish
-        logger.info(f"Parallel qo'ng'iroq: {len(sellers)} ta sotuvchiga bir vaqtda qo'ng'iroq qilinmoqda")
-
-        async def call_single_seller(seller_phone: str, seller_data: dict):
-            """Bitta sotuvchiga qo'ng'iroq qilish"""
-            order_count = len(seller_data["orders"])
-            seller_name = seller_data["seller_name"]
-            seller_biz_id = seller_data.get("business_id")
-            seller_lang = (seller_data.get("language") or "uz").lower()
-
-            if order_count == 0:
-                logger.debug(f"Sotuvchi {seller_name} ({seller_phone}) uchun yangi buyurtmalar yo'q")
-                return None
-
-            # Biznes uchun avtoqo'ng'iroq o'chirilganmi tekshirish
-            if seller_biz_id and self.stats_handler and not self.stats_handler.is_call_enabled(seller_biz_id):
-                logger.info(f"Avtoqo'ng'iroq O'CHIRILGAN: {seller_name} (biz_id={seller_biz_id}) - qo'ng'iroq qilinmaydi")
-                return None
-
-            # Per-business config (fayldan o'qish, bo'lmasa global)
-            biz_config = {}
-            if seller_biz_id and self.stats_handler:
-                biz_config = self.stats_handler.get_business_config(seller_biz_id)
-            biz_max_attempts = biz_config.get("max_call_attempts", self.max_call_attempts)
-            biz_retry_interval = biz_config.get("retry_interval", self.retry_interval)
-            logger.info(f"Config: {seller_name} (biz={seller_biz_id}) max_attempts={biz_max_attempts}, retry={biz_retry_interval}s")
-
-            logger.info(f"Qo'ng'iroq: {seller_name} ({seller_phone}), {order_count} ta buyurtma, til: {seller_lang}")
-
-            # TTS audio olish (tilga qarab)
-            audio_path = await self.tts.generate_order_message(order_count, lang=seller_lang)
-            if not audio_path:
-                logger.error(f"TTS audio yaratilmadi: {seller_phone}")
-                return None
-
-            # Buyurtma IDlari
-            order_ids = [o.get("lead_id") for o in seller_data["orders"]]
-
-            # Status tekshirish va yangi buyurtmalar sonini olish callback
-            seller_biz_id = seller_data.get("business_id")
-
-            async def check_orders_still_pending():
-                # API dan hozirgi CHECKING buyurtmalarni olish
-                current_orders = await self.nonbor.get_orders()
-                if current_orders is None:
-                    logger.warning("API so'rov muvaffaqiyatsiz, qo'ng'iroq davom ettirilmoqda")
-                    return (True, None)
-                checking_orders = [o for o in current_orders if o.get("state") == "CHECKING"]
-
-                # Shu sotuvchining CHECKING buyurtmalari (business ID bo'yicha)
-                seller_checking = [
-                    o for o in checking_orders
-                    if (o.get("business") or {}).get("id") == seller_biz_id
-                ]
-
-                new_count = len(seller_checking)
-                logger.info(f"Qayta tekshirish: {seller_name} ({seller_phone}, biz_id={seller_biz_id}) - {new_count} ta CHECKING buyurtma")
+            if new_count == 0:
+                logger.info(f"Barcha buyurtmalar qabul qilindi, qo'ng'iroq to'xtatildi")
+                return (False, None)
 
-                if new_count == 0:
-                    logger.info(f"Barcha buyurtmalar qabul qilindi, qo'ng'iroq to'xtatildi")
+            # Eski buyurtmalar hali CHECKING da ekanini tekshirish
+            # (yuklangan snapshotdan, yo'qlari uchun /orders/{id}/ parallel)
+            statuses = await self.nonbor.get_order_statuses(order_ids, orders=current_orders)
+            for order_id in order_ids:
+                status = statuses.get(order_id)
+                if status and status != "CHECKING":
+                    logger.info(f"Buyurtma #{order_id} statusi o'zgardi: {status}")
                     return (False, None)
 
-                # Eski buyurtmalar hali CHECKING da ekanini tekshirish
-                for order_id in order_ids:
-                    status = await self.nonbor.get_order_status(order_id)
-                    if status and status != "CHECKING":
-                        logger.info(f"Buyurtma #{order_id} statusi o'zgardi: {status}")
-                        return (False, None)
-
-                # Yangi TTS audio yaratish (yangilangan son bilan, xuddi shu til bilan)
-                new_audio_path = await self.tts.generate_order_message(new_count, lang=seller_lang)
-                logger.info(f"Yangi audio yaratildi: {new_count} ta buyurtma (til: {seller_lang})")
+            # Yangi TTS audio yaratish (yangilangan son bilan, xuddi shu til bilan)
+            new_audio_path = await self.tts.generate_order_message(new_count, lang=seller_lang)
+            logger.info(f"Yangi audio yaratildi: {new_count} ta buyurtma (til: {seller_lang})")
+
+            return (True, str(new_audio_path) if new_audio_path else None)
+
+        async def on_attempt(attempt: int, max_attempts: int):
+            pipeline.attempts = attempt
+            await self._on_call_attempt(attempt, max_attempts)
+
+        # Navbatda eng eski qabul qilinmagan buyurtma birinchi
+        order_times = [self.state.order_timestamps[oid] for oid in order_ids if oid in self.state.order_timestamps]
+        oldest_order = min(order_times).timestamp() if order_times else None
+
+        # Qo'ng'iroq qilish (per-business config bilan)
+        result = await self.call_manager.make_call_with_retry(
+            phone_number=seller_phone,
+            audio_file=str(audio_path),
+            on_attempt=on_attempt,
+            before_retry_check=check_orders_still_pending,
+            max_attempts_override=biz_max_attempts,
+            retry_interval_override=biz_retry_interval,
+            since=oldest_order,
+        )
 
-                return (True, str(new_audio_path) if new_audio_path else None)
+        # Buyurtmalarni belgilash
+        self.state.orders.mark_communicated(seller_phone, order_ids)
 
-            # Qo'ng'iroq qilish (per-business config bilan)
-            result = await self.call_manager.make_call_with_retry(
-                phone_number=seller_phone,
-                audio_file=str(audio_path),
-                on_attempt=self._on_call_attempt,
-                before_retry_check=check_orders_still_pending,
-                max_attempts_override=biz_max_attempts,
-                retry_interval_override=biz_retry_interval,
-            )
+        # Statistika
+        pipeline.answered = result.is_answered
+        self._seller_call_attempts[seller_phone] = pipeline.attempts
+        self._seller_call_answered[seller_phone] = result.is_answered
 
-            # Buyurtmalarni belgilash
-            if seller_phone not in self.state.last_communicated_orders:
-                self.state.last_communicated_orders[seller_phone] = []
-            existing_ids = set(self.state.last_communicated_orders[seller_phone])
-            new_ids = [oid for oid in order_ids if oid not in existing_ids]
-            self.state.last_communicated_orders[seller_phone].extend(new_ids)
-
-            # Statistika
-            self._seller_call_attempts[seller_phone] = self.state.call_attempts
-            self._seller_call_answered[seller_phone] = result.is_answered
-
-            if result.is_answered:
-                logger.info(f"[OK] Qo'ng'iroq muvaffaqiyatli: {seller_name} ({seller_phone})")
-                self.stats.record_call(
-                    phone=seller_phone,
-                    seller_name=seller_name,
-                    order_count=order_count,
-                    attempts=self.state.call_attempts,
-                    result=StatsCallResult.ANSWERED,
-                    order_ids=order_ids
-                )
-            else:
-                logger.warning(f"[X] Qo'ng'iroq javobsiz: {seller_name} ({seller_phone}) - {result.status}")
-                self.stats.record_call(
-                    phone=seller_phone,
-                    seller_name=seller_name,
-                    order_count=order_count,
-                    attempts=self.state.call_attempts,
-                    result=StatsCallResult.NO_ANSWER,
-                    order_ids=order_ids
-                )
-
-            return result
-
-        # Barcha sotuvchilarga PARALLEL qo'ng'iroq
-        call_tasks = [
-            call_single_seller(seller_phone, seller_data)
-            for seller_phone, seller_data in sellers.items()
-        ]
-        results = await asyncio.gather(*call_tasks, return_exceptions=True)
-
-        # Natijalarni log qilish
-        for r in results:
-            if isinstance(r, Exception):
-                logger.error(f"Qo'ng'iroq xatosi (istisno): {r}", exc_info=r)
-        answered_count = sum(1 for r in results if r and hasattr(r, 'is_answered') and r.is_answered)
-        failed_count = sum(1 for r in results if not r or not hasattr(r, 'is_answered') or not r.is_answered)
-        logger.info(f"Parallel qo'ng'iroq tugadi: [OK] {answered_count} javob, [X] {failed_count} javobsiz")
-
-        # Barcha qo'ng'iroqlar tugadi
-        # Qo'ng'iroq jarayonini tugatish
-        self.state.call_in_progress = False
-
-        # Yangi buyurtma qo'ng'iroqlari listini tozalash
-        self.state.new_order_ids_for_call = []
-
-        # MUHIM: Hozir BARCHA buyurtmalar allaqachon xabar berilgan yoki javob berilmagan urinishlar tugagan
-        # Tekshirish: hali xabar berilmagan buyurtmalar bormi?
-        uncommunicated_count = 0
-        all_communicated_ids = set()
-        for seller_phone, communicated_ids in self.state.last_communicated_orders.items():
-            all_communicated_ids.update(communicated_ids)
-
-        for order_id in self.state.pending_order_ids:
-            if order_id not in all_communicated_ids:
-                uncommunicated_count += 1
-
-        # Qo'ng'iroq tugadi - javob berilgan yoki berilmagan, state ni tozalash
-        # MUHIM: Har bir sotuvchi uchun call_attempts allaqachon yuqorida saqlangan (_seller_call_attempts)
-
-        if failed_count == 0:
-            logger.info("Barcha qo'ng'iroqlar muvaffaqiyatli, state tozalanmoqda")
-            # Telegram xabarlarni HECH QACHON O'CHIRMAYMIZ - ular doim qoladi
-            logger.info("Telegram xabarlar saqlanadi (o'chirilmaydi)")
-            # To'liq reset - javob berilgan, qayta qo'ng'iroq kerak emas
-            self.state.reset()
-        elif uncommunicated_count == 0:
-            # BARCHA buyurtmalar haqida xabar berilgan (javob berilgan yoki berilmagan)
-            # Qayta urinish kerak emas
-            logger.info(f"Barcha {len(self.state.pending_order_ids)} ta buyurtma haqida xabar berilgan, qayta qo'ng'iroq KERAK EMAS")
-            logger.info("180s timer davom etmoqda (Telegram uchun)")
-            # State ni tozalash (lekin last_communicated_orders saqlanadi)
-            self.state.reset()
+        if result.is_answered:
+            logger.info(f"[OK] Qo'ng'iroq muvaffaqiyatli: {seller_name} ({seller_phone})")
+            call_result = StatsCallResult.ANSWERED
         else:
-            # Javob berilmadi - QAYTA QO'NG'IROQ QILINMAYDI
-            # Faqat 2 marta qo'ng'iroq qilinadi, keyin to'xtaydi
-            logger.warning(f"{failed_count} ta qo'ng'iroqqa javob berilmadi, {uncommunicated_count} ta buyurtma uchun")
+            logger.warning(f"[X] Qo'ng'iroq javobsiz: {seller_name} ({seller_phone}) - {result.status}")
             logger.info("Qayta qo'ng'iroq qilinmaydi - 180s timer davom etmoqda (Telegram uchun)")
-            # State ni tozalash
-            self.state.reset()
+            call_result = StatsCallResult.NO_ANSWER
+        self.stats.record_call(
+            phone=seller_phone,
+            seller_name=seller_name,
+            order_count=order_count,
+            attempts=pipeline.attempts,
+            result=call_result,
+            order_ids=order_ids
+        )
+        return result
 
     async def _on_call_attempt(self, attempt: int, max_attempts: int):
         """Qo'ng'iroq urinishi callback"""
@@ -1734,14 +1864,13 @@ class AutodialerPro:
         order_ids = self.state.pending_order_ids
         logger.info(f"Telegram xabar yuborish: {len(order_ids)} ta buyurtma")
 
-        # Barcha buyurtmalarni olish
+        # Barcha buyurtmalarni olish (bitta snapshotdan)
         all_orders = []
-        for order_id in order_ids:
-            try:
-                order_data = await self.nonbor.get_order_full_data(order_id)
-                all_orders.append(order_data)
-            except Exception as e:
-                logger.error(f"Buyurtma #{order_id} ma'lumotini olishda xato: {e}")
+        try:
+            orders_full_data = await self.nonbor.get_orders_full_data(list(order_ids))
+            all_orders = [orders_full_data[oid] for oid in order_ids if oid in orders_full_data]
+        except Exception as e:
+            logger.error(f"Buyurtmalar ma'lumotini olishda xato: {e}")
 
         # Sotuvchi bo'yicha guruhlash
         sellers = {}
@@ -1864,7 +1993,15 @@ class AutodialerPro:
         logger.info(f"Qolgan buyurtmalar uchun Telegram: {len(old_order_ids)} ta (180s+ eski, jami: {len(order_ids)} ta)")
 
         # Barcha buyurtmalarni olish (faqat 180s+ eski)
-        # MUHIM: Avval keshdan olish, keyin API dan
+        # MUHIM: Avval keshdan olish, keyin API dan (keshda yo'qlari bitta snapshotdan)
+        uncached_ids = [oid for oid in old_order_ids if oid not in self._group_order_messages]
+        api_full_data: Dict[int, dict] = {}
+        if uncached_ids:
+            try:
+                api_full_data = await self.nonbor.get_orders_full_data(uncached_ids)
+            except Exception as e:
+                logger.error(f"Buyurtmalar ma'lumotini olishda xato: {e}")
+
         all_orders = []
         for order_id in old_order_ids:
             try:
@@ -1888,21 +2025,20 @@ class AutodialerPro:
                     }
                     # Sotuvchi ma'lumotlarini API dan olish (business_id orqali)
                     biz_id = cached.get("biz_id")
-                    if biz_id and hasattr(self.nonbor, '_businesses_cache'):
-                        for biz in self.nonbor._businesses_cache.values():
-                            if str(biz.get("id")) == str(biz_id):
-                                order_data["seller_name"] = biz.get("title", "Noma'lum")
-                                order_data["seller_address"] = biz.get("address", "Noma'lum")
-                                phone = biz.get("phone_number", "")
-                                if phone:
-                                    order_data["seller_phone"] = f"+{phone}" if not str(phone).startswith("+") else phone
-                                break
+                    biz = self.nonbor.businesses.get(str(biz_id)) if biz_id else None
+                    if biz:
+                        order_data["seller_name"] = biz.get("title", "Noma'lum")
+                        order_data["seller_address"] = biz.get("address", "Noma'lum")
+                        phone = biz.get("phone_number", "")
+                        if phone:
+                            order_data["seller_phone"] = f"+{phone}" if not str(phone).startswith("+") else phone
                     all_orders.append(order_data)
                     logger.debug(f"Buyurtma #{order_id} keshdan olindi")
                 else:
-                    # 2. Keshda yo'q - API dan olish
-                    order_data = await self.nonbor.get_order_full_data(order_id)
-                    all_orders.append(order_data)
+                    # 2. Keshda yo'q - API dan olingan
+                    order_data = api_full_data.get(order_id)
+                    if order_data:
+                        all_orders.append(order_data)
             except Exception as e:
                 logger.error(f"Buyurtma #{order_id} ma'lumotini olishda xato: {e}")
 
@@ -2013,7 +2149,7 @@ class AutodialerPro:
         logger.info("Telegram xabar yuborildi, 180s timer davom etmoqda")
 
     # DEPRECATED: _send_new_order_alert endi ishlatilmaydi
-    # Yangi buyurtmalar uchun 180s timer kutiladi - _check_and_process() da
+    # Yangi buyurtmalar uchun 180s timer kutiladi - rejalashtiruvchida (_on_telegram_deadline)
     # Eski kod saqlab qolindi - kelajakda kerak bo'lishi mumkin
     #
     # async def _send_new_order_alert(self, new_order_ids: list):
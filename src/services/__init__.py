@@ -1,5 +1,15 @@
 from .tts_service import TTSService
-from .nonbor_service import NonborService, NonborPoller
-from .asterisk_service import AsteriskAMI, CallManager, CallStatus, CallResult
+from .nonbor_service import (
+    NonborService, NonborPoller, NonborWebhookReceiver,
+    OrderStateTracker, OrderEvent, OrderEventType, OrderView,
+)
+from .asterisk_service import (
+    AsteriskAMI, AMIFrameParser, AMIPool, CallManager, CallStatus, CallResult, DialGovernor,
+)
 from .telegram_service import TelegramService, TelegramNotificationManager, TelegramStatsHandler
+from .callback_router import CallbackRouter
+from .scheduler_service import DeadlineScheduler, DeadlineHeap
+from .order_ledger import OrderLedger
+from .journal_service import JsonJournal
+from .persistence_service import PersistenceService, write_atomic
 from .stats_service import StatsService, CallResult as StatsCallResult, OrderResult
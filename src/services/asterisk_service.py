@@ -5,14 +5,58 @@ Qo'ng'iroqlarni boshqarish va kuzatish
 
 import logging
 import asyncio
+import heapq
+import itertools
+import os
 import re
-from typing import Optional, Callable, Dict, Any
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Optional, Callable, Dict, Any, List, Set
 from dataclasses import dataclass
 from enum import Enum
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+# Event -> AMI event klassi (Events action EventMask uchun)
+# Ro'yxatda yo'q event uchun handler bo'lsa - barcha klasslar yoqiladi
+AMI_EVENT_CLASSES = {
+    "OriginateResponse": "call",
+    "DialBegin": "call",
+    "DialEnd": "call",
+    "Hangup": "call",
+    "Newchannel": "call",
+    "Newstate": "call",
+    "VarSet": "dialplan",
+    "Newexten": "dialplan",
+    "PeerStatus": "system",
+    "ContactStatus": "system",
+    "Registry": "system",
+}
+
+
+# Trunk (sarkor-endpoint) cheklovlari: bir vaqtdagi kanallar va sekundiga originate
+DIAL_MAX_CHANNELS = int(os.getenv("DIAL_MAX_CHANNELS", "10"))
+DIAL_MAX_CPS = float(os.getenv("DIAL_MAX_CPS", "2"))
+# Javob berilgan qo'ng'iroq kanali Hangup gacha band - Hangup kelmasa shuncha sekunddan keyin bo'shatiladi
+DIAL_HANGUP_TIMEOUT = float(os.getenv("DIAL_HANGUP_TIMEOUT", "300"))
+
+# Bir nechta Asterisk serveri: "host1:5038,host2:5038" (bo'sh - faqat AMI_HOST)
+AMI_NODES = os.getenv("AMI_NODES", "")
+# Serverlar holatini tekshirish oralig'i (Ping + PJSIPQualify, sekundda)
+AMI_HEALTH_INTERVAL = float(os.getenv("AMI_HEALTH_INTERVAL", "30"))
+
+# Qo'ng'iroq navbati ustuvorligi (kichik - birinchi)
+DIAL_PRIORITY_ORDER = 0     # Qabul qilinmagan buyurtma (eng eskisi birinchi)
+DIAL_PRIORITY_REMINDER = 1  # Reja eslatmasi - eng oxirida
+
+# Har bir qo'ng'iroqni aniq kuzatish uchun kanal o'zgaruvchisi
+# (manager.conf: channelvars = AUTODIALER_CALL_ID - eventlarda ChanVariable bo'lib keladi)
+CALL_ID_VARIABLE = "AUTODIALER_CALL_ID"
+# Kanal yaratilmaganda (masalan, Originate Failure) Asterisk Uniqueid o'rniga shuni yuboradi
+AMI_NULL_UNIQUEID = "<null>"
+
 
 class CallStatus(Enum):
     """Qo'ng'iroq holatlari"""
@@ -45,6 +89,77 @@ class CallResult:
         return self.status in (CallStatus.FAILED, CallStatus.NO_ANSWER, CallStatus.BUSY)
 
 
+class AMIFrameParser:
+    """
+    AMI oqimi uchun inkremental (bytes) parser
+
+    - kelgan bo'laklar bitta bytearray ga qo'shiladi, freym chegaralari
+      (bo'sh qator) oxirgi tekshirilgan joydan davom ettirib qidiriladi
+    - bufer har feed() da bir marta qisqartiriladi (str + split dagi kabi
+      har freymda qolgan qismni nusxalash yo'q)
+    - wanted berilsa, keraksiz eventlar faqat "Event:" sarlavhasi o'qilib
+      tashlab yuboriladi (qolgan sarlavhalar decode qilinmaydi)
+    """
+
+    _EVENT_PREFIX = b"Event: "
+
+    def __init__(self, wanted: Optional[Callable[[str], bool]] = None):
+        """
+        Args:
+            wanted: Event nomi bo'yicha filtr (False - freym tashlanadi)
+        """
+        self.wanted = wanted
+        self._buffer = bytearray()
+        self._scan_from = 0
+        self.frames = 0
+        self.skipped = 0
+
+    def feed(self, data: bytes) -> List[Dict[str, str]]:
+        """Yangi bo'lakni qo'shish va to'liq freymlarni qaytarish"""
+        buffer = self._buffer
+        buffer += data
+        messages: List[Dict[str, str]] = []
+        start = 0
+        # Chegara oldingi bo'lak oxirida boshlangan bo'lishi mumkin (3 bayt orqaga)
+        search = max(self._scan_from - 3, 0)
+        while True:
+            end = buffer.find(b"\r\n\r\n", search)
+            if end < 0:
+                break
+            if end > start:
+                message = self._parse(buffer, start, end)
+                if message is not None:
+                    messages.append(message)
+            start = search = end + 4
+        if start:
+            del buffer[:start]
+        self._scan_from = len(buffer)
+        return messages
+
+    def _parse(self, buffer: bytearray, start: int, end: int) -> Optional[Dict[str, str]]:
+        self.frames += 1
+        if self.wanted is not None and buffer.startswith(self._EVENT_PREFIX, start, end):
+            name_start = start + len(self._EVENT_PREFIX)
+            line_end = buffer.find(b"\r\n", name_start, end)
+            name = buffer[name_start:line_end if line_end >= 0 else end]
+            if not self.wanted(name.decode("utf-8", errors="ignore").strip()):
+                self.skipped += 1
+                return None
+
+        # Freym bir marta decode qilinadi, qatorlar str da ajratiladi
+        data: Dict[str, str] = {}
+        for line in buffer[start:end].decode("utf-8", errors="ignore").split("\r\n"):
+            key, sep, value = line.partition(": ")
+            if sep:
+                data[key] = value
+        return data
+
+    def reset(self):
+        """Buferni tozalash (qayta ulanishda)"""
+        self._buffer.clear()
+        self._scan_from = 0
+
+
 class AsteriskAMI:
     """
     Asterisk Manager Interface (AMI) Client
@@ -52,6 +167,9 @@ class AsteriskAMI:
     Qo'ng'iroq boshlash va kuzatish
     """
 
+    # Bir o'qishda olinadigan maksimal hajm (event portlashida kamroq syscall)
+    READ_SIZE = 65536
+
     def __init__(
         self,
         host: str = "127.0.0.1",
@@ -65,15 +183,25 @@ class AsteriskAMI:
         self.username = username
         self.password = password
         self.wsl_sounds_path = wsl_sounds_path
+        self.name = f"{host}:{port}"
 
         self._reader: Optional[asyncio.StreamReader] = None
         self._writer: Optional[asyncio.StreamWriter] = None
         self._connected = False
         self._action_id = 0
         self._pending_actions: Dict[str, asyncio.Future] = {}
-        self._event_handlers: Dict[str, Callable] = {}
+        self._event_handlers: Dict[str, List[Callable]] = {}
+        self._server_filters: Set[str] = set()  # Joriy sessiyada qo'shilgan Filter lar
+        self._subscribe_task: Optional[asyncio.Task] = None
+        self._subscriptions_dirty = False  # Obuna o'tishi davomida yangi handler qo'shildi
+        self._events_dispatched = 0
+        self._events_dropped = 0
+        self._handler_errors = 0
+        # Shu server orqali boshlangan, hali tugamagan qo'ng'iroqlar (call_id)
+        self._active_call_ids: Set[str] = set()
         self._read_task: Optional[asyncio.Task] = None
         self._ping_task: Optional[asyncio.Task] = None
+        self._parser = AMIFrameParser(wanted=self._wants_event)
 
         logger.info(f"Asterisk AMI yaratildi: {host}:{port}")
 
@@ -101,6 +229,10 @@ class AsteriskAMI:
             # Ping taskini boshlash (har 30 soniyada keepalive)
             self._ping_task = asyncio.create_task(self._ping_loop())
 
+            # Faqat handler bor eventlarga obuna bo'lish
+            self._server_filters.clear()
+            await self._apply_subscriptions()
+
             logger.info("AMI ulanish muvaffaqiyatli")
             return True
 
@@ -265,13 +397,19 @@ class AsteriskAMI:
             except Exception as e:
                 logger.warning(f"Ping xatosi: {e}")
 
-    async def _send_action(self, action: str, **params) -> Optional[Dict]:
-        """AMI action yuborish"""
+    async def _send_action(self, action: str, action_id: Optional[str] = None, **params) -> Optional[Dict]:
+        """
+        AMI action yuborish
+
+        Args:
+            action_id: Tashqi ActionID (masalan, qo'ng'iroq ID si); berilmasa - ketma-ket raqam
+        """
         if not self._writer:
             return None
 
-        self._action_id += 1
-        action_id = str(self._action_id)
+        if action_id is None:
+            self._action_id += 1
+            action_id = str(self._action_id)
 
         # Action yaratish
         lines = [f"Action: {action}", f"ActionID: {action_id}"]
@@ -301,13 +439,13 @@ class AsteriskAMI:
 
     async def _read_events(self):
         """AMI eventlarni o'qish"""
-        buffer = ""
+        self._parser.reset()
 
         while self._connected:
             try:
                 # Timeout bilan o'qish (60 soniya - ping har 30s yuboriladi)
                 data = await asyncio.wait_for(
-                    self._reader.read(4096),
+                    self._reader.read(self.READ_SIZE),
                     timeout=60.0
                 )
 
@@ -316,11 +454,8 @@ class AsteriskAMI:
                     self._connected = False
                     break
 
-                buffer += data.decode('utf-8', errors='ignore')
-
                 # Xabarlarni ajratish
-                while "\r\n\r\n" in buffer:
-                    message, buffer = buffer.split("\r\n\r\n", 1)
+                for message in self._parser.feed(data):
                     await self._handle_message(message)
 
             except asyncio.TimeoutError:
@@ -330,9 +465,6 @@ class AsteriskAMI:
             except asyncio.CancelledError:
                 logger.debug("AMI read task bekor qilindi")
                 break
-            except UnicodeDecodeError as e:
-                logger.error(f"AMI decode xatosi: {e}")
-                continue
             except Exception as e:
                 logger.error(f"AMI read xatosi: {e}", exc_info=True)
                 self._connected = False
@@ -345,16 +477,13 @@ class AsteriskAMI:
         if self._ping_task and not self._ping_task.done():
             self._ping_task.cancel()
 
-    async def _handle_message(self, message: str):
-        """AMI xabarni qayta ishlash"""
-        lines = message.strip().split("\r\n")
-        data = {}
-
-        for line in lines:
-            if ": " in line:
-                key, value = line.split(": ", 1)
-                data[key] = value
+    def _wants_event(self, event_name: str) -> bool:
+        """Event to'liq parse qilinishi kerakmi"""
+        # Kutilayotgan action bo'lsa - uning javob eventlari ham kerak bo'lishi mumkin
+        return event_name in self._event_handlers or bool(self._pending_actions)
 
+    async def _handle_message(self, data: Dict[str, str]):
+        """AMI xabarni qayta ishlash"""
         # Response
         if "ActionID" in data and data.get("ActionID") in self._pending_actions:
             action_id = data["ActionID"]
@@ -365,13 +494,109 @@ class AsteriskAMI:
 
         # Event
         if "Event" in data:
-            event_name = data["Event"]
-            if event_name in self._event_handlers:
-                await self._event_handlers[event_name](data)
+            handlers = self._event_handlers.get(data["Event"])
+            if not handlers:
+                self._events_dropped += 1
+                return
+            self._events_dispatched += 1
+            # Nusxa - handler ichida obuna o'zgarishi mumkin
+            for handler in tuple(handlers):
+                try:
+                    await handler(data)
+                except Exception as e:
+                    # Bitta handler xatosi boshqalarini va o'qish siklini to'xtatmaydi
+                    self._handler_errors += 1
+                    logger.error(f"AMI event handler xatosi ({data['Event']}): {e}", exc_info=True)
 
     def on_event(self, event_name: str, handler: Callable):
-        """Event handler qo'shish"""
-        self._event_handlers[event_name] = handler
+        """Event handler qo'shish (bitta eventga bir nechta handler bo'lishi mumkin)"""
+        handlers = self._event_handlers.setdefault(event_name, [])
+        if handler not in handlers:
+            handlers.append(handler)
+        self._schedule_subscriptions()
+
+    def off_event(self, event_name: str, handler: Callable):
+        """Event handlerni olib tashlash"""
+        handlers = self._event_handlers.get(event_name)
+        if handlers and handler in handlers:
+            handlers.remove(handler)
+            if not handlers:
+                del self._event_handlers[event_name]
+        # Asterisk Filter larni o'chirib bo'lmaydi - keraksiz eventlar parserda tashlanadi
+
+    def _schedule_subscriptions(self):
+        """Ulangan bo'lsa, obunani fonda yangilash"""
+        if not self._connected:
+            return
+        # Ishlab turgan task o'tishini tugatgach bayroqni ko'rib yana bir o'tish qiladi
+        self._subscriptions_dirty = True
+        if self._subscribe_task and not self._subscribe_task.done():
+            return
+        try:
+            self._subscribe_task = asyncio.get_running_loop().create_task(self._apply_subscriptions())
+        except RuntimeError:
+            # Event loop yo'q - connect() da qo'llaniladi
+            pass
+
+    def _event_mask(self) -> str:
+        """Handlerlardan kelib chiqqan EventMask"""
+        if not self._event_handlers:
+            return "off"
+        classes = set()
+        for event_name in self._event_handlers:
+            event_class = AMI_EVENT_CLASSES.get(event_name)
+            if event_class is None:
+                return "on"
+            classes.add(event_class)
+        return ",".join(sorted(classes))
+
+    async def _apply_subscriptions(self):
+        """
+        Events / Filter action lari orqali server tomonida filtrlash
+
+        EventMask faqat kerakli klasslarni yoqadi, Filter esa klass ichida ham
+        faqat handler bor eventlarni o'tkazadi. Filter uchun ruxsat bo'lmasa
+        (manager.conf da system write yo'q) - parserdagi filtr yetarli.
+
+        O'tish davomida on_event chaqirilsa - yangi handlerlar uchun yana bir o'tish qilinadi.
+        """
+        while self._connected:
+            self._subscriptions_dirty = False
+            mask = self._event_mask()
+            try:
+                response = await self._send_action("Events", EventMask=mask)
+                if not response or response.get("Response") == "Error":
+                    error = response.get("Message", "Unknown error") if response else "No response"
+                    logger.warning(f"AMI Events action xatosi: {error}")
+
+                # Yangi eventlar bitta Filter da (qisman qo'shilib qolmasligi uchun)
+                new_events = sorted(set(self._event_handlers) - self._server_filters)
+                if new_events:
+                    response = await self._send_action("Filter", Operation="Add", Filter=f"Event: ({'|'.join(new_events)})")
+                    if response and response.get("Response") == "Success":
+                        self._server_filters.update(new_events)
+                    else:
+                        error = response.get("Message", "Unknown error") if response else "No response"
+                        logger.debug(f"AMI Filter qo'shilmadi: {error}")
+            except Exception as e:
+                logger.warning(f"AMI obuna xatosi: {e}")
+                return
+            logger.info(f"AMI obuna: EventMask={mask}, filtrlar={sorted(self._server_filters)}")
+            if not self._subscriptions_dirty:
+                return
+
+    def get_stats(self) -> dict:
+        """Event statistikasi"""
+        return {
+            "frames": self._parser.frames,
+            "events_dispatched": self._events_dispatched,
+            # Parserda tashlangan + handler topilmagan eventlar
+            "events_dropped": self._parser.skipped + self._events_dropped,
+            "handler_errors": self._handler_errors,
+            "subscriptions": {name: len(handlers) for name, handlers in self._event_handlers.items()},
+            "server_filters": sorted(self._server_filters),
+            "active_channels": self.active_channels,
+        }
 
     def _windows_to_wsl_path(self, windows_path: str) -> str:
         """Windows pathni WSL pathga convert qilish"""
@@ -386,7 +611,8 @@ class AsteriskAMI:
         phone_number: str,
         audio_file: str,
         context: str = "autodialer-dynamic",
-        variables: Dict[str, str] = None
+        variables: Dict[str, str] = None,
+        call_id: Optional[str] = None
     ) -> CallResult:
         """
         Qo'ng'iroq boshlash
@@ -396,6 +622,7 @@ class AsteriskAMI:
             audio_file: Audio fayl yo'li yoki nomi
             context: Asterisk context
             variables: Qo'shimcha o'zgaruvchilar
+            call_id: Qo'ng'iroq ID si - ActionID va AUTODIALER_CALL_ID kanal o'zgaruvchisi sifatida
 
         Returns:
             CallResult
@@ -420,6 +647,8 @@ class AsteriskAMI:
 
         # Channel variable
         channel_vars = f"AUDIO_FILE={wsl_audio_path}"
+        if call_id:
+            channel_vars += f",{CALL_ID_VARIABLE}={call_id}"
         if variables:
             for k, v in variables.items():
                 channel_vars += f",{k}={v}"
@@ -428,6 +657,7 @@ class AsteriskAMI:
 
         response = await self._send_action(
             "Originate",
+            action_id=call_id,
             Channel=f"PJSIP/{clean_number}@sarkor-endpoint",
             Context=context,
             Exten=audio_filename,  # Audio fayl nomi (hash) - dialplan uchun
@@ -440,12 +670,34 @@ class AsteriskAMI:
 
         if response and response.get("Response") == "Success":
             logger.info(f"Qo'ng'iroq yuborildi: {clean_number}")
+            if call_id:
+                self._active_call_ids.add(call_id)
             return CallResult(status=CallStatus.ORIGINATING)
         else:
             error = response.get("Message", "Unknown error") if response else "No response"
             logger.error(f"Qo'ng'iroq xatosi: {error}")
             return CallResult(status=CallStatus.FAILED, error=error)
 
+    def call_finished(self, call_id: str):
+        """Qo'ng'iroq tugadi - kanal bo'shadi"""
+        self._active_call_ids.discard(call_id)
+
+    @property
+    def active_channels(self) -> int:
+        """Shu server orqali faol qo'ng'iroqlar soni"""
+        return len(self._active_call_ids)
+
+    async def ping(self) -> bool:
+        """Ping action - server javob beryaptimi"""
+        if not self._connected:
+            return False
+        try:
+            response = await self._send_action("Ping")
+        except Exception as e:
+            logger.debug(f"AMI ping xatosi ({self.name}): {e}")
+            return False
+        return bool(response) and response.get("Response") == "Success"
+
     async def check_registration(self) -> bool:
         """SIP registratsiya holatini tekshirish"""
         # PJSIPQualify orqali endpoint mavjudligini tekshirish
@@ -463,6 +715,333 @@ class AsteriskAMI:
         return False
 
 
+class AMIPool:
+    """
+    Bir nechta Asterisk serveriga AMI ulanishlar hovuzi
+
+    AsteriskAMI bilan bir xil interfeys (CallManager uchun farqi yo'q):
+    - originate_call - sog'lom serverlardan eng kam faol kanallisiga
+    - on_event - handler barcha serverlarga ulanadi; Uniqueid/DestUniqueid/Linkedid
+      server nomi bilan belgilanadi (serverlar orasida to'qnashmasligi uchun),
+      qo'ng'iroqning o'zi AUTODIALER_CALL_ID / ActionID bo'yicha topiladi
+    - har AMI_HEALTH_INTERVAL da Ping + PJSIPQualify: javob bermagan server
+      "down" deb belgilanadi va qayta ulanishga harakat qilinadi
+    """
+
+    _NODE_ID_HEADERS = ("Uniqueid", "DestUniqueid", "Linkedid", "DestLinkedid")
+
+    def __init__(self, nodes: List[AsteriskAMI], health_interval: float = AMI_HEALTH_INTERVAL):
+        if not nodes:
+            raise ValueError("AMIPool uchun kamida bitta server kerak")
+        self.nodes = nodes
+        self.health_interval = health_interval
+        self._healthy: Dict[str, bool] = {node.name: False for node in nodes}
+        self._call_nodes: Dict[str, AsteriskAMI] = {}  # call_id -> server
+        self._wrappers: Dict[tuple, Callable] = {}  # (event, handler, server) -> server handleri
+        self._health_task: Optional[asyncio.Task] = None
+        self._rotation = 0
+
+        logger.info(f"AMI hovuzi yaratildi: {', '.join(node.name for node in nodes)}")
+
+    @classmethod
+    def from_spec(
+        cls,
+        spec: str,
+        username: str,
+        password: str,
+        default_port: int = 5038,
+        **kwargs
+    ) -> "AMIPool":
+        """AMI_NODES ko'rinishidagi ro'yxatdan (host1:5038,host2) hovuz yaratish"""
+        nodes = []
+        for item in spec.split(","):
+            item = item.strip()
+            if not item:
+                continue
+            host, _, port = item.partition(":")
+            nodes.append(AsteriskAMI(
+                host=host,
+                port=int(port) if port else default_port,
+                username=username,
+                password=password
+            ))
+        return cls(nodes, **kwargs)
+
+    @property
+    def _connected(self) -> bool:
+        """Kamida bitta sog'lom server bor"""
+        return any(self._is_available(node) for node in self.nodes)
+
+    def _is_available(self, node: AsteriskAMI) -> bool:
+        return node._connected and self._healthy[node.name]
+
+    def _set_health(self, node: AsteriskAMI, healthy: bool):
+        previous = self._healthy[node.name]
+        self._healthy[node.name] = healthy
+        if previous and not healthy:
+            logger.warning(f"AMI server DOWN: {node.name} (faol kanallar: {node.active_channels})")
+        elif healthy and not previous:
+            logger.info(f"AMI server UP: {node.name}")
+
+    async def connect(self) -> bool:
+        """Barcha serverlarga parallel ulanish"""
+        results = await asyncio.gather(*(node.connect() for node in self.nodes), return_exceptions=True)
+        for node, result in zip(self.nodes, results):
+            self._set_health(node, result is True)
+        if not self._health_task:
+            self._health_task = asyncio.create_task(self._health_loop())
+        connected = sum(1 for node in self.nodes if self._is_available(node))
+        logger.info(f"AMI hovuzi: {connected}/{len(self.nodes)} ta server ulandi")
+        return connected > 0
+
+    async def disconnect(self):
+        """Barcha serverlardan uzilish"""
+        if self._health_task:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+        await asyncio.gather(*(node.disconnect() for node in self.nodes), return_exceptions=True)
+        for node in self.nodes:
+            self._healthy[node.name] = False
+
+    async def reconnect(self) -> bool:
+        """Ishlamayotgan serverlarni qayta tekshirish / ulash"""
+        await asyncio.gather(*(self._check_node(node) for node in self.nodes if not self._is_available(node)))
+        return self._connected
+
+    async def _check_node(self, node: AsteriskAMI):
+        """Ping + PJSIPQualify; uzilgan bo'lsa qayta ulanish"""
+        try:
+            healthy = node._connected or await node.reconnect()
+            if healthy:
+                healthy = await node.ping() and await node.check_registration()
+        except Exception as e:
+            logger.debug(f"AMI server tekshiruv xatosi ({node.name}): {e}")
+            healthy = False
+        self._set_health(node, healthy)
+
+    async def _health_loop(self):
+        while True:
+            try:
+                await asyncio.sleep(self.health_interval)
+                await asyncio.gather(*(self._check_node(node) for node in self.nodes))
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"AMI hovuzi tekshiruv xatosi: {e}")
+
+    async def check_registration(self) -> bool:
+        """Kamida bitta serverda SIP registratsiya bor"""
+        results = await asyncio.gather(
+            *(node.check_registration() for node in self.nodes if node._connected),
+            return_exceptions=True
+        )
+        return any(result is True for result in results)
+
+    # --- Eventlar ---
+
+    def _node_handler(self, node: AsteriskAMI, handler: Callable) -> Callable:
+        prefix = f"{node.name}/"
+
+        async def dispatch(data: dict):
+            data = dict(data)
+            data["AMINode"] = node.name
+            for header in self._NODE_ID_HEADERS:
+                if data.get(header) and data[header] != AMI_NULL_UNIQUEID:
+                    data[header] = prefix + data[header]
+            await handler(data)
+
+        return dispatch
+
+    def on_event(self, event_name: str, handler: Callable):
+        """Event handlerni barcha serverlarga qo'shish"""
+        for node in self.nodes:
+            key = (event_name, handler, node.name)
+            if key not in self._wrappers:
+                self._wrappers[key] = self._node_handler(node, handler)
+            node.on_event(event_name, self._wrappers[key])
+
+    def off_event(self, event_name: str, handler: Callable):
+        """Event handlerni barcha serverlardan olib tashlash"""
+        for node in self.nodes:
+            wrapper = self._wrappers.pop((event_name, handler, node.name), None)
+            if wrapper:
+                node.off_event(event_name, wrapper)
+
+    # --- Qo'ng'iroqlar ---
+
+    def _candidates(self) -> List[AsteriskAMI]:
+        """Sog'lom serverlar - eng kam faol kanallisi birinchi (teng bo'lsa navbatma-navbat)"""
+        self._rotation += 1
+        count = len(self.nodes)
+        available = [
+            (node.active_channels, (index - self._rotation) % count, node)
+            for index, node in enumerate(self.nodes) if self._is_available(node)
+        ]
+        return [node for _, _, node in sorted(available, key=lambda item: item[:2])]
+
+    async def originate_call(
+        self,
+        phone_number: str,
+        audio_file: str,
+        context: str = "autodialer-dynamic",
+        variables: Dict[str, str] = None,
+        call_id: Optional[str] = None
+    ) -> CallResult:
+        """Qo'ng'iroqni eng kam yuklangan sog'lom serverdan boshlash"""
+        result = CallResult(status=CallStatus.FAILED, error="No healthy AMI node")
+        for node in self._candidates():
+            result = await node.originate_call(phone_number, audio_file, context, variables, call_id=call_id)
+            if result.status != CallStatus.FAILED:
+                if call_id:
+                    self._call_nodes[call_id] = node
+                return result
+            if result.error == "AMI not connected":
+                # Originate yuborilmadi - keyingi serverga o'tish xavfsiz
+                self._set_health(node, False)
+                continue
+            if result.error == "No response" and call_id:
+                # Javob kutish vaqti tugadi, lekin qo'ng'iroq serverda boshlangan bo'lishi mumkin -
+                # shu call_id bilan boshqa serverdan qayta yuborilsa raqam ikki marta jiringlaydi.
+                # Server holatini health tekshiruvi aniqlaydi
+                logger.warning(f"AMI {node.name} Originate ga javob bermadi (call={call_id}), boshqa serverga o'tilmaydi")
+            # Raqam / trunk xatosi - boshqa serverda ham takrorlanadi
+            return result
+        if result.error == "No healthy AMI node":
+            logger.error("Qo'ng'iroq xatosi: sog'lom AMI server yo'q")
+        return result
+
+    def call_finished(self, call_id: str):
+        """Qo'ng'iroq tugadi - server kanali bo'shadi"""
+        node = self._call_nodes.pop(call_id, None)
+        if node:
+            node.call_finished(call_id)
+
+    @property
+    def active_channels(self) -> int:
+        return sum(node.active_channels for node in self.nodes)
+
+    def get_stats(self) -> dict:
+        """Serverlar holati va event statistikasi"""
+        return {
+            node.name: {"healthy": self._is_available(node), **node.get_stats()}
+            for node in self.nodes
+        }
+
+
+class DialGovernor:
+    """
+    Trunk ga chiquvchi qo'ng'iroqlar regulyatori
+
+    - bir vaqtda ko'pi bilan max_channels ta faol kanal
+    - originate lar orasida kamida 1 / max_cps soniya (CPS)
+    - navbat ustuvorlik bo'yicha: avval buyurtma qo'ng'iroqlari (eng eski
+      qabul qilinmagan buyurtma birinchi), reja eslatmalari oxirida
+    - navbatda kutish vaqti statistikasi (get_stats)
+
+    Portlashda qo'ng'iroqlar navbatda kutadi, trunk CHANUNAVAIL/CONGESTION qaytarmaydi.
+
+    Ishlatish:
+        await governor.acquire(DIAL_PRIORITY_ORDER, since=order_ts)
+        await ami.originate_call(...)
+        ...  # Hangup gacha kanal band
+        governor.release()
+    """
+
+    def __init__(self, max_channels: int = DIAL_MAX_CHANNELS, max_cps: float = DIAL_MAX_CPS):
+        self.max_channels = max(1, max_channels)
+        self.interval = 1.0 / max_cps if max_cps > 0 else 0.0
+        self._waiters: List[tuple] = []  # (priority, since, seq, future)
+        self._seq = itertools.count()
+        self._active = 0
+        self._next_originate = 0.0
+        self._granted = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._wait_by_priority: Dict[int, List[float]] = {}  # priority -> [soni, jami]
+
+    async def acquire(self, priority: int = DIAL_PRIORITY_ORDER, since: Optional[float] = None) -> float:
+        """
+        Kanal olish (navbat + CPS)
+
+        Args:
+            priority: DIAL_PRIORITY_ORDER yoki DIAL_PRIORITY_REMINDER
+            since: Shu ustuvorlik ichida tartib (eng eski buyurtma vaqti, epoch); None - navbatga kelgan vaqt
+
+        Returns:
+            Navbatda kutilgan vaqt (soniya)
+        """
+        enqueued = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, since if since is not None else time.time(), next(self._seq), future))
+        self._grant()
+        try:
+            start_at = await future
+            delay = start_at - time.monotonic()
+            if delay > 0:
+                # CPS - originate vaqti keldi (kanal allaqachon band qilingan)
+                await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+        waited = time.monotonic() - enqueued
+        self._granted += 1
+        self._wait_total += waited
+        self._wait_max = max(self._wait_max, waited)
+        bucket = self._wait_by_priority.setdefault(priority, [0, 0.0])
+        bucket[0] += 1
+        bucket[1] += waited
+        if waited >= 5:
+            logger.info(f"Qo'ng'iroq navbatda {waited:.1f}s kutdi (faol: {self._active}/{self.max_channels}, navbat: {len(self._waiters)})")
+        return waited
+
+    def release(self):
+        """Kanalni bo'shatish"""
+        self._active = max(0, self._active - 1)
+        self._grant()
+
+    def _grant(self):
+        """Bo'sh kanallarni navbat boshidagilarga berish"""
+        while self._waiters and self._active < self.max_channels:
+            future = heapq.heappop(self._waiters)[-1]
+            if future.done():
+                # Kutish bekor qilingan
+                continue
+            now = time.monotonic()
+            start_at = max(now, self._next_originate)
+            self._next_originate = start_at + self.interval
+            self._active += 1
+            future.set_result(start_at)
+
+    @asynccontextmanager
+    async def slot(self, priority: int = DIAL_PRIORITY_ORDER, since: Optional[float] = None):
+        """acquire / release context manager"""
+        await self.acquire(priority, since)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def get_stats(self) -> dict:
+        """Navbat statistikasi"""
+        return {
+            "active": self._active,
+            "max_channels": self.max_channels,
+            "queued": sum(1 for waiter in self._waiters if not waiter[-1].done()),
+            "granted": self._granted,
+            "wait_avg": round(self._wait_total / self._granted, 3) if self._granted else 0.0,
+            "wait_max": round(self._wait_max, 3),
+            "wait_avg_by_priority": {
+                priority: round(total / count, 3) for priority, (count, total) in self._wait_by_priority.items()
+            },
+        }
+
+
 class CallManager:
     """
     Qo'ng'iroq boshqaruvchisi
@@ -477,25 +1056,71 @@ class CallManager:
         self,
         ami: AsteriskAMI,
         max_attempts: int = 2,
-        retry_interval: int = 30
+        retry_interval: int = 30,
+        governor: Optional[DialGovernor] = None
     ):
         self.ami = ami
         self.max_attempts = max_attempts
         self.retry_interval = retry_interval
+        self.governor = governor
 
         self._current_attempt = 0
         self._last_call_result: Optional[CallResult] = None
         self._call_in_progress = False
         self._call_completed_event = asyncio.Event()
 
-        # PARALLEL qo'ng'iroqlar uchun - {phone_number: {event, result}}
+        # PARALLEL qo'ng'iroqlar uchun - {call_id: {event, result, phone, number}}
         self._active_calls: Dict[str, dict] = {}
+        # Asterisk kanal Uniqueid -> call_id
+        self._uniqueid_calls: Dict[str, str] = {}
+        # Natijasi olingan, lekin kanali hali ochiq qo'ng'iroqlar (Hangup kutilmoqda)
+        self._hangup_tasks: Set[asyncio.Task] = set()
 
         # Event handlers
         self.ami.on_event("OriginateResponse", self._on_originate_response)
+        self.ami.on_event("Newchannel", self._on_new_channel)
         self.ami.on_event("Hangup", self._on_hangup)
         self.ami.on_event("DialEnd", self._on_dial_end)
 
+    @staticmethod
+    def _event_call_id(data: dict, prefix: str = "") -> Optional[str]:
+        """Eventdagi AUTODIALER_CALL_ID (ChanVariable / DestChanVariable) qiymati"""
+        marker = f"{CALL_ID_VARIABLE}="
+        header = f"{prefix}ChanVariable"
+        for key, value in data.items():
+            # Asterisk 12+: "ChanVariable: X=1", eski versiyalar: "ChanVariable(PJSIP/...): X=1"
+            if key.startswith(header) and value.startswith(marker):
+                return value[len(marker):] or None
+        return None
+
+    def _bind_uniqueid(self, uniqueid: str, call_id: Optional[str]):
+        """Kanal Uniqueid ni faol qo'ng'iroqqa bog'lash"""
+        if not uniqueid or uniqueid == AMI_NULL_UNIQUEID or not call_id or call_id not in self._active_calls:
+            return
+        self._uniqueid_calls[uniqueid] = call_id
+        self._active_calls[call_id]["uniqueids"].add(uniqueid)
+
+    def _resolve_call_id(self, data: dict) -> Optional[str]:
+        """Event qaysi qo'ng'iroqqa tegishli - avval aniq ID lar bo'yicha"""
+        for call_id in (
+            self._event_call_id(data, "Dest"),
+            self._event_call_id(data),
+            self._uniqueid_calls.get(data.get("DestUniqueid", "")),
+            self._uniqueid_calls.get(data.get("Uniqueid", "")),
+        ):
+            if call_id and call_id in self._active_calls:
+                return call_id
+        return None
+
+    def _finish_call(self, call_id: str, result: CallResult) -> bool:
+        """Qo'ng'iroq natijasini o'rnatish (birinchi natija yakuniy)"""
+        call_data = self._active_calls.get(call_id)
+        if call_data is None or call_data["event"].is_set():
+            return False
+        call_data["result"] = result
+        call_data["event"].set()
+        return True
+
     async def _on_originate_response(self, data: dict):
         """Originate natijasi"""
         response = data.get("Response", "")
@@ -503,6 +1128,16 @@ class CallManager:
 
         logger.debug(f"OriginateResponse: {response}, Reason: {reason}")
 
+        # ActionID = call_id (originate_call da berilgan)
+        call_id = data.get("ActionID", "")
+        if call_id in self._active_calls:
+            self._bind_uniqueid(data.get("Uniqueid", ""), call_id)
+            if response == "Failure":
+                self._active_calls[call_id]["originate_failed"] = True
+                self._finish_call(call_id, CallResult(status=CallStatus.FAILED, error=reason))
+                logger.info(f"Originate muvaffaqiyatsiz: call={call_id}, reason={reason}")
+            return
+
         if response == "Failure":
             self._last_call_result = CallResult(
                 status=CallStatus.FAILED,
@@ -510,21 +1145,31 @@ class CallManager:
             )
             self._call_completed_event.set()
 
+    async def _on_new_channel(self, data: dict):
+        """Yangi kanal - Uniqueid ni qo'ng'iroqqa bog'lash"""
+        self._bind_uniqueid(data.get("Uniqueid", ""), self._event_call_id(data))
+
     async def _on_hangup(self, data: dict):
-        """Qo'ng'iroq tugatildi"""
+        """Kanal yopildi - qo'ng'iroqning barcha kanallari yopilsa trunk kanali bo'shaydi"""
         channel = data.get("Channel", "")
         cause = data.get("Cause", "")
         cause_txt = data.get("Cause-txt", "")
 
         logger.debug(f"Hangup: channel={channel}, cause={cause} - {cause_txt}")
 
-        # Hangup eventini e'tiborsiz qoldiramiz
-        # DialEnd eventi qo'ng'iroq natijasini to'g'ri beradi
-        # Hangup ko'p marta kelishi mumkin (Local channel, PJSIP channel)
-        pass
+        # Natija DialEnd dan olinadi (Hangup bir qo'ng'iroqda bir necha marta keladi)
+        call_id = self._resolve_call_id(data)
+        if call_id is None:
+            return
+        uniqueid = data.get("Uniqueid", "")
+        self._bind_uniqueid(uniqueid, call_id)
+        call_data = self._active_calls[call_id]
+        call_data["hungup"].add(uniqueid)
+        if call_data["uniqueids"] <= call_data["hungup"]:
+            call_data["hangup"].set()
 
     async def _on_dial_end(self, data: dict):
-        """Dial tugadi - parallel qo'ng'iroqlarni qo'llab-quvvatlaydi"""
+        """Dial tugadi - natija call_id bo'yicha aniq qo'ng'iroqqa yoziladi"""
         dial_status = data.get("DialStatus", "")
         channel = data.get("Channel", "")
         dest_channel = data.get("DestChannel", "")
@@ -542,38 +1187,47 @@ class CallManager:
 
         result = CallResult(
             status=status_map.get(dial_status, CallStatus.FAILED),
-            dial_status=dial_status
+            dial_status=dial_status,
+            channel=dest_channel or channel
         )
 
-        # Telefon raqamini channel dan olish (PJSIP/998912345678@sarkor-endpoint)
-        phone_match = None
-        for ch in [dest_channel, channel]:
-            if ch and "PJSIP/" in ch:
-                match = re.search(r'PJSIP/(\d+)@', ch)
-                if match:
-                    phone_match = match.group(1)
-                    break
+        call_id = self._resolve_call_id(data)
+        if call_id is None and self._active_calls:
+            # ID topilmadi (channelvars sozlanmagan) - raqam bo'yicha, faqat bir ma'noli bo'lsa
+            call_id = self._match_by_number(dest_channel, channel)
 
-        # PARALLEL qo'ng'iroq - tegishli call ni topish
-        if phone_match and phone_match in self._active_calls:
-            call_data = self._active_calls[phone_match]
-            call_data["result"] = result
-            call_data["event"].set()
-            logger.info(f"Parallel call completed: {phone_match} -> {dial_status}")
+        if call_id is not None:
+            self._bind_uniqueid(data.get("DestUniqueid", ""), call_id)
+            if self._finish_call(call_id, result):
+                logger.info(f"Parallel call completed: {self._active_calls[call_id]['number']} -> {dial_status} (call={call_id})")
         elif self._active_calls:
-            # Channel bo'sh kelganda - faol qo'ng'iroqni topib signal qilish
-            for number, call_data in self._active_calls.items():
-                if not call_data["event"].is_set():
-                    call_data["result"] = result
-                    call_data["event"].set()
-                    logger.info(f"DialEnd fallback match: {number} -> {dial_status}")
-                    break
+            logger.warning(f"DialEnd hech bir qo'ng'iroqqa bog'lanmadi: channel={dest_channel or channel}, status={dial_status}")
         else:
             # Eski usul - bitta qo'ng'iroq uchun
             self._last_call_result = result
             if self._call_in_progress:
                 self._call_completed_event.set()
 
+    def _match_by_number(self, *channels: str) -> Optional[str]:
+        """Kanal nomidagi raqam bo'yicha tugallanmagan qo'ng'iroq (faqat bitta bo'lsa)"""
+        # Telefon raqamini channel dan olish (PJSIP/998912345678@sarkor-endpoint)
+        number = None
+        for ch in channels:
+            if ch and "PJSIP/" in ch:
+                match = re.search(r'PJSIP/(\d+)', ch)
+                if match:
+                    number = match.group(1)
+                    break
+        candidates = [
+            call_id for call_id, call_data in self._active_calls.items()
+            if not call_data["event"].is_set() and (number is None or call_data["number"] == number)
+        ]
+        if len(candidates) == 1:
+            return candidates[0]
+        if candidates:
+            logger.warning(f"DialEnd: {len(candidates)} ta mos qo'ng'iroq (raqam={number}) - aniq ID kerak")
+        return None
+
     async def make_call_with_retry(
         self,
         phone_number: str,
@@ -582,6 +1236,8 @@ class CallManager:
         before_retry_check: Callable = None,
         max_attempts_override: int = None,
         retry_interval_override: int = None,
+        priority: int = DIAL_PRIORITY_ORDER,
+        since: Optional[float] = None,
     ) -> CallResult:
         """
         Qo'ng'iroq qilish (retry bilan)
@@ -595,6 +1251,8 @@ class CallManager:
                 - (True, new_audio_path) qaytarsa - yangi audio bilan davom etadi
             max_attempts_override: Per-business urinishlar soni (None = global)
             retry_interval_override: Per-business qayta qo'ng'iroq intervali (None = global)
+            priority: Navbat ustuvorligi (DialGovernor)
+            since: Eng eski qabul qilinmagan buyurtma vaqti (epoch) - navbat tartibi uchun
 
         Returns:
             Yakuniy CallResult
@@ -614,7 +1272,7 @@ class CallManager:
                 f"Qo'ng'iroq urinishi {self._current_attempt}/{effective_max}: {phone_number}"
             )
 
-            result = await self._make_single_call(phone_number, current_audio)
+            result = await self._make_single_call(phone_number, current_audio, priority=priority, since=since)
 
             if result.is_answered:
                 logger.info(f"Qo'ng'iroq muvaffaqiyatli: {phone_number}")
@@ -647,62 +1305,114 @@ class CallManager:
         logger.warning(f"Barcha urinishlar tugadi: {phone_number}")
         return self._last_call_result or CallResult(status=CallStatus.FAILED)
 
-    async def _make_single_call(
+    async def _dial(
         self,
         phone_number: str,
+        clean_number: str,
         audio_file: str,
-        parallel: bool = True
+        release: Optional[Callable[[], None]] = None
     ) -> CallResult:
-        """Bitta qo'ng'iroq qilish - parallel qo'llab-quvvatlanadi"""
-
-        # Telefon raqamini tozalash (faqat raqamlar)
-        clean_number = re.sub(r'[^\d]', '', phone_number)
-        if clean_number.startswith('998') and len(clean_number) == 12:
-            pass  # OK
-        elif len(clean_number) == 9:
-            clean_number = '998' + clean_number
+        """
+        Originate va natijani kutish (parallel rejim)
 
-        if parallel:
-            # PARALLEL rejim - har bir qo'ng'iroq mustaqil
-            call_event = asyncio.Event()
-            self._active_calls[clean_number] = {
-                "event": call_event,
-                "result": None,
-                "phone": phone_number
-            }
+        Natija DialEnd da qaytariladi, lekin javob berilgan qo'ng'iroq kanali audio
+        ijrosi davomida band - release (trunk kanali) va call_finished Hangup da chaqiriladi.
+        """
+        # Har bir qo'ng'iroq o'z ID si bilan
+        # (bir raqamga bir vaqtda ikki qo'ng'iroq bo'lsa ham natijalar aralashmaydi)
+        call_id = uuid.uuid4().hex
+        call_event = asyncio.Event()
+        call_data = {
+            "event": call_event,
+            "result": None,
+            "phone": phone_number,
+            "number": clean_number,
+            "uniqueids": set(),
+            "hungup": set(),  # Hangup kelgan Uniqueid lar
+            "hangup": asyncio.Event(),  # Barcha kanallar yopildi
+            "originate_failed": False,  # Originate Failure - kanal yaratilmagan
+        }
+        self._active_calls[call_id] = call_data
 
+        try:
             # AMI ulanish tekshirish
             if not self.ami._connected:
                 logger.warning("AMI ulanish yo'q, qayta ulanish...")
                 reconnected = await self.ami.reconnect()
                 if not reconnected:
-                    del self._active_calls[clean_number]
                     logger.error("AMI qayta ulanish muvaffaqiyatsiz")
                     return CallResult(status=CallStatus.FAILED, error="AMI reconnect failed")
 
             # Qo'ng'iroq boshlash
-            result = await self.ami.originate_call(phone_number, audio_file)
+            result = await self.ami.originate_call(phone_number, audio_file, call_id=call_id)
 
             if result.status == CallStatus.FAILED:
-                del self._active_calls[clean_number]
                 return result
 
             # Natija kutish
             try:
                 await asyncio.wait_for(call_event.wait(), timeout=45)
             except asyncio.TimeoutError:
-                logger.warning(f"Qo'ng'iroq timeout: {phone_number}")
-                self._active_calls[clean_number]["result"] = CallResult(
+                logger.warning(f"Qo'ng'iroq timeout: {phone_number} (call={call_id})")
+                self._active_calls[call_id]["result"] = CallResult(
                     status=CallStatus.NO_ANSWER,
                     error="Timeout"
                 )
 
-            # Natijani olish va tozalash
-            call_result = self._active_calls.get(clean_number, {}).get("result")
-            if clean_number in self._active_calls:
-                del self._active_calls[clean_number]
+            return self._active_calls[call_id]["result"] or CallResult(status=CallStatus.FAILED, error="No result")
+        finally:
+            # Originate muvaffaqiyatsiz - kanal yo'q, trunk kanali darhol bo'shatiladi
+            if call_data["uniqueids"] and not call_data["hangup"].is_set() and not call_data["originate_failed"]:
+                # Kanal hali ochiq (masalan, audio ijro etilmoqda) - Hangup kutiladi
+                task = asyncio.create_task(self._release_on_hangup(call_id, release))
+                self._hangup_tasks.add(task)
+                task.add_done_callback(self._hangup_tasks.discard)
+            else:
+                self._release_call(call_id, release)
+
+    async def _release_on_hangup(self, call_id: str, release: Optional[Callable[[], None]]):
+        """Qo'ng'iroqning barcha kanallari yopilguncha kutib, kanalni bo'shatish"""
+        try:
+            await asyncio.wait_for(self._active_calls[call_id]["hangup"].wait(), timeout=DIAL_HANGUP_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(f"Hangup {DIAL_HANGUP_TIMEOUT:.0f}s ichida kelmadi, kanal bo'shatildi (call={call_id})")
+        finally:
+            self._release_call(call_id, release)
+
+    def _release_call(self, call_id: str, release: Optional[Callable[[], None]]):
+        """Qo'ng'iroqni tozalash va trunk kanalini bo'shatish"""
+        self.ami.call_finished(call_id)
+        call_data = self._active_calls.pop(call_id, None)
+        if call_data:
+            for uniqueid in call_data["uniqueids"]:
+                self._uniqueid_calls.pop(uniqueid, None)
+        if release:
+            release()
+
+    async def _make_single_call(
+        self,
+        phone_number: str,
+        audio_file: str,
+        parallel: bool = True,
+        priority: int = DIAL_PRIORITY_ORDER,
+        since: Optional[float] = None
+    ) -> CallResult:
+        """Bitta qo'ng'iroq qilish - parallel qo'llab-quvvatlanadi"""
+
+        # Telefon raqamini tozalash (faqat raqamlar)
+        clean_number = re.sub(r'[^\d]', '', phone_number)
+        if clean_number.startswith('998') and len(clean_number) == 12:
+            pass  # OK
+        elif len(clean_number) == 9:
+            clean_number = '998' + clean_number
 
-            return call_result or CallResult(status=CallStatus.FAILED, error="No result")
+        if parallel:
+            # PARALLEL rejim - har bir qo'ng'iroq mustaqil
+            # Trunk regulyatori - kanal va CPS navbati (kanal Hangup gacha band, _dial bo'shatadi)
+            if self.governor:
+                await self.governor.acquire(priority, since)
+            release = self.governor.release if self.governor else None
+            return await self._dial(phone_number, clean_number, audio_file, release)
 
         else:
             # KETMA-KET rejim (eski usul)
@@ -0,0 +1,135 @@
+"""
+Callback Router
+===============
+
+Inline tugma callback_data larini handlerlarga yo'naltirish:
+- aniq kalit (menu_back) - dict orqali O(1)
+- prefiks (biz_page_5) - belgilar trie si orqali, eng uzun mos prefiks;
+  qidiruv narxi callback_data uzunligiga bog'liq, marshrutlar soniga emas
+- parametrlar turlari bo'yicha o'qiladi (biz_rp_3_1 -> (3, 1))
+- har bir marshrut qaysi rollarga ruxsat etilgani bilan ro'yxatdan o'tadi
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Rollar
+ROLE_ADMIN = "admin"
+ROLE_OWNER = "owner"  # Tasdiqlangan biznes egasi
+ALL_ROLES = frozenset({ROLE_ADMIN, ROLE_OWNER})
+
+_TERMINAL = "\0"  # Trie tugunida shu prefiksda tugaydigan marshrutlar
+
+
+@dataclass(frozen=True)
+class CallbackRoute:
+    """Bitta marshrut"""
+    key: str
+    handler: Callable[..., Awaitable[Any]]
+    prefix: bool = False
+    params: Tuple[type, ...] = ()
+    roles: FrozenSet[str] = ALL_ROLES
+
+    def parse(self, data: str) -> Optional[tuple]:
+        """callback_data dan parametrlarni o'qish (mos kelmasa None)"""
+        if not self.prefix:
+            return ()
+        suffix = data[len(self.key):]
+        if not self.params:
+            return ()
+        if len(self.params) == 1:
+            parts = [suffix]
+        else:
+            parts = suffix.split("_", len(self.params) - 1)
+            if len(parts) != len(self.params):
+                return None
+        try:
+            return tuple(kind(part) for kind, part in zip(self.params, parts))
+        except (ValueError, TypeError):
+            return None
+
+
+class CallbackRouter:
+    """
+    Deklarativ callback router
+
+    Ishlatish:
+        router = CallbackRouter()
+        router.exact("menu_back", self._show_main_stats, roles={ROLE_ADMIN})
+        router.prefix("biz_rp_", self._show_region_page, params=(int, int))
+        match = router.resolve("biz_rp_3_1", ROLE_ADMIN)
+        if match:
+            route, args = match
+            await route.handler(message_id, chat_id, *args)
+    """
+
+    def __init__(self):
+        self._exact: Dict[str, List[CallbackRoute]] = {}
+        self._trie: Dict[str, Any] = {}
+        self._count = 0
+
+    def exact(self, key: str, handler: Callable[..., Awaitable[Any]], roles=ALL_ROLES):
+        """Aniq kalit bo'yicha marshrut"""
+        route = CallbackRoute(key=key, handler=handler, roles=frozenset(roles))
+        self._exact.setdefault(key, []).append(route)
+        self._count += 1
+        return route
+
+    def prefix(
+        self,
+        key: str,
+        handler: Callable[..., Awaitable[Any]],
+        params: Tuple[type, ...] = (),
+        roles=ALL_ROLES
+    ):
+        """Prefiks bo'yicha marshrut (qolgan qism params turlari bo'yicha o'qiladi)"""
+        route = CallbackRoute(key=key, handler=handler, prefix=True, params=tuple(params), roles=frozenset(roles))
+        node = self._trie
+        for char in key:
+            node = node.setdefault(char, {})
+        node.setdefault(_TERMINAL, []).append(route)
+        self._count += 1
+        return route
+
+    def _candidates(self, data: str) -> List[CallbackRoute]:
+        """Mos marshrutlar: avval aniq kalit, keyin eng uzun prefiksdan qisqasiga"""
+        routes = list(self._exact.get(data, ()))
+        node = self._trie
+        matched: List[List[CallbackRoute]] = []
+        for char in data:
+            node = node.get(char)
+            if node is None:
+                break
+            if _TERMINAL in node:
+                matched.append(node[_TERMINAL])
+        for group in reversed(matched):
+            routes.extend(group)
+        return routes
+
+    def match_key(self, data: str) -> Optional[str]:
+        """callback_data qaysi marshrut kalitiga mos (metrikalar uchun)"""
+        candidates = self._candidates(data)
+        return candidates[0].key if candidates else None
+
+    def resolve(self, data: str, role: str) -> Optional[Tuple[CallbackRoute, tuple]]:
+        """
+        Rolga ruxsat etilgan va parametrlari to'g'ri o'qilgan birinchi marshrut
+
+        Returns:
+            (route, args) yoki None (marshrut yo'q, ruxsat yo'q yoki parametr noto'g'ri)
+        """
+        for route in self._candidates(data):
+            if role not in route.roles:
+                continue
+            args = route.parse(data)
+            if args is None:
+                logger.debug(f"Callback parametrlari noto'g'ri: {data}")
+                return None
+            return route, args
+        return None
+
+    def __len__(self) -> int:
+        return self._count
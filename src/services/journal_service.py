@@ -0,0 +1,214 @@
+"""
+Jurnal (append-only) Saqlash Servisi
+====================================
+
+Kalit -> yozuv lug'atini har o'zgarishda butun faylni qayta yozmasdan saqlash:
+- har bir o'zgarish jurnal fayliga bitta JSON qator sifatida qo'shiladi
+- jurnal ma'lum hajmga yetganda snapshotga siqiladi (temp fayl + atomik rename)
+- ishga tushganda snapshot yuklanib, ustidan jurnal qayta o'ynaladi
+
+Barcha disk amallari event loop dan tashqarida (worker thread) bajariladi.
+Yozuvlar idempotent (put / patch / del), shuning uchun siqish paytida jurnal va
+snapshot ustma-ust tushsa ham qayta o'ynash natijasi to'g'ri bo'ladi.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from .persistence_service import write_atomic
+
+logger = logging.getLogger(__name__)
+
+# Jurnal shuncha yozuvga yetganda snapshotga siqiladi
+JOURNAL_COMPACT_EVERY = int(os.getenv("JOURNAL_COMPACT_EVERY", "500"))
+
+
+class JsonJournal:
+    """
+    {int kalit: dict yozuv} uchun append-only jurnal
+
+    Ishlatish:
+        journal = JsonJournal(Path("data/items.json"))
+        items = journal.load()                 # snapshot + jurnal
+        journal.attach(lambda: items)          # siqish uchun joriy holat
+        await journal.start()
+        journal.put(1, {...}); journal.patch(1, {"status": "X"}); journal.delete(1)
+        await journal.close()                  # oxirgi yozuvlar + siqish
+    """
+
+    def __init__(
+        self,
+        snapshot_path: Path,
+        journal_path: Optional[Path] = None,
+        compact_every: int = JOURNAL_COMPACT_EVERY,
+        fsync: bool = False
+    ):
+        """
+        Args:
+            snapshot_path: Snapshot fayli (JSON obyekt)
+            journal_path: Jurnal fayli (JSONL), standart: <snapshot>.journal
+            compact_every: Shuncha yozuvdan keyin snapshotga siqish
+            fsync: Har bir yozuvdan keyin os.fsync (sekinroq, lekin quvvat uzilishiga chidamli)
+        """
+        self.snapshot_path = Path(snapshot_path)
+        self.journal_path = Path(journal_path) if journal_path else self.snapshot_path.with_suffix(".journal")
+        self.compact_every = compact_every
+        self.fsync = fsync
+
+        self._state_getter: Optional[Callable[[], Dict[int, dict]]] = None
+        self._queue: List[str] = []
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._running = False
+        self._since_compact = 0
+
+    # --- Yuklash ---
+
+    def load(self) -> Dict[int, dict]:
+        """Snapshot + jurnalni qayta o'ynash (ishga tushganda, bir marta)"""
+        data: Dict[int, dict] = {}
+        if self.snapshot_path.exists():
+            try:
+                with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                    raw = json.load(f)
+                for k, v in raw.items():
+                    try:
+                        data[int(k)] = v
+                    except (ValueError, TypeError):
+                        logger.warning(f"Noto'g'ri kalit o'tkazib yuborildi: {k}")
+            except Exception as e:
+                logger.error(f"Snapshot o'qishda xato ({self.snapshot_path.name}): {e}")
+
+        replayed = 0
+        if self.journal_path.exists():
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                        self._apply(data, record)
+                        replayed += 1
+                    except (ValueError, KeyError, TypeError):
+                        # Uzilib qolgan oxirgi qator (crash) - e'tiborsiz qoldiriladi
+                        logger.warning(f"Jurnalda buzilgan yozuv o'tkazib yuborildi ({self.journal_path.name})")
+        self._since_compact = replayed
+        if replayed:
+            logger.info(f"Jurnal qayta o'ynaldi: {replayed} ta yozuv ({self.journal_path.name})")
+        return data
+
+    @staticmethod
+    def _apply(data: Dict[int, dict], record: dict):
+        op = record["op"]
+        key = int(record["id"])
+        if op == "put":
+            data[key] = record["entry"]
+        elif op == "patch":
+            entry = data.get(key)
+            if entry is not None:
+                entry.update(record["fields"])
+        elif op == "del":
+            data.pop(key, None)
+
+    # --- Yozish ---
+
+    def attach(self, state_getter: Callable[[], Dict[int, dict]]):
+        """Siqish uchun joriy holatni qaytaruvchi funksiya"""
+        self._state_getter = state_getter
+
+    def put(self, key: int, entry: dict):
+        """Yozuvni to'liq saqlash"""
+        self._append({"op": "put", "id": key, "entry": entry})
+
+    def patch(self, key: int, fields: dict):
+        """Yozuvning ayrim maydonlarini yangilash"""
+        self._append({"op": "patch", "id": key, "fields": fields})
+
+    def delete(self, key: int):
+        """Yozuvni o'chirish"""
+        self._append({"op": "del", "id": key})
+
+    def _append(self, record: dict):
+        # Serializatsiya hozir (keyinchalik o'zgaradigan dict lar emas, aynan shu holat yoziladi)
+        self._queue.append(json.dumps(record, ensure_ascii=False))
+        self._wakeup.set()
+
+    # --- Fon yozuvchi ---
+
+    async def start(self):
+        """Fon yozuvchini ishga tushirish"""
+        if self._task:
+            return
+        self._running = True
+        self._task = asyncio.create_task(self._writer_loop())
+
+    async def _writer_loop(self):
+        while self._running:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Jurnal yozishda xato ({self.journal_path.name}): {e}")
+                await asyncio.sleep(1)
+
+    async def flush(self):
+        """Navbatdagi yozuvlarni jurnalga yozish, kerak bo'lsa siqish"""
+        if self._queue:
+            batch, self._queue = self._queue, []
+            try:
+                await asyncio.to_thread(self._write_lines, batch)
+            except Exception:
+                # Yozilmagan yozuvlarni navbat boshiga qaytarish
+                self._queue[:0] = batch
+                raise
+            self._since_compact += len(batch)
+
+        if self._since_compact >= self.compact_every:
+            await self.compact()
+
+    def _write_lines(self, lines: List[str]):
+        self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+
+    async def compact(self):
+        """Joriy holatni snapshotga yozish va jurnalni tozalash"""
+        if self._state_getter is None:
+            return
+        # Holat nusxasi event loop da olinadi (yozuvlar keyinchalik o'zgarishi mumkin)
+        payload = json.dumps(
+            {str(k): v for k, v in self._state_getter().items()},
+            ensure_ascii=False
+        )
+        await asyncio.to_thread(self._write_snapshot, payload)
+        self._since_compact = 0
+        logger.debug(f"Jurnal siqildi: {self.snapshot_path.name}")
+
+    def _write_snapshot(self, payload: str):
+        write_atomic(self.snapshot_path, payload)
+        # Snapshot tayyor - jurnal endi kerak emas (siqishdan keyingi yozuvlar qaytadan qo'shiladi)
+        with open(self.journal_path, "w", encoding="utf-8"):
+            pass
+
+    async def close(self):
+        """Fon yozuvchini to'xtatish: qolgan yozuvlarni yozish va siqish"""
+        self._running = False
+        if self._task:
+            # Bekor qilinmaydi - thread dagi yozuv yarim qolmasligi uchun sikl o'zi tugaydi
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        try:
+            await self.flush()
+            await self.compact()
+        except Exception as e:
+            logger.error(f"Jurnalni yopishda xato ({self.journal_path.name}): {e}")
@@ -4,11 +4,18 @@ Buyurtmalarni kuzatish va boshqarish (amoCRM o'rniga)
 """
 
 import logging
+import math
 import os
+import random
+import time
 import aiohttp
 import asyncio
-from typing import List, Dict, Optional, Set
-from datetime import datetime
+from aiohttp import web
+from typing import List, Dict, Optional, Set, Callable, Awaitable, Iterable
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timezone, timedelta
+from enum import Enum
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +23,669 @@ NONBOR_BASE_URL = os.getenv("NONBOR_BASE_URL", "http://192.168.127.28:10000")
 NONBOR_SECRET = os.getenv("NONBOR_SECRET", "nonbor-secret-key")
 # Domain ni base_url dan olish (orders endpoint uchun)
 NONBOR_DOMAIN = NONBOR_BASE_URL.split("/api/")[0]  # http://192.168.127.28:10010
+# Buyurtmalar snapshot yangiligi (soniyada) - shu oraliqda qayta yuklanmaydi
+NONBOR_ORDERS_TTL = float(os.getenv("NONBOR_ORDERS_TTL", "2"))
+# Bizneslar katalogi yangilanish oralig'i (soniyada)
+NONBOR_BUSINESSES_TTL = float(os.getenv("NONBOR_BUSINESSES_TTL", "300"))
+# Buyurtmalar ro'yxati sahifalari: sahifa hajmi (0 - server standarti) va parallel yuklash
+NONBOR_ORDERS_PAGE_SIZE = int(os.getenv("NONBOR_ORDERS_PAGE_SIZE", "0"))
+NONBOR_ORDERS_PAGE_CONCURRENCY = int(os.getenv("NONBOR_ORDERS_PAGE_CONCURRENCY", "4"))
+# Xavfsizlik chegarasi - noto'g'ri "count" cheksiz sahifa yuklatmasligi uchun
+NONBOR_ORDERS_MAX_PAGES = int(os.getenv("NONBOR_ORDERS_MAX_PAGES", "50"))
+# Moslashuvchan polling: CHECKING bo'lsa tez, bo'sh paytda sekinlashadi
+NONBOR_POLL_ADAPTIVE = os.getenv("NONBOR_POLL_ADAPTIVE", "false").lower() in ("true", "1", "yes")
+NONBOR_POLL_MIN_INTERVAL = float(os.getenv("NONBOR_POLL_MIN_INTERVAL", "2"))
+NONBOR_POLL_MAX_INTERVAL = float(os.getenv("NONBOR_POLL_MAX_INTERVAL", "30"))
+# Push/webhook qabul qilish rejimi (polling sekin tekshiruv sifatida qoladi)
+NONBOR_WEBHOOK_ENABLED = os.getenv("NONBOR_WEBHOOK_ENABLED", "false").lower() in ("true", "1", "yes")
+NONBOR_WEBHOOK_HOST = os.getenv("NONBOR_WEBHOOK_HOST", "0.0.0.0")
+NONBOR_WEBHOOK_PORT = int(os.getenv("NONBOR_WEBHOOK_PORT", "8085"))
+NONBOR_WEBHOOK_PATH = os.getenv("NONBOR_WEBHOOK_PATH", "/nonbor/orders")
+# Webhook yoqilganda polling oralig'i (soniyada) - faqat tekshiruv uchun
+NONBOR_WEBHOOK_RECONCILE_INTERVAL = float(os.getenv("NONBOR_WEBHOOK_RECONCILE_INTERVAL", "30"))
+
+
+def normalize_title(title: Optional[str]) -> str:
+    """Biznes nomini solishtirish uchun normallashtirish"""
+    return (title or "").strip().lower()
+
+
+def normalize_phone(phone: Optional[str]) -> str:
+    """
+    Telefon raqamini solishtirish uchun normallashtirish (faqat raqamlar)
+
+    901234567, +998 90 123-45-67, 998901234567 -> 998901234567
+    """
+    digits = "".join(ch for ch in str(phone or "") if ch.isdigit())
+    if len(digits) == 9:
+        digits = f"998{digits}"
+    return digits
+
+
+# O'zbekiston vaqt zonasi (UTC+5)
+UZ_TZ = timezone(timedelta(hours=5))
+
+
+def _first(*values):
+    """Birinchi bo'sh bo'lmagan qiymat"""
+    for value in values:
+        if value:
+            return value
+    return ""
+
+
+def parse_api_datetime(value) -> Optional[datetime]:
+    """API vaqtini (ISO, 'Z' bilan ham) UTC datetime ga o'tkazish"""
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+@dataclass(frozen=True, slots=True)
+class OrderView:
+    """
+    Buyurtmaning ixcham, oldindan normallashtirilgan ko'rinishi
+
+    Xom API dict dan bir marta (har snapshotda) hosil qilinadi - telefon qidirish
+    zanjiri va vaqt parse qilish har bir iste'molchida takrorlanmaydi.
+    """
+    id: int
+    state: str
+    business_id: Optional[int]
+    business_title: str
+    client_name: str
+    client_phone: str          # Ko'rsatish uchun (API dagi ko'rinishda)
+    client_phone_norm: str     # Solishtirish uchun (faqat raqamlar, 998...)
+    product_name: str
+    quantity: int
+    price: float               # So'mda (API tiyinda beradi)
+    delivery_address: str
+    delivery_lat: str
+    delivery_lon: str
+    delivery_time: str         # Ko'rsatish uchun: "29.01 11:00" (UZ vaqti)
+    delivery_method: str
+    payment_method: str
+    is_planned: bool
+    planned_raw: str
+    planned_at_utc: Optional[datetime]
+    planned_at_uz: Optional[datetime]
+    created_at_utc: Optional[datetime]
+
+    @classmethod
+    def from_order(cls, order: Dict) -> "OrderView":
+        """Xom API buyurtmasidan OrderView yaratish"""
+        business = order.get("business") or {}
+        user = order.get("user") or {}
+        delivery = order.get("delivery") or {}
+        items = order.get("order_item") or order.get("items") or []
+
+        product_name = ""
+        quantity = 1
+        if items:
+            first_item = items[0]
+            product = first_item.get("product") or {}
+            product_name = product.get("title", "") or product.get("name", "")
+            quantity = first_item.get("count", 1) or first_item.get("quantity", 1)
+
+        # Telefon raqami - user, delivery, order yoki boshqa maydonlardan
+        client_phone = str(_first(
+            user.get("phone"), user.get("phone_number"), user.get("mobile"), user.get("tel"),
+            delivery.get("phone"), delivery.get("phone_number"), delivery.get("recipient_phone"),
+            order.get("phone"), order.get("client_phone"), order.get("customer_phone"),
+        ))
+
+        # Rejalashtirilgan vaqt (2026-01-29T11:00:00+05:00 -> 29.01 11:00, UZ vaqtida)
+        planned_raw = order.get("planned_datetime") or order.get("planned_time") or ""
+        planned_at_utc = parse_api_datetime(planned_raw)
+        planned_at_uz = planned_at_utc.astimezone(UZ_TZ) if planned_at_utc else None
+        if planned_at_uz:
+            delivery_time = planned_at_uz.strftime("%d.%m %H:%M")
+        elif planned_raw:
+            delivery_time = str(planned_raw)
+        else:
+            delivery_time = str(_first(
+                delivery.get("time"), delivery.get("scheduled_time"), delivery.get("delivery_time"),
+                order.get("delivery_time"), order.get("scheduled_at"),
+            ))
+
+        business_id = business.get("id")
+        try:
+            business_id = int(business_id) if business_id not in (None, "") else None
+        except (TypeError, ValueError):
+            business_id = None
+
+        return cls(
+            id=order.get("id"),
+            state=(order.get("state") or "CHECKING").upper(),
+            business_id=business_id,
+            business_title=business.get("title", "") or "",
+            client_name=f"{user.get('first_name', '')} {user.get('last_name', '')}".strip() or "Noma'lum",
+            client_phone=client_phone,
+            client_phone_norm=normalize_phone(client_phone),
+            product_name=product_name,
+            quantity=quantity,
+            price=(order.get("total_price", 0) or 0) / 100,
+            delivery_address=delivery.get("address") or delivery.get("location") or "",
+            delivery_lat=delivery.get("lat") or delivery.get("latitude") or "",
+            delivery_lon=delivery.get("lon") or delivery.get("longitude") or delivery.get("lng") or "",
+            delivery_time=delivery_time,
+            delivery_method=order.get("delivery_method", "") or "",
+            payment_method=order.get("payment_method", "") or "",
+            is_planned=bool(order.get("is_planned") or order.get("is_planner")),
+            planned_raw=str(planned_raw) if planned_raw else "",
+            planned_at_utc=planned_at_utc,
+            planned_at_uz=planned_at_uz,
+            created_at_utc=parse_api_datetime(order.get("created_at")),
+        )
+
+    def with_phone(self, phone: str) -> "OrderView":
+        """Telefon raqami qo'shilgan nusxa (masalan, /orders/{id}/ dan olinganda)"""
+        return replace(self, client_phone=phone, client_phone_norm=normalize_phone(phone))
+
+    def to_order_data(self, status: str = None) -> Dict:
+        """Guruh xabari va JSON saqlash uchun order_data dict"""
+        return {
+            "order_number": str(self.id),
+            "status": status or self.state,
+            "seller_name": self.business_title or "Noma'lum",
+            "client_name": self.client_name,
+            "client_phone": self.client_phone,
+            "product_name": self.product_name,
+            "quantity": self.quantity,
+            "price": self.price,
+            "delivery_address": self.delivery_address,
+            "delivery_lat": self.delivery_lat,
+            "delivery_lon": self.delivery_lon,
+            "delivery_time": self.delivery_time,
+            "delivery_method": self.delivery_method,
+            "payment_method": self.payment_method,
+            "is_planned": self.is_planned,
+            "planned_datetime_raw": self.planned_raw,
+        }
+
+
+class OrderSnapshotCache:
+    """
+    Buyurtmalar ro'yxati snapshoti - single-flight + qisqa TTL
+
+    - Bir vaqtda kelgan so'rovlar bitta HTTP so'rovni baham ko'radi
+    - Natija `ttl` soniya davomida qayta ishlatiladi
+    - Xato (None) natija keshlanmaydi
+    - hits / misses / coalesced hisoblagichlari
+    """
+
+    def __init__(self, fetcher: Callable[[], Awaitable[Optional[List[Dict]]]], ttl: float = NONBOR_ORDERS_TTL):
+        """
+        Args:
+            fetcher: Haqiqiy API so'rovini bajaruvchi coroutine funksiya
+            ttl: Snapshot yangiligi (soniyada), 0 - keshlamaslik
+        """
+        self._fetcher = fetcher
+        self.ttl = ttl
+
+        self._orders: Optional[List[Dict]] = None
+        self._fetched_at: float = 0.0
+        self._inflight: Optional[asyncio.Future] = None
+
+        # Hisoblagichlar
+        self.hits = 0        # Keshdan berildi
+        self.misses = 0      # API ga so'rov yuborildi
+        self.coalesced = 0   # Jarayondagi so'rovga qo'shildi
+
+    @property
+    def age(self) -> Optional[float]:
+        """Snapshot yoshi (soniyada) yoki None agar hali yuklanmagan bo'lsa"""
+        if self._orders is None:
+            return None
+        return time.monotonic() - self._fetched_at
+
+    def is_fresh(self) -> bool:
+        """Snapshot hali yangi (TTL ichida) mi"""
+        age = self.age
+        return age is not None and age < self.ttl
+
+    def invalidate(self):
+        """Snapshotni eskirgan deb belgilash (keyingi so'rov API ga boradi)"""
+        self._fetched_at = 0.0
+
+    async def get(self, force: bool = False) -> Optional[List[Dict]]:
+        """
+        Buyurtmalar snapshotini olish
+
+        Args:
+            force: True bo'lsa TTL e'tiborsiz qoldiriladi (jarayondagi so'rovga baribir qo'shiladi)
+
+        Returns:
+            Buyurtmalar ro'yxati (nusxa) yoki None agar xato yuz bergan bo'lsa
+        """
+        if not force and self.is_fresh():
+            self.hits += 1
+            return list(self._orders)
+
+        if self._inflight is not None and not self._inflight.done():
+            self.coalesced += 1
+            orders = await asyncio.shield(self._inflight)
+            return list(orders) if orders is not None else None
+
+        self.misses += 1
+        self._inflight = asyncio.ensure_future(self._refresh())
+        # shield - bitta chaqiruvchi bekor qilinsa, boshqalar uchun so'rov davom etadi
+        orders = await asyncio.shield(self._inflight)
+        return list(orders) if orders is not None else None
+
+    async def _refresh(self) -> Optional[List[Dict]]:
+        """API dan yangi snapshot yuklash"""
+        orders = await self._fetcher()
+        if orders is not None:
+            self._orders = orders
+            self._fetched_at = time.monotonic()
+        return orders
+
+    def get_stats(self) -> Dict:
+        """Kesh statistikasi (monitoring uchun)"""
+        total = self.hits + self.misses + self.coalesced
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": round((self.hits + self.coalesced) / total, 3) if total else 0.0,
+            "ttl": self.ttl,
+            "age": round(self.age, 2) if self.age is not None else None,
+        }
+
+
+@dataclass(frozen=True)
+class BusinessIndex:
+    """Bizneslar indekslari - bir marta quriladi, butunlay almashtiriladi"""
+    businesses: List[Dict] = field(default_factory=list)
+    by_id: Dict[int, Dict] = field(default_factory=dict)
+    by_title: Dict[str, Dict] = field(default_factory=dict)
+    by_phone: Dict[str, Dict] = field(default_factory=dict)
+    by_region: Dict[str, List[Dict]] = field(default_factory=dict)
+    by_district: Dict[str, Dict[str, List[Dict]]] = field(default_factory=dict)
+
+    @classmethod
+    def build(cls, businesses: List[Dict]) -> "BusinessIndex":
+        """Bizneslar ro'yxatidan barcha indekslarni qurish"""
+        by_id, by_title, by_phone = {}, {}, {}
+        by_region: Dict[str, List[Dict]] = {}
+        by_district: Dict[str, Dict[str, List[Dict]]] = {}
+
+        for biz in businesses:
+            biz_id = biz.get("id")
+            if biz_id is not None:
+                by_id[biz_id] = biz
+
+            # Bir xil nom/raqam bo'lsa - birinchisi qoladi (eski chiziqli qidiruv bilan mos)
+            title = normalize_title(biz.get("title"))
+            if title:
+                by_title.setdefault(title, biz)
+            phone = normalize_phone(biz.get("phone_number"))
+            if phone:
+                by_phone.setdefault(phone, biz)
+
+            region = biz.get("region_name_uz") or "Noma'lum"
+            district = biz.get("district_name_uz") or "Noma'lum"
+            by_region.setdefault(region, []).append(biz)
+            by_district.setdefault(region, {}).setdefault(district, []).append(biz)
+
+        return cls(
+            businesses=list(businesses),
+            by_id=by_id,
+            by_title=by_title,
+            by_phone=by_phone,
+            by_region=by_region,
+            by_district=by_district,
+        )
+
+
+class BusinessCatalog:
+    """
+    Bizneslar katalogi - indekslangan qidiruv
+
+    - id, normallashtirilgan nom va telefon bo'yicha O(1) qidiruv
+    - Viloyat / tuman bo'yicha tayyor guruhlar
+    - Fonda TTL bilan yangilanadi, indekslar atomik almashtiriladi
+      (o'quvchilar hech qachon yarim qurilgan indeksni ko'rmaydi)
+    """
+
+    def __init__(self, fetcher: Callable[[], Awaitable[Optional[List[Dict]]]], ttl: float = NONBOR_BUSINESSES_TTL):
+        """
+        Args:
+            fetcher: Bizneslarni API dan yuklovchi coroutine funksiya
+            ttl: Katalog yangilanish oralig'i (soniyada)
+        """
+        self._fetcher = fetcher
+        self.ttl = ttl
+
+        self._index = BusinessIndex()
+        self._loaded_at: Optional[float] = None
+        self._inflight: Optional[asyncio.Future] = None
+        self._task: Optional[asyncio.Task] = None
+
+    # --- Yangilash ---
+
+    def is_stale(self) -> bool:
+        """Katalog eskirganmi (yoki hali yuklanmaganmi)"""
+        return self._loaded_at is None or time.monotonic() - self._loaded_at >= self.ttl
+
+    def invalidate(self):
+        """Keyingi ensure_fresh() da API dan qayta yuklash"""
+        self._loaded_at = None
+
+    async def ensure_fresh(self, force: bool = False) -> bool:
+        """
+        Katalog eskirgan bo'lsa yangilash (single-flight)
+
+        Returns:
+            Katalogda ma'lumot bormi
+        """
+        if force or self.is_stale():
+            if self._inflight is None or self._inflight.done():
+                self._inflight = asyncio.ensure_future(self.refresh())
+            await asyncio.shield(self._inflight)
+        return bool(self._index.businesses)
+
+    async def refresh(self) -> bool:
+        """API dan yuklab, indekslarni qayta qurish. Xato bo'lsa eski indeks qoladi"""
+        businesses = await self._fetcher()
+        if businesses is None:
+            return False
+        self.load(businesses)
+        return True
+
+    def load(self, businesses: List[Dict]):
+        """Tayyor ro'yxatdan indekslarni qurish va atomik almashtirish"""
+        self._index = BusinessIndex.build(businesses)
+        self._loaded_at = time.monotonic()
+        logger.debug(f"Bizneslar katalogi yangilandi: {len(businesses)} ta")
+
+    async def start(self):
+        """Birinchi yuklash va fon yangilanishini boshlash"""
+        await self.ensure_fresh(force=True)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        """Fon yangilanishini to'xtatish"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _refresh_loop(self):
+        """Har TTL da katalogni yangilash"""
+        while True:
+            try:
+                await asyncio.sleep(self.ttl)
+                await self.ensure_fresh(force=True)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Bizneslar katalogini yangilashda xato: {e}")
+
+    # --- Qidiruv (har biri bitta dict murojaati) ---
+
+    def all(self) -> List[Dict]:
+        """Barcha bizneslar (nusxa)"""
+        return list(self._index.businesses)
+
+    def get(self, business_id) -> Optional[Dict]:
+        """ID bo'yicha (int yoki raqamli str)"""
+        if isinstance(business_id, str):
+            if not business_id.isdigit():
+                return None
+            business_id = int(business_id)
+        return self._index.by_id.get(business_id)
+
+    def get_by_title(self, title: str) -> Optional[Dict]:
+        """Nom bo'yicha (katta-kichik harf va bo'sh joylar farq qilmaydi)"""
+        return self._index.by_title.get(normalize_title(title))
+
+    def get_by_phone(self, phone: str) -> Optional[Dict]:
+        """Telefon raqami bo'yicha (istalgan formatda)"""
+        return self._index.by_phone.get(normalize_phone(phone))
+
+    def regions(self) -> Dict[str, List[Dict]]:
+        """{viloyat: [bizneslar]}"""
+        return self._index.by_region
+
+    def districts(self, region: str) -> Dict[str, List[Dict]]:
+        """{tuman: [bizneslar]} - berilgan viloyat uchun"""
+        return self._index.by_district.get(region, {})
+
+    def by_id_map(self) -> Dict[int, Dict]:
+        """{id: biznes}"""
+        return self._index.by_id
+
+    def __len__(self) -> int:
+        return len(self._index.businesses)
+
+
+class OrderEventType(Enum):
+    """Buyurtma hodisalari turlari"""
+    CREATED = "created"              # Snapshotda birinchi marta paydo bo'ldi
+    STATE_CHANGED = "state_changed"  # Status o'zgardi (old -> new)
+    DISAPPEARED = "disappeared"      # Snapshotdan yo'qoldi
+
+
+@dataclass(frozen=True)
+class OrderEvent:
+    """Buyurtma holati o'zgarishi hodisasi"""
+    type: OrderEventType
+    order_id: int
+    old_state: Optional[str] = None  # CREATED uchun None
+    new_state: Optional[str] = None  # DISAPPEARED uchun None
+    order: Optional[Dict] = None     # Oxirgi ma'lum buyurtma dict
+
+
+class OrderStateTracker:
+    """
+    Buyurtma holatlari kuzatuvchisi - ketma-ket to'liq snapshotlarni solishtiradi
+
+    - Har bir snapshot O(n) da solishtiriladi (id -> state)
+    - Hodisalar (created / state_changed / disappeared) obunachilarga yuboriladi
+    - Status bo'yicha indeks (state -> {id}) bosqichma-bosqich yangilanadi
+    - Yo'qolgan buyurtmalarning oxirgi statusi cheklangan muddat saqlanadi
+    """
+
+    def __init__(self, max_gone: int = 1000):
+        """
+        Args:
+            max_gone: Yo'qolgan buyurtmalar oxirgi statuslari uchun maksimal hajm
+        """
+        self._states: Dict[int, str] = {}
+        self._orders: Dict[int, Dict] = {}
+        # OrderView lar - har snapshotda kerak bo'lganda bir marta hosil qilinadi
+        self._views: Dict[int, OrderView] = {}
+        self._by_state: Dict[str, Set[int]] = {}
+        self._gone: "OrderedDict[int, str]" = OrderedDict()
+        self._max_gone = max_gone
+        self._subscribers: List[tuple] = []
+        self._initialized = False
+
+    @staticmethod
+    def _state_of(order: Dict) -> str:
+        return (order.get("state") or "").upper()
+
+    @property
+    def initialized(self) -> bool:
+        """Kamida bitta snapshot qabul qilinganmi"""
+        return self._initialized
+
+    def subscribe(self, handler: Callable, event_types: Iterable[OrderEventType] = None):
+        """
+        Hodisalarga obuna bo'lish
+
+        Args:
+            handler: handler(event) - oddiy yoki async funksiya
+            event_types: Faqat shu turdagi hodisalar (None - barchasi)
+        """
+        types = frozenset(event_types) if event_types else None
+        self._subscribers.append((handler, types))
+
+    def diff(self, orders: List[Dict]) -> List[OrderEvent]:
+        """
+        Yangi snapshotni joriy holat bilan solishtirish va holatni yangilash
+
+        Returns:
+            Hodisalar ro'yxati (created / state_changed / disappeared)
+        """
+        events: List[OrderEvent] = []
+        new_states: Dict[int, str] = {}
+        new_orders: Dict[int, Dict] = {}
+
+        for order in orders:
+            order_id = order.get("id")
+            if order_id is None:
+                continue
+            state = self._state_of(order)
+            new_states[order_id] = state
+            new_orders[order_id] = order
+
+            old_state = self._states.get(order_id)
+            if old_state is None:
+                events.append(OrderEvent(OrderEventType.CREATED, order_id, None, state, order))
+                self._gone.pop(order_id, None)
+            elif old_state != state:
+                events.append(OrderEvent(OrderEventType.STATE_CHANGED, order_id, old_state, state, order))
+
+        for order_id, old_state in self._states.items():
+            if order_id not in new_states:
+                events.append(OrderEvent(
+                    OrderEventType.DISAPPEARED, order_id, old_state, None, self._orders.get(order_id)
+                ))
+                self._remember_gone(order_id, old_state)
+
+        self._reindex(events)
+        self._states = new_states
+        self._orders = new_orders
+        self._views = {}
+        self._initialized = True
+        return events
+
+    def apply(self, order: Dict) -> List[OrderEvent]:
+        """
+        Bitta buyurtma holatini qo'llash (push/webhook uchun, snapshotsiz)
+
+        Returns:
+            Hodisalar ro'yxati (bo'sh, created yoki state_changed)
+        """
+        order_id = order.get("id")
+        if order_id is None:
+            return []
+        # Qisman push (faqat id va state) oldingi ma'lumotlarni o'chirmasligi uchun birlashtirish
+        order = {**self._orders.get(order_id, {}), **order}
+        state = self._state_of(order)
+        old_state = self._states.get(order_id)
+        self._states[order_id] = state
+        self._orders[order_id] = order
+        self._views.pop(order_id, None)
+
+        if old_state is None:
+            self._gone.pop(order_id, None)
+            events = [OrderEvent(OrderEventType.CREATED, order_id, None, state, order)]
+        elif old_state != state:
+            events = [OrderEvent(OrderEventType.STATE_CHANGED, order_id, old_state, state, order)]
+        else:
+            events = []
+        self._reindex(events)
+        return events
+
+    def remove(self, order_id: int) -> List[OrderEvent]:
+        """Bitta buyurtmani olib tashlash (push/webhook uchun)"""
+        old_state = self._states.pop(order_id, None)
+        if old_state is None:
+            return []
+        order = self._orders.pop(order_id, None)
+        self._views.pop(order_id, None)
+        self._remember_gone(order_id, old_state)
+        events = [OrderEvent(OrderEventType.DISAPPEARED, order_id, old_state, None, order)]
+        self._reindex(events)
+        return events
+
+    def _remember_gone(self, order_id: int, state: str):
+        """Yo'qolgan buyurtmaning oxirgi statusini saqlash (cheklangan hajm)"""
+        self._gone[order_id] = state
+        while len(self._gone) > self._max_gone:
+            self._gone.popitem(last=False)
+
+    def _reindex(self, events: List[OrderEvent]):
+        """Status indeksini faqat o'zgarganlar uchun yangilash"""
+        for event in events:
+            if event.old_state is not None:
+                ids = self._by_state.get(event.old_state)
+                if ids is not None:
+                    ids.discard(event.order_id)
+            if event.new_state is not None:
+                self._by_state.setdefault(event.new_state, set()).add(event.order_id)
+
+    async def update(self, orders: List[Dict]) -> List[OrderEvent]:
+        """Snapshotni qabul qilish va hodisalarni obunachilarga yuborish"""
+        events = self.diff(orders)
+        if events:
+            await self.dispatch(events)
+        return events
+
+    async def push(self, order: Dict = None, removed_id: int = None) -> List[OrderEvent]:
+        """Bitta buyurtma o'zgarishini qabul qilish va hodisalarni yuborish"""
+        events = self.remove(removed_id) if removed_id is not None else self.apply(order or {})
+        if events:
+            await self.dispatch(events)
+        return events
+
+    async def dispatch(self, events: List[OrderEvent]):
+        """Hodisalarni obunachilarga yuborish (xatolar log qilinadi, to'xtatmaydi)"""
+        for handler, types in self._subscribers:
+            for event in events:
+                if types is not None and event.type not in types:
+                    continue
+                try:
+                    result = handler(event)
+                    if asyncio.iscoroutine(result):
+                        await result
+                except Exception as e:
+                    logger.error(f"Buyurtma hodisasi handler xatosi ({event.type.value} #{event.order_id}): {e}")
+
+    def state_of(self, order_id: int) -> Optional[str]:
+        """Joriy status, yo'qolgan bo'lsa - oxirgi ma'lum status"""
+        state = self._states.get(order_id)
+        if state is None:
+            state = self._gone.get(order_id)
+        return state
+
+    def get_order(self, order_id: int) -> Optional[Dict]:
+        """Oxirgi snapshotdagi buyurtma (yo'q bo'lsa None)"""
+        return self._orders.get(order_id)
+
+    def get_view(self, order_id: int) -> Optional[OrderView]:
+        """Oxirgi snapshotdagi buyurtmaning OrderView ko'rinishi (snapshot uchun keshlanadi)"""
+        view = self._views.get(order_id)
+        if view is None:
+            order = self._orders.get(order_id)
+            if order is None:
+                return None
+            view = self._views[order_id] = OrderView.from_order(order)
+        return view
+
+    def ids_in_state(self, state: str) -> Set[int]:
+        """Berilgan statusdagi buyurtma ID lari (nusxa)"""
+        return set(self._by_state.get(state.upper(), ()))
+
+    def __contains__(self, order_id: int) -> bool:
+        return order_id in self._states
+
+    def __len__(self) -> int:
+        return len(self._states)
 
 
 class NonborService:
@@ -39,11 +709,21 @@ class NonborService:
 
         # Cache
         self._known_leads: Set[int] = set()
-        self._businesses_cache: Dict[int, Dict] = {}
         self._seller_id_cache: Dict[str, int] = {}  # phone -> seller_id
         self._session: Optional[aiohttp.ClientSession] = None
         self._consecutive_errors: int = 0
 
+        # Buyurtmalar snapshoti - barcha iste'molchilar uchun umumiy
+        self._orders_snapshot = OrderSnapshotCache(self._fetch_orders)
+        # Oxirgi sahifali yuklash statistikasi (sahifalar soni, har sahifa vaqti)
+        self._last_fetch_stats: Dict = {}
+
+        # Bizneslar katalogi - id / nom / telefon / hudud indekslari
+        self.businesses = BusinessCatalog(self._fetch_businesses)
+
+        # Buyurtma holatlari kuzatuvchisi (NonborPoller snapshotlar bilan to'ldiradi)
+        self.order_tracker = OrderStateTracker()
+
         logger.info(f"Nonbor servisi ishga tushdi")
 
     async def _get_session(self) -> aiohttp.ClientSession:
@@ -54,6 +734,7 @@ class NonborService:
 
     async def close(self):
         """Sessionni yopish"""
+        await self.businesses.stop()
         if self._session and not self._session.closed:
             await self._session.close()
 
@@ -83,18 +764,27 @@ class NonborService:
                 logger.error(f"Nonbor API ulanish xatosi: {e} (ketma-ket: {self._consecutive_errors})")
             return None
 
-    async def get_businesses(self) -> List[Dict]:
-        """Barcha tasdiqlangan bizneslarni olish"""
-        data = await self._make_request("GET", "telegram_bot/businesses/accepted/")
-        if not data or not data.get("success"):
-            return []
+    @property
+    def _businesses_cache(self) -> Dict[int, Dict]:
+        """{id: biznes} - katalogning ID indeksi"""
+        return self.businesses.by_id_map()
 
-        businesses = data.get("result", [])
-        # Cache yangilash
-        for biz in businesses:
-            self._businesses_cache[biz["id"]] = biz
+    async def get_businesses(self, force: bool = False) -> List[Dict]:
+        """
+        Barcha tasdiqlangan bizneslarni olish (katalogdan)
+
+        Args:
+            force: True bo'lsa katalog API dan qayta yuklanadi
+        """
+        await self.businesses.ensure_fresh(force=force)
+        return self.businesses.all()
 
-        return businesses
+    async def _fetch_businesses(self) -> Optional[List[Dict]]:
+        """businesses/accepted endpointidan bizneslarni yuklash"""
+        data = await self._make_request("GET", "telegram_bot/businesses/accepted/")
+        if not data or not data.get("success"):
+            return None
+        return data.get("result", [])
 
     async def get_order_status(self, order_id: int) -> Optional[str]:
         """
@@ -122,6 +812,62 @@ class NonborService:
             logger.debug(f"Order status endpoint xato: {e}")
         return None
 
+    async def get_order_statuses(
+        self,
+        order_ids: Iterable[int],
+        orders: Optional[List[Dict]] = None,
+        max_concurrency: int = 5
+    ) -> Dict[int, Optional[str]]:
+        """
+        Bir nechta buyurtma statusini birga aniqlash
+
+        Avval snapshotdan (get-order-for-courier), unda yo'q bo'lganlar uchun
+        /orders/{id}/ so'rovlari semafor bilan cheklangan holda parallel yuboriladi.
+
+        Args:
+            order_ids: Buyurtma ID lari
+            orders: Allaqachon yuklangan snapshot (bo'lmasa get_orders() dan olinadi)
+            max_concurrency: Bir vaqtda yuboriladigan /orders/{id}/ so'rovlar soni
+
+        Returns:
+            {order_id: status yoki None (aniqlab bo'lmadi)}
+        """
+        order_ids = list(dict.fromkeys(order_ids))
+        if not order_ids:
+            return {}
+
+        if orders is None:
+            orders = await self.get_orders()
+        states_by_id = {
+            o.get("id"): (o.get("state") or "").upper()
+            for o in (orders or [])
+        }
+
+        results: Dict[int, Optional[str]] = {}
+        missing_ids = []
+        for oid in order_ids:
+            state = states_by_id.get(oid)
+            if state:
+                results[oid] = state
+            else:
+                missing_ids.append(oid)
+
+        if missing_ids:
+            semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+            async def fetch_status(oid: int):
+                async with semaphore:
+                    return oid, await self.get_order_status(oid)
+
+            for oid, state in await asyncio.gather(*(fetch_status(oid) for oid in missing_ids)):
+                results[oid] = state
+            logger.debug(
+                f"Statuslar: {len(order_ids) - len(missing_ids)} ta snapshotdan, "
+                f"{len(missing_ids)} ta /orders/ dan"
+            )
+
+        return results
+
     async def get_order_details(self, order_id: int) -> Optional[Dict]:
         """
         Bitta buyurtmaning to'liq ma'lumotlarini olish
@@ -146,29 +892,194 @@ class NonborService:
             logger.debug(f"Order details endpoint xato: {e}")
         return None
 
-    async def get_orders(self) -> Optional[List[Dict]]:
+    async def get_orders(self, force: bool = False) -> Optional[List[Dict]]:
         """
-        Barcha buyurtmalarni olish
+        Barcha buyurtmalarni olish (umumiy snapshot orqali)
+
+        Bir vaqtda chaqirilganda bitta so'rov yuboriladi, natija
+        NONBOR_ORDERS_TTL soniya davomida qayta ishlatiladi.
+
+        Args:
+            force: True bo'lsa keshlangan snapshot ishlatilmaydi
 
         Returns:
             Buyurtmalar ro'yxati yoki None agar xato yuz bergan bo'lsa
         """
-        data = await self._make_request("GET", "telegram_bot/get-order-for-courier/")
-        if data is None:
+        return await self._orders_snapshot.get(force=force)
+
+    def invalidate_orders(self):
+        """Buyurtmalar snapshotini eskirgan deb belgilash"""
+        self._orders_snapshot.invalidate()
+
+    def get_snapshot_stats(self) -> Dict:
+        """Buyurtmalar snapshoti statistikasi (hits, misses, coalesced, sahifalar)"""
+        return {**self._orders_snapshot.get_stats(), "last_fetch": dict(self._last_fetch_stats)}
+
+    def _orders_page_endpoint(self, page: int) -> str:
+        endpoint = f"telegram_bot/get-order-for-courier/?page={page}"
+        if NONBOR_ORDERS_PAGE_SIZE > 0:
+            endpoint += f"&page_size={NONBOR_ORDERS_PAGE_SIZE}"
+        return endpoint
+
+    async def _fetch_orders_page(self, page: int) -> Optional[tuple]:
+        """
+        Bitta sahifani yuklash
+
+        Returns:
+            (result dict, sarflangan vaqt soniyada) yoki None agar xato
+        """
+        started = time.monotonic()
+        data = await self._make_request("GET", self._orders_page_endpoint(page))
+        elapsed = time.monotonic() - started
+        if not data or not data.get("success"):
             return None
+        result = data.get("result") or {}
+        # Ba'zi javoblarda result to'g'ridan-to'g'ri ro'yxat bo'ladi
+        if isinstance(result, list):
+            result = {"results": result}
+        return result, elapsed
 
-        if not data.get("success"):
+    async def _fetch_orders(self, attempts: int = 2) -> Optional[List[Dict]]:
+        """
+        get-order-for-courier endpointidan buyurtmalarni sahifalab yuklash
+
+        Birinchi sahifadan "count" bo'yicha sahifalar soni aniqlanadi, qolgan
+        sahifalar semafor bilan cheklangan holda parallel yuklanadi. To'liqsiz
+        snapshot rad etiladi (buyurtmalarni "yo'qolgan" deb ko'rsatib, hali
+        CHECKING dagi buyurtmalar uchun qo'ng'iroqni to'xtatmasligi uchun):
+        - biror sahifa yuklanmasa
+        - sahifalar NONBOR_ORDERS_MAX_PAGES dan oshsa
+        - noyob ID lar soni "count" ga teng bo'lmasa (yuklash davomida buyurtma
+          sahifadan sahifaga siljigan) - avval qayta yuklab ko'riladi
+
+        Returns:
+            Buyurtmalar ro'yxati yoki None agar xato yuz bergan bo'lsa
+        """
+        started = time.monotonic()
+        for attempt in range(1, attempts + 1):
+            fetched = await self._fetch_orders_pages()
+            if fetched is None:
+                return None
+            results, total, timings = fetched
+            if not isinstance(total, int) or len(results) == total:
+                break
+            logger.warning(
+                f"Buyurtmalar snapshoti to'liq emas: {len(results)} ta noyob ID, count={total} "
+                f"(urinish {attempt}/{attempts})"
+            )
+        else:
+            logger.warning("Buyurtmalar snapshoti rad etildi - sahifalar mos kelmadi")
             return None
 
-        results = data.get("result", {}).get("results", [])
+        total_elapsed = time.monotonic() - started
+        self._last_fetch_stats = {
+            "pages": len(timings),
+            "orders": len(results),
+            "total_ms": round(total_elapsed * 1000),
+            "page_ms": [round(t * 1000) for t in timings],
+        }
+
         if results:
             states = {}
             for o in results:
                 s = o.get("state", "unknown")
                 states[s] = states.get(s, 0) + 1
-            logger.info(f"API buyurtmalar: {len(results)} ta, statuslar: {states}")
+            snap = self._orders_snapshot
+            logger.info(
+                f"API buyurtmalar: {len(results)} ta ({len(timings)} sahifa, "
+                f"{self._last_fetch_stats['total_ms']}ms), statuslar: {states} "
+                f"(snapshot: hit={snap.hits}, miss={snap.misses}, coalesced={snap.coalesced})"
+            )
         return results
 
+    async def _fetch_orders_pages(self) -> Optional[tuple]:
+        """
+        Barcha sahifalarni bir marta yuklash
+
+        Returns:
+            (noyob buyurtmalar, count yoki None, sahifa vaqtlari) yoki None (xato / limitdan oshdi)
+        """
+        first = await self._fetch_orders_page(1)
+        if first is None:
+            return None
+
+        first_result, first_elapsed = first
+        pages: List[Optional[List[Dict]]] = [first_result.get("results", [])]
+        timings: List[float] = [first_elapsed]
+
+        page_len = len(pages[0])
+        total = first_result.get("count")
+        if isinstance(total, int) and page_len and total > page_len:
+            page_count = math.ceil(total / page_len)
+            if page_count > NONBOR_ORDERS_MAX_PAGES:
+                logger.warning(
+                    f"Buyurtmalar {page_count} sahifa (count={total}) - NONBOR_ORDERS_MAX_PAGES="
+                    f"{NONBOR_ORDERS_MAX_PAGES} dan oshdi, snapshot rad etildi"
+                )
+                return None
+        elif first_result.get("next") and page_len:
+            # count yo'q, lekin keyingi sahifa bor - bittadan ketma-ket o'qiladi
+            page_count = None
+        else:
+            page_count = 1
+
+        if page_count is None:
+            page = 2
+            has_next = True
+            while has_next:
+                if page > NONBOR_ORDERS_MAX_PAGES:
+                    logger.warning(
+                        f"Buyurtmalar sahifalari NONBOR_ORDERS_MAX_PAGES={NONBOR_ORDERS_MAX_PAGES} "
+                        f"dan oshdi - snapshot rad etildi"
+                    )
+                    return None
+                fetched = await self._fetch_orders_page(page)
+                if fetched is None:
+                    return None
+                result, elapsed = fetched
+                pages.append(result.get("results", []))
+                timings.append(elapsed)
+                has_next = bool(result.get("next")) and bool(result.get("results"))
+                page += 1
+        elif page_count > 1:
+            pages.extend([None] * (page_count - 1))
+            timings.extend([0.0] * (page_count - 1))
+            semaphore = asyncio.Semaphore(max(1, NONBOR_ORDERS_PAGE_CONCURRENCY))
+
+            async def fetch(page: int):
+                async with semaphore:
+                    return page, await self._fetch_orders_page(page)
+
+            tasks = [asyncio.create_task(fetch(p)) for p in range(2, page_count + 1)]
+            try:
+                # Sahifalar kelishi bilan o'z joyiga qo'yiladi (tartib saqlanadi)
+                for next_done in asyncio.as_completed(tasks):
+                    page, fetched = await next_done
+                    if fetched is None:
+                        logger.warning(f"Buyurtmalar sahifasi #{page} yuklanmadi - snapshot rad etildi")
+                        return None
+                    result, elapsed = fetched
+                    pages[page - 1] = result.get("results", [])
+                    timings[page - 1] = elapsed
+            finally:
+                # Erta chiqishda qolgan sahifa so'rovlari bekor qilinadi
+                for task in tasks:
+                    if not task.done():
+                        task.cancel()
+
+        # Yuklash davomida buyurtma sahifadan sahifaga siljishi mumkin - ID bo'yicha takrorlarni olib tashlash
+        results: List[Dict] = []
+        seen: Set = set()
+        for page_results in pages:
+            for order in page_results or []:
+                order_id = order.get("id")
+                if order_id in seen:
+                    continue
+                seen.add(order_id)
+                results.append(order)
+
+        return results, total if isinstance(total, int) else None, timings
+
     async def get_orders_by_business(self, business_id: int) -> List[Dict]:
         """
         Biznes ID bo'yicha buyurtmalarni olish (get-order-for-courier dan)
@@ -239,18 +1150,10 @@ class NonborService:
             logger.error(f"check_for_new_leads xatosi: {e}")
             return None, None
 
-    async def get_order_full_data(self, order_id: int) -> Dict:
-        """
-        Buyurtma uchun to'liq ma'lumotlarni olish
-        (AmoCRM get_order_full_data() bilan mos)
-
-        Returns:
-            dict: {
-                lead_id, lead_name, seller_name, seller_phone, seller_address,
-                client_name, client_phone, product_name, quantity, price, order_number
-            }
-        """
-        result = {
+    @staticmethod
+    def empty_order_full_data(order_id: int) -> Dict:
+        """get_order_full_data uchun standart (bo'sh) natija (buyurtma topilmaganda yoki so'rov xatosida)"""
+        return {
             "lead_id": order_id,
             "lead_name": "Noma'lum",
             "seller_name": "Noma'lum",
@@ -265,34 +1168,27 @@ class NonborService:
             "order_number": str(order_id),
         }
 
-        # Bizneslar cacheni yangilash (agar bo'sh bo'lsa)
-        if not self._businesses_cache:
-            await self.get_businesses()
-
-        # Buyurtmalarni olish va kerakli buyurtmani topish
-        orders = await self.get_orders()
-        if not orders:
-            return result
+    def _build_order_full_data(self, order_id: int, order: Dict) -> Dict:
+        """
+        Xom buyurtma dict dan to'liq ma'lumotlarni yig'ish
 
-        order = None
-        for o in orders:
-            if o.get("id") == order_id:
-                order = o
-                break
+        Args:
+            order_id: Buyurtma ID
+            order: API dan kelgan buyurtma
+        """
+        result = self.empty_order_full_data(order_id)
 
-        if not order:
-            # Ro'yxatda topilmadi - individual endpoint dan olish
-            order_details = await self.get_order_details(order_id)
-            if order_details:
-                order = order_details.get("result", order_details)
-                logger.info(f"Buyurtma #{order_id} individual endpoint dan olindi")
-            else:
-                return result
+        # Tracker dagi shu snapshot obyekti bo'lsa - tayyor OrderView dan foydalanish
+        tracker = self.order_tracker
+        view = (
+            tracker.get_view(order_id) if tracker.get_order(order_id) is order
+            else OrderView.from_order(order)
+        )
 
         # Buyurtma ma'lumotlari
-        result["lead_id"] = order.get("id", order_id)
-        result["order_number"] = str(order.get("id", order_id))
-        result["price"] = (order.get("total_price", 0) or 0) / 100
+        result["lead_id"] = view.id if view.id is not None else order_id
+        result["order_number"] = str(result["lead_id"])
+        result["price"] = view.price
 
         # Biznes (sotuvchi) ma'lumotlari
         business = order.get("business") or {}
@@ -303,44 +1199,108 @@ class NonborService:
 
             # Biznes telefon raqami va tilini olish (businesses API dan, title bo'yicha)
             biz_title = business.get("title", "")
-            if biz_title:
-                for cached_biz in self._businesses_cache.values():
-                    if cached_biz.get("title", "").strip().lower() == biz_title.strip().lower():
-                        phone = cached_biz.get("phone_number", "")
-                        if phone:
-                            result["seller_phone"] = f"+{phone}" if not phone.startswith("+") else phone
-                        # Biznes egasi tili (ilovada tanlangan)
-                        lang = (
-                            cached_biz.get("language") or
-                            cached_biz.get("owner_language") or
-                            cached_biz.get("tg_language") or
-                            cached_biz.get("language_code") or
-                            "uz"
-                        )
-                        result["seller_language"] = str(lang).lower()[:2]
-                        break
+            cached_biz = self.businesses.get_by_title(biz_title) if biz_title else None
+            if cached_biz:
+                phone = cached_biz.get("phone_number", "")
+                if phone:
+                    result["seller_phone"] = f"+{phone}" if not phone.startswith("+") else phone
+                # Biznes egasi tili (ilovada tanlangan)
+                lang = (
+                    cached_biz.get("language") or
+                    cached_biz.get("owner_language") or
+                    cached_biz.get("tg_language") or
+                    cached_biz.get("language_code") or
+                    "uz"
+                )
+                result["seller_language"] = str(lang).lower()[:2]
 
         # Mijoz ma'lumotlari
-        user = order.get("user") or {}
-        if user:
-            first_name = user.get("first_name", "")
-            last_name = user.get("last_name", "")
-            result["client_name"] = f"{first_name} {last_name}".strip() or "Noma'lum"
-            result["client_phone"] = user.get("phone", "Noma'lum")
+        if order.get("user"):
+            result["client_name"] = view.client_name
+            result["client_phone"] = view.client_phone or "Noma'lum"
 
         # Mahsulotlar
-        items = order.get("order_item") or order.get("items") or []
-        if items:
-            first_item = items[0]
-            product = first_item.get("product") or {}
-            result["product_name"] = product.get("name") or product.get("title", "Noma'lum")
-            result["quantity"] = first_item.get("count", 1)
+        if order.get("order_item") or order.get("items"):
+            result["product_name"] = view.product_name or "Noma'lum"
+            result["quantity"] = view.quantity
 
         # Lead name format (amoCRM bilan mos)
-        result["lead_name"] = f"#{order['id']} | {result['client_name']} | {order.get('payment_method', 'CASH')} | {result['price']}"
+        result["lead_name"] = f"#{result['lead_id']} | {result['client_name']} | {order.get('payment_method', 'CASH')} | {result['price']}"
 
         return result
 
+    async def get_order_full_data(self, order_id: int) -> Dict:
+        """
+        Buyurtma uchun to'liq ma'lumotlarni olish
+        (AmoCRM get_order_full_data() bilan mos)
+
+        Returns:
+            dict: {
+                lead_id, lead_name, seller_name, seller_phone, seller_address,
+                client_name, client_phone, product_name, quantity, price, order_number
+            }
+        """
+        results = await self.get_orders_full_data([order_id])
+        return results.get(order_id) or self.empty_order_full_data(order_id)
+
+    async def get_orders_full_data(self, order_ids: List[int], max_concurrency: int = 5) -> Dict[int, Dict]:
+        """
+        Bir nechta buyurtma uchun to'liq ma'lumotlarni BITTA snapshotdan olish
+
+        Buyurtmalar ID bo'yicha indekslanadi (O(1) qidiruv), bizneslar
+        katalogdan nom bo'yicha olinadi. Ro'yxatda topilmagan buyurtmalar
+        /orders/{id}/ dan parallel (max_concurrency bilan cheklangan) olinadi.
+
+        Args:
+            order_ids: Buyurtma ID lari
+            max_concurrency: Individual endpoint uchun maksimal parallel so'rovlar
+
+        Returns:
+            {order_id: full_data} - har bir so'ralgan ID uchun (topilmasa standart qiymatlar)
+        """
+        results = {oid: self.empty_order_full_data(oid) for oid in order_ids}
+        if not order_ids:
+            return results
+
+        # Bizneslar katalogini yangilash (agar bo'sh yoki eskirgan bo'lsa)
+        await self.businesses.ensure_fresh()
+
+        orders = await self.get_orders()
+        if not orders:
+            return results
+
+        orders_by_id = {o.get("id"): o for o in orders}
+
+        found: Dict[int, Dict] = {}
+        missing_ids = []
+        for oid in results:
+            order = orders_by_id.get(oid)
+            if order is not None:
+                found[oid] = order
+            else:
+                missing_ids.append(oid)
+
+        # Ro'yxatda topilmadi - individual endpoint dan olish (parallel)
+        if missing_ids:
+            semaphore = asyncio.Semaphore(max_concurrency)
+
+            async def fetch_one(oid):
+                async with semaphore:
+                    return oid, await self.get_order_details(oid)
+
+            fetched = await asyncio.gather(*[fetch_one(oid) for oid in missing_ids], return_exceptions=True)
+            for r in fetched:
+                if isinstance(r, tuple) and r[1]:
+                    oid, order_details = r
+                    found[oid] = order_details.get("result", order_details)
+                    logger.info(f"Buyurtma #{oid} individual endpoint dan olindi")
+
+        for oid, order in found.items():
+            results[oid] = self._build_order_full_data(oid, order)
+
+        logger.debug(f"Buyurtmalar ma'lumotlari: {len(found)}/{len(results)} ta topildi (individual: {len(missing_ids)} ta)")
+        return results
+
     async def get_seller_id(self, phone: str) -> Optional[int]:
         """
         Telefon raqam bo'yicha seller_id olish
@@ -488,19 +1448,115 @@ class NonborPoller:
         nonbor_service: NonborService,
         polling_interval: int = 5,
         on_new_orders: callable = None,
-        on_orders_resolved: callable = None
+        on_orders_resolved: callable = None,
+        adaptive: bool = NONBOR_POLL_ADAPTIVE,
+        min_interval: float = NONBOR_POLL_MIN_INTERVAL,
+        max_interval: float = NONBOR_POLL_MAX_INTERVAL,
+        is_busy: Callable[[], bool] = None,
+        idle_backoff: float = 1.5,
+        jitter: float = 0.2,
     ):
+        """
+        Args:
+            polling_interval: Qat'iy interval (adaptive=False) va xato backoff asosi
+            adaptive: Moslashuvchan rejim - CHECKING buyurtmalar yoki faol qo'ng'iroq
+                bo'lsa min_interval, bo'sh paytda max_interval gacha sekinlashadi
+            min_interval / max_interval: Moslashuvchan interval chegaralari (soniyada)
+            is_busy: Qo'shimcha "tez polling kerak" sharti (masalan, qo'ng'iroq jarayonida)
+            idle_backoff: Bo'sh paytda har pollingda interval ko'paytiruvchisi
+            jitter: Bo'sh paytdagi intervalga qo'shiladigan tasodifiy ulush (+-)
+        """
         self.nonbor = nonbor_service
         self.polling_interval = polling_interval
         self.on_new_orders = on_new_orders
         self.on_orders_resolved = on_orders_resolved
 
+        self.adaptive = adaptive
+        self.min_interval = min(min_interval, max_interval)
+        self.max_interval = max(min_interval, max_interval)
+        self.is_busy = is_busy
+        self.idle_backoff = idle_backoff
+        self.jitter = jitter
+
         self._running = False
         self._last_count = 0
         self._last_ids: Set[int] = set()  # Oldingi polling dagi ID lar
         self._task: Optional[asyncio.Task] = None
-
-        logger.info(f"Nonbor Poller yaratildi: {polling_interval}s interval")
+        # Polling snapshotlari va push lar tracker ga navbat bilan qo'llanadi
+        self._apply_lock = asyncio.Lock()
+        self._push_seq = 0  # Har bir push da oshadi - eskirgan snapshotni aniqlash uchun
+        self._stale_snapshots = 0
+
+        # Moslashuvchan interval va aniqlash kechikishi statistikasi
+        self._idle_interval = self.min_interval
+        self._effective_interval = float(self.min_interval if adaptive else polling_interval)
+        self._detect_count = 0
+        self._detect_latency_last: Optional[float] = None
+        self._detect_latency_avg: Optional[float] = None  # EWMA
+        self._detect_latency_max: float = 0.0
+
+        if adaptive:
+            logger.info(f"Nonbor Poller yaratildi: moslashuvchan {self.min_interval}-{self.max_interval}s interval")
+        else:
+            logger.info(f"Nonbor Poller yaratildi: {polling_interval}s interval")
+
+    def _next_interval(self) -> float:
+        """Keyingi polling gacha kutish vaqti"""
+        if not self.adaptive:
+            return self.polling_interval
+
+        busy = self._last_count > 0
+        if not busy and self.is_busy:
+            try:
+                busy = bool(self.is_busy())
+            except Exception as e:
+                logger.debug(f"is_busy xatosi: {e}")
+
+        if busy:
+            # Buyurtma kutilmoqda yoki qo'ng'iroq jarayonida - tez polling
+            self._idle_interval = self.min_interval
+            interval = self.min_interval
+        else:
+            # Bo'sh - interval asta-sekin oshadi, jitter bilan (so'rovlar bir vaqtga to'planmasligi uchun)
+            self._idle_interval = min(self._idle_interval * self.idle_backoff, self.max_interval)
+            spread = self._idle_interval * self.jitter
+            interval = self._idle_interval + random.uniform(-spread, spread)
+
+        interval = max(self.min_interval, min(interval, self.max_interval))
+        self._effective_interval = interval
+        return interval
+
+    def _record_detection_latency(self, order: Optional[Dict]):
+        """Buyurtma yaratilgan vaqtdan aniqlangungacha o'tgan vaqtni hisoblash"""
+        created = parse_api_datetime((order or {}).get("created_at"))
+        if created is None:
+            return
+        latency = (datetime.now(timezone.utc) - created).total_seconds()
+        if latency < 0:
+            latency = 0.0
+
+        self._detect_count += 1
+        self._detect_latency_last = latency
+        self._detect_latency_max = max(self._detect_latency_max, latency)
+        if self._detect_latency_avg is None:
+            self._detect_latency_avg = latency
+        else:
+            self._detect_latency_avg = 0.8 * self._detect_latency_avg + 0.2 * latency
+
+    def get_stats(self) -> Dict:
+        """Polling statistikasi: samarali interval va aniqlash kechikishi"""
+        def _round(v):
+            return round(v, 2) if v is not None else None
+
+        return {
+            "adaptive": self.adaptive,
+            "effective_interval": _round(self._effective_interval),
+            "detected_orders": self._detect_count,
+            "detection_latency_last": _round(self._detect_latency_last),
+            "detection_latency_avg": _round(self._detect_latency_avg),
+            "detection_latency_max": _round(self._detect_latency_max),
+            "stale_snapshots": self._stale_snapshots,
+        }
 
     async def start(self):
         """Polling boshlash"""
@@ -509,8 +1565,8 @@ class NonborPoller:
 
         self._running = True
 
-        # Birinchi ishga tushganda bizneslarni cache qilish
-        await self.nonbor.get_businesses()
+        # Birinchi ishga tushganda bizneslar katalogini yuklash (fonda TTL bilan yangilanadi)
+        await self.nonbor.businesses.start()
 
         self._task = asyncio.create_task(self._poll_loop())
         logger.info("Nonbor Polling boshlandi")
@@ -526,11 +1582,106 @@ class NonborPoller:
                 pass
         logger.info("Nonbor Polling to'xtatildi")
 
+    async def _poll_once(self) -> Optional[int]:
+        """
+        Bitta polling: snapshot olish, OrderStateTracker orqali solishtirish
+        va CHECKING ga kirgan/chiqqan buyurtmalar uchun callback chaqirish
+
+        Returns:
+            CHECKING buyurtmalar soni yoki None agar API xatosi
+        """
+        push_seq = self._push_seq
+        orders = await self.nonbor.get_orders()
+        if orders is None:
+            return None
+
+        async with self._apply_lock:
+            if push_seq != self._push_seq:
+                # So'rov davomida push keldi - snapshot undan eski bo'lishi mumkin
+                # (push qilingan buyurtma DISAPPEARED bo'lib ketmasligi uchun tashlanadi)
+                self._stale_snapshots += 1
+                logger.debug("Polling snapshoti push dan eski - o'tkazib yuborildi")
+                return self._last_count
+
+            tracker = self.nonbor.order_tracker
+            first_snapshot = not tracker.initialized
+            events = await tracker.update(orders)
+            return await self._handle_events(events, track_latency=not first_snapshot)
+
+    async def push_order(self, order: Dict = None, removed_id: int = None) -> List[OrderEvent]:
+        """
+        Push/webhook orqali kelgan bitta buyurtma o'zgarishini qayta ishlash
+
+        Polling bilan bir xil callback lar chaqiriladi (on_new_orders, on_orders_resolved).
+
+        Args:
+            order: Buyurtma dict (kamida id va state)
+            removed_id: O'chirilgan buyurtma ID (order o'rniga)
+        """
+        tracker = self.nonbor.order_tracker
+        async with self._apply_lock:
+            # Hozir davom etayotgan polling so'rovi natijasi eskirgan hisoblanadi
+            self._push_seq += 1
+            events = await tracker.push(order=order, removed_id=removed_id)
+            if events:
+                # Keyingi polling eski snapshotni qayta ishlatib, holatni orqaga qaytarmasligi uchun
+                self.nonbor.invalidate_orders()
+                await self._handle_events(events, track_latency=tracker.initialized)
+        return events
+
+    async def _handle_events(self, events: List[OrderEvent], track_latency: bool = True) -> int:
+        """
+        Tracker hodisalaridan CHECKING ga kirgan/chiqqan buyurtmalarni aniqlash
+        va callback larni chaqirish
+
+        Returns:
+            CHECKING buyurtmalar soni
+        """
+        tracker = self.nonbor.order_tracker
+        status = self.nonbor.status_name.upper()
+        current_id_set = tracker.ids_in_state(status)
+        count = len(current_id_set)
+
+        # CHECKING ga kirganlar (yangi yoki boshqa statusdan qaytgan)
+        new_ids = {
+            e.order_id for e in events
+            if e.new_state == status and e.old_state != status
+        }
+        # CHECKING dan chiqqanlar (status o'zgargan yoki ro'yxatdan yo'qolgan)
+        removed_ids = {
+            e.order_id for e in events
+            if e.old_state == status and e.new_state != status
+        }
+
+        if new_ids:
+            logger.info(f"Yangi buyurtmalar: {len(new_ids)} ta, Jami: {count} ta")
+            # Aniqlash kechikishi - ishga tushgandagi eski buyurtmalar hisobga olinmaydi
+            if track_latency:
+                for e in events:
+                    if e.type == OrderEventType.CREATED and e.order_id in new_ids:
+                        self._record_detection_latency(e.order)
+                logger.info(
+                    f"Aniqlash kechikishi: oxirgi={self._detect_latency_last}s, "
+                    f"interval={self._effective_interval:.1f}s"
+                )
+
+        # Yangi buyurtmalar keldi
+        if new_ids and self.on_new_orders:
+            await self.on_new_orders(count, list(current_id_set))
+
+        # Buyurtmalar hal qilindi (status o'zgardi)
+        if removed_ids and self.on_orders_resolved:
+            await self.on_orders_resolved(list(removed_ids), count)
+
+        self._last_ids = current_id_set
+        self._last_count = count
+        return count
+
     async def _poll_loop(self):
         """Asosiy polling sikli - exponential backoff bilan"""
         while self._running:
             try:
-                count, current_ids = await self.nonbor.check_for_new_leads()
+                count = await self._poll_once()
 
                 if count is None:
                     # Xatolik — backoff hisoblash (5s, 10s, 20s, 40s, 60s max)
@@ -544,36 +1695,15 @@ class NonborPoller:
                         waited += self.polling_interval
 
                         # Har bo'lakda API ni tekshirish
-                        test_count, test_ids = await self.nonbor.check_for_new_leads()
-                        if test_count is not None:
+                        if await self._poll_once() is not None:
                             # API tiklandi — darhol normal rejimga qaytish
-                            count, current_ids = test_count, test_ids
                             logger.info(f"API tiklandi! Normal rejimga qaytildi ({waited}s da)")
                             break
                     else:
                         # Backoff tugadi, API hali ham ishlamayapti
                         continue
 
-                current_id_set = set(current_ids) if current_ids else set()
-
-                # Faqat ID lar o'zgarganda callback chaqirish
-                if current_id_set != self._last_ids:
-                    new_ids = current_id_set - self._last_ids
-                    removed_ids = self._last_ids - current_id_set
-
-                    # Yangi buyurtmalar keldi
-                    if new_ids and self.on_new_orders:
-                        await self.on_new_orders(count, list(current_id_set))
-
-                    # Buyurtmalar hal qilindi (status o'zgardi)
-                    if removed_ids and self.on_orders_resolved:
-                        await self.on_orders_resolved(list(removed_ids), count)
-
-                    self._last_ids = current_id_set
-
-                self._last_count = count
-
-                await asyncio.sleep(self.polling_interval)
+                await asyncio.sleep(self._next_interval())
 
             except asyncio.CancelledError:
                 break
@@ -585,3 +1715,161 @@ class NonborPoller:
     def current_count(self) -> int:
         """Hozirgi buyurtmalar soni"""
         return self._last_count
+
+
+class NonborWebhookReceiver:
+    """
+    Nonbor push/webhook qabul qiluvchi HTTP server
+
+    Buyurtma yaratilishi va status o'zgarishi haqidagi push larni qabul qilib,
+    NonborPoller.push_order orqali polling bilan bir xil callback larga uzatadi.
+    Polling sekin tekshiruv (reconciliation) sifatida ishlashda davom etadi.
+
+    So'rov formati (POST, JSON, bitta hodisa yoki hodisalar ro'yxati):
+        {"event": "order.created", "order": {"id": 123, "state": "CHECKING", ...}}
+        {"event": "order.state_changed", "order": {"id": 123, "state": "ACCEPTED"}}
+        {"event": "order.deleted", "order_id": 123}
+
+    Autentifikatsiya: "X-Nonbor-Secret" header NONBOR_SECRET ga teng bo'lishi kerak.
+    """
+
+    EVENT_CREATED = "order.created"
+    EVENT_STATE_CHANGED = "order.state_changed"
+    EVENT_DELETED = "order.deleted"
+
+    def __init__(
+        self,
+        poller: "NonborPoller",
+        host: str = NONBOR_WEBHOOK_HOST,
+        port: int = NONBOR_WEBHOOK_PORT,
+        path: str = NONBOR_WEBHOOK_PATH,
+        secret: Optional[str] = NONBOR_SECRET
+    ):
+        self.poller = poller
+        self.host = host
+        self.port = port
+        self.path = path
+        self.secret = secret
+        self._runner: Optional[web.AppRunner] = None
+        # Statistika
+        self._received = 0
+        self._rejected = 0
+        self._last_event_at: Optional[float] = None
+
+    def _create_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(self.path, self._handle_push)
+        app.router.add_get(f"{self.path.rstrip('/')}/health", self._handle_health)
+        return app
+
+    async def start(self):
+        """HTTP serverni ishga tushirish"""
+        if self._runner:
+            return
+        self._runner = web.AppRunner(self._create_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        logger.info(f"Nonbor webhook tinglanmoqda: http://{self.host}:{self.port}{self.path}")
+
+    async def stop(self):
+        """HTTP serverni to'xtatish"""
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+            logger.info("Nonbor webhook to'xtatildi")
+
+    def get_stats(self) -> Dict:
+        """Webhook statistikasi"""
+        return {
+            "received": self._received,
+            "rejected": self._rejected,
+            "last_event_age": (
+                round(time.monotonic() - self._last_event_at, 1)
+                if self._last_event_at is not None else None
+            ),
+        }
+
+    async def _handle_health(self, request: web.Request) -> web.Response:
+        return web.json_response({"success": True, **self.get_stats()})
+
+    async def _handle_push(self, request: web.Request) -> web.Response:
+        """Push so'rovini qabul qilish va qayta ishlash"""
+        if self.secret and request.headers.get("X-Nonbor-Secret") != self.secret:
+            self._rejected += 1
+            logger.warning(f"Webhook: noto'g'ri secret ({request.remote})")
+            return web.json_response({"success": False, "error": "unauthorized"}, status=401)
+
+        try:
+            payload = await request.json()
+        except Exception:
+            self._rejected += 1
+            return web.json_response({"success": False, "error": "invalid json"}, status=400)
+
+        items = payload if isinstance(payload, list) else [payload]
+        # Avval butun paket tekshiriladi - yarmi qo'llanib 400 qaytmasligi uchun
+        # (jo'natuvchi qayta yuborganda qo'llangan hodisalar takrorlanmaydi)
+        try:
+            parsed = [self._parse_event(item) for item in items]
+        except ValueError as e:
+            self._rejected += 1
+            logger.warning(f"Webhook: noto'g'ri hodisa: {e}")
+            return web.json_response({"success": False, "error": str(e)}, status=400)
+
+        applied = 0
+        for event, order, removed_id in parsed:
+            applied += await self._apply_event(event, order, removed_id)
+
+        self._received += len(items)
+        self._last_event_at = time.monotonic()
+        return web.json_response({"success": True, "events": applied})
+
+    def _parse_event(self, item: Dict) -> tuple:
+        """
+        Bitta push hodisasini tekshirish
+
+        Returns:
+            (event, order, removed_id)
+
+        Raises:
+            ValueError: Noto'g'ri hodisa
+        """
+        if not isinstance(item, dict):
+            raise ValueError("hodisa obyekt bo'lishi kerak")
+
+        event = item.get("event")
+        if event == self.EVENT_DELETED:
+            order_id = item.get("order_id")
+            if order_id is None and isinstance(item.get("order"), dict):
+                order_id = item["order"].get("id")
+            if order_id is None:
+                raise ValueError("order_id yo'q")
+            try:
+                return event, None, int(order_id)
+            except (TypeError, ValueError):
+                raise ValueError(f"noto'g'ri order_id: {order_id!r}")
+        if event in (self.EVENT_CREATED, self.EVENT_STATE_CHANGED):
+            order = item.get("order")
+            if not isinstance(order, dict) or order.get("id") is None or not order.get("state"):
+                raise ValueError("order.id va order.state majburiy")
+            try:
+                return event, {**order, "id": int(order["id"])}, None
+            except (TypeError, ValueError):
+                raise ValueError(f"noto'g'ri order.id: {order['id']!r}")
+        raise ValueError(f"noma'lum hodisa turi: {event}")
+
+    async def _apply_event(self, event: str, order: Optional[Dict], removed_id: Optional[int]) -> int:
+        """
+        Tekshirilgan push hodisasini tracker/poller ga uzatish
+
+        Returns:
+            Hosil bo'lgan tracker hodisalari soni
+        """
+        if removed_id is not None:
+            events = await self.poller.push_order(removed_id=removed_id)
+        else:
+            events = await self.poller.push_order(order=order)
+
+        logger.info(f"Webhook: {event} #{removed_id if removed_id is not None else order['id']} -> {len(events)} ta hodisa")
+        return len(events)
+
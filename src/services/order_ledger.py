@@ -0,0 +1,134 @@
+"""
+Buyurtmalar Daftari
+===================
+
+AutodialerState uchun buyurtmalar hisobi: TEKSHIRILMOQDA dagi buyurtmalar va
+sotuvchilarga xabar berilgan buyurtmalar. Barcha tekshiruvlar O(1), ommaviy
+amallar buyurtmalar soniga chiziqli.
+"""
+
+from typing import Dict, Iterable, KeysView, List, Optional
+
+
+class OrderLedger:
+    """
+    Buyurtmalar daftari
+
+    - pending: TEKSHIRILMOQDA dagi buyurtmalar (API tartibi saqlanadi)
+    - communicated: sotuvchiga xabar berilgan buyurtmalar
+      (order -> seller va seller -> {order} teskari indekslari bilan)
+    """
+
+    def __init__(self):
+        # dict - tartiblangan to'plam sifatida (qiymatlar ishlatilmaydi)
+        self._pending: Dict[int, None] = {}
+        self._order_seller: Dict[int, str] = {}
+        self._seller_orders: Dict[str, Dict[int, None]] = {}
+
+    # --- TEKSHIRILMOQDA dagi buyurtmalar ---
+
+    @property
+    def pending_ids(self) -> List[int]:
+        """Kutilayotgan buyurtma ID lari (nusxa, API tartibida)"""
+        return list(self._pending)
+
+    def set_pending(self, order_ids: Iterable[int]):
+        """Kutilayotgan buyurtmalar ro'yxatini almashtirish"""
+        self._pending = dict.fromkeys(order_ids)
+
+    def pending_view(self) -> KeysView:
+        """Kutilayotgan ID lar (nusxasiz ko'rinish, set amallari uchun)"""
+        return self._pending.keys()
+
+    def is_pending(self, order_id: int) -> bool:
+        return order_id in self._pending
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    # --- Sotuvchiga xabar berilgan buyurtmalar ---
+
+    def mark_communicated(self, seller_phone: str, order_ids: Iterable[int]):
+        """Buyurtmalar haqida sotuvchiga xabar berildi deb belgilash"""
+        seller_orders = self._seller_orders.setdefault(seller_phone, {})
+        for order_id in order_ids:
+            previous = self._order_seller.get(order_id)
+            if previous is not None and previous != seller_phone:
+                self._discard_from_seller(previous, order_id)
+            self._order_seller[order_id] = seller_phone
+            seller_orders[order_id] = None
+
+    def is_communicated(self, order_id: int, seller_phone: Optional[str] = None) -> bool:
+        """Buyurtma haqida xabar berilganmi (seller_phone berilsa - aynan shu sotuvchiga)"""
+        seller = self._order_seller.get(order_id)
+        if seller is None:
+            return False
+        return seller_phone is None or seller == seller_phone
+
+    def communicated_ids(self) -> KeysView:
+        """Xabar berilgan barcha buyurtma ID lari (nusxasiz ko'rinish)"""
+        return self._order_seller.keys()
+
+    def seller_of(self, order_id: int) -> Optional[str]:
+        """Buyurtma qaysi sotuvchiga xabar qilingan"""
+        return self._order_seller.get(order_id)
+
+    def orders_of(self, seller_phone: str) -> List[int]:
+        """Sotuvchiga xabar berilgan buyurtmalar"""
+        return list(self._seller_orders.get(seller_phone, ()))
+
+    def sellers(self) -> List[str]:
+        return list(self._seller_orders)
+
+    def retain_communicated(self, order_ids) -> List[str]:
+        """
+        Faqat berilgan to'plamdagi xabar berilgan buyurtmalarni qoldirish
+
+        Args:
+            order_ids: Hozir TEKSHIRILMOQDA dagi ID lar (set yoki dict ko'rinishi)
+
+        Returns:
+            Barcha buyurtmalari chiqib ketgan (tozalangan) sotuvchilar
+        """
+        gone = [oid for oid in self._order_seller if oid not in order_ids]
+        return self._forget(gone)
+
+    def resolve(self, order_ids: Iterable[int]) -> Dict[str, int]:
+        """
+        Hal qilingan buyurtmalarni ommaviy o'chirish (pending va xabar berilganlardan)
+
+        Returns:
+            {seller_phone: o'chirilgan buyurtmalar soni}
+        """
+        removed: Dict[str, int] = {}
+        order_ids = list(order_ids)
+        for order_id in order_ids:
+            self._pending.pop(order_id, None)
+            seller = self._order_seller.get(order_id)
+            if seller is not None:
+                removed[seller] = removed.get(seller, 0) + 1
+        self._forget(order_ids)
+        return removed
+
+    def _forget(self, order_ids: Iterable[int]) -> List[str]:
+        emptied = []
+        for order_id in order_ids:
+            seller = self._order_seller.pop(order_id, None)
+            if seller is not None and self._discard_from_seller(seller, order_id):
+                emptied.append(seller)
+        return emptied
+
+    def _discard_from_seller(self, seller_phone: str, order_id: int) -> bool:
+        """Sotuvchi indeksidan o'chirish; sotuvchida buyurtma qolmasa True"""
+        seller_orders = self._seller_orders.get(seller_phone)
+        if seller_orders is None:
+            return False
+        seller_orders.pop(order_id, None)
+        if not seller_orders:
+            del self._seller_orders[seller_phone]
+            return True
+        return False
+
+    def __len__(self) -> int:
+        return len(self._pending)
@@ -0,0 +1,158 @@
+"""
+Fon Saqlash Servisi
+===================
+
+Holat fayllarini (JSON) event loop ni bloklamasdan saqlash:
+- chaqiruvchilar hujjatni faqat "o'zgardi" deb belgilaydi (mark_dirty)
+- fon task har bir hujjatni interval ichida ko'pi bilan bir marta yozadi
+- yozish worker thread da: temp fayl + atomik rename (yarim yozilgan fayl qolmaydi)
+- stop() da barcha o'zgargan hujjatlar yoziladi
+"""
+
+import asyncio
+import json
+import logging
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Bir hujjatni ikki marta yozish orasidagi minimal vaqt (sekundda)
+PERSIST_INTERVAL = float(os.getenv("PERSIST_INTERVAL", "1.0"))
+
+
+def write_atomic(path: Path, payload: str):
+    """
+    Faylni atomik yozish: temp fayl + fsync + os.replace
+
+    O'quvchi yoki quvvat uzilishi hech qachon yarim yozilgan faylni ko'rmaydi.
+    Bloklovchi - worker thread dan chaqiriladi.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+@dataclass
+class _Document:
+    path: Path
+    serializer: Callable[[], Any]
+    indent: Optional[int]
+    ensure_ascii: bool
+
+
+class PersistenceService:
+    """
+    Birlashtiruvchi (coalescing) fon yozuvchi
+
+    Ishlatish:
+        persistence = PersistenceService()
+        persistence.register("stats", Path("data/stats.json"), lambda: {...})
+        await persistence.start()
+        persistence.mark_dirty("stats")   # necha marta chaqirilsa ham - bitta yozuv
+        await persistence.stop()          # oxirgi o'zgarishlarni yozish
+
+    serializer event loop da chaqiriladi va mustaqil nusxa qaytarishi kerak
+    (JSON ga aylantirish va disk ga yozish thread da bajariladi).
+    """
+
+    def __init__(self, interval: float = PERSIST_INTERVAL):
+        self.interval = interval
+        self._documents: Dict[str, _Document] = {}
+        self._dirty: Set[str] = set()
+        self._wakeup = asyncio.Event()
+        self._stopping = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._running = False
+        self._writes = 0
+        self._coalesced = 0
+
+    def register(
+        self,
+        name: str,
+        path: Path,
+        serializer: Callable[[], Any],
+        indent: Optional[int] = None,
+        ensure_ascii: bool = False
+    ):
+        """Hujjatni ro'yxatdan o'tkazish"""
+        self._documents[name] = _Document(Path(path), serializer, indent, ensure_ascii)
+
+    def mark_dirty(self, name: str):
+        """Hujjat o'zgardi - keyingi yozishda saqlanadi"""
+        if name not in self._documents:
+            logger.warning(f"Noma'lum hujjat: {name}")
+            return
+        if name in self._dirty:
+            self._coalesced += 1
+        self._dirty.add(name)
+        self._wakeup.set()
+
+    async def start(self):
+        """Fon yozuvchini ishga tushirish"""
+        if self._task:
+            return
+        self._running = True
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._writer_loop())
+        logger.info(f"PersistenceService ishga tushdi (interval={self.interval}s, {len(self._documents)} ta hujjat)")
+
+    async def _writer_loop(self):
+        while self._running:
+            await self._wakeup.wait()
+            # Birlashtirish oynasi - shu vaqt ichidagi barcha o'zgarishlar bitta yozuvga
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        """O'zgargan barcha hujjatlarni hozir yozish"""
+        if not self._dirty:
+            return
+        names, self._dirty = self._dirty, set()
+        for name in names:
+            doc = self._documents[name]
+            try:
+                data = doc.serializer()
+                await asyncio.to_thread(self._write, doc, data)
+                self._writes += 1
+            except Exception as e:
+                logger.error(f"Hujjatni saqlashda xato ({doc.path.name}): {e}")
+                # Keyingi urinishda qayta yoziladi
+                self._dirty.add(name)
+                self._wakeup.set()
+
+    @staticmethod
+    def _write(doc: _Document, data: Any):
+        payload = json.dumps(data, indent=doc.indent, ensure_ascii=doc.ensure_ascii)
+        write_atomic(doc.path, payload)
+
+    async def stop(self):
+        """Fon yozuvchini to'xtatish va qolgan o'zgarishlarni yozish"""
+        self._running = False
+        self._stopping.set()
+        if self._task:
+            # Bekor qilinmaydi - thread dagi yozuv tugashi kutiladi
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+        logger.info(f"PersistenceService to'xtatildi (yozuvlar: {self._writes}, birlashtirilgan: {self._coalesced})")
+
+    def get_stats(self) -> dict:
+        """Statistika"""
+        return {
+            "documents": len(self._documents),
+            "dirty": len(self._dirty),
+            "writes": self._writes,
+            "coalesced": self._coalesced,
+        }
@@ -0,0 +1,213 @@
+"""
+Muddatlar Rejalashtiruvchisi
+============================
+
+Min-heap asosidagi deadline scheduler: har bir vazifa o'z muddatini ro'yxatdan
+o'tkazadi, asosiy sikl esa har soniyada uyg'onish o'rniga aynan eng yaqin
+muddatgacha uxlaydi.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+JobCallback = Callable[[], Awaitable[None]]
+
+
+class DeadlineHeap:
+    """
+    Kalit bo'yicha muddatlar min-heap i (dangasa o'chirish bilan)
+
+    - push: kalitni muddat bilan qo'shish/yangilash - O(log n)
+    - discard: kalitni o'chirish - O(1), heap dan keyinroq tashlab yuboriladi
+    - peek / pop_due: eng yaqin muddat va muddati kelganlar - O(log n) har biri uchun
+
+    Vaqt birligi chaqiruvchiga bog'liq (masalan, time.time() sekundlari).
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int, Hashable]] = []
+        # key -> (when, seq, payload) - heap dagi faqat shu seq haqiqiy
+        self._entries: Dict[Hashable, Tuple[float, int, object]] = {}
+        self._seq = itertools.count()
+
+    def push(self, key: Hashable, when: float, payload: object = None):
+        """Kalitni qo'shish (mavjud bo'lsa - muddat va payload almashtiriladi)"""
+        current = self._entries.get(key)
+        if current is not None and current[0] == when:
+            self._entries[key] = (when, current[1], payload)
+            return
+        seq = next(self._seq)
+        self._entries[key] = (when, seq, payload)
+        heapq.heappush(self._heap, (when, seq, key))
+        # Eskirgan yozuvlar juda ko'payib ketmasligi uchun
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._rebuild()
+
+    def discard(self, key: Hashable):
+        """Kalitni o'chirish"""
+        self._entries.pop(key, None)
+
+    def get(self, key: Hashable) -> Optional[Tuple[float, object]]:
+        """(muddat, payload) yoki None"""
+        entry = self._entries.get(key)
+        return (entry[0], entry[2]) if entry else None
+
+    def peek(self) -> Optional[float]:
+        """Eng yaqin muddat (bo'sh bo'lsa None)"""
+        while self._heap:
+            when, seq, key = self._heap[0]
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] == seq:
+                return when
+            heapq.heappop(self._heap)
+        return None
+
+    def pop_due(self, now: float) -> List[Tuple[Hashable, float, object]]:
+        """Muddati kelgan (when <= now) barcha yozuvlarni olib tashlash va qaytarish"""
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            when, seq, key = heapq.heappop(self._heap)
+            entry = self._entries.get(key)
+            if entry is None or entry[1] != seq:
+                continue
+            del self._entries[key]
+            due.append((key, when, entry[2]))
+        return due
+
+    def clear(self):
+        """Barcha yozuvlarni o'chirish"""
+        self._heap.clear()
+        self._entries.clear()
+
+    def _rebuild(self):
+        self._heap = [(when, seq, key) for key, (when, seq, _) in self._entries.items()]
+        heapq.heapify(self._heap)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DeadlineScheduler:
+    """
+    Kalit bo'yicha muddatli vazifalar rejalashtiruvchisi
+
+    - schedule_at / schedule_in: bir martalik vazifa (shu kalitdagi eskisini almashtiradi)
+    - every: davriy vazifa (keyingi ishga tushish oldingisi tugagandan keyin belgilanadi)
+    - cancel: vazifani bekor qilish (heap dan dangasa o'chiriladi)
+
+    Vaqtlar event loop soati (loop.time(), monotonic) bo'yicha.
+    Har bir vazifa alohida task da bajariladi, xatolar log qilinadi.
+    """
+
+    def __init__(self):
+        # key -> (when, callback)
+        self._jobs = DeadlineHeap()
+        self._intervals: Dict[Hashable, float] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._running = False
+        self._tasks: Set[asyncio.Task] = set()
+        self._active: Set[Hashable] = set()  # Hozir bajarilayotgan vazifalar
+
+    @staticmethod
+    def now() -> float:
+        """Joriy vaqt (event loop soati)"""
+        return asyncio.get_running_loop().time()
+
+    def schedule_at(self, key: Hashable, when: float, callback: JobCallback):
+        """Vazifani aniq vaqtga rejalashtirish (loop.time() bo'yicha)"""
+        self._jobs.push(key, when, callback)
+        # Yangi muddat eng yaqini bo'lsa - siklni uyg'otish
+        if self._wakeup and self._jobs.peek() == when:
+            self._wakeup.set()
+
+    def schedule_in(self, key: Hashable, delay: float, callback: JobCallback):
+        """Vazifani delay soniyadan keyinga rejalashtirish"""
+        self.schedule_at(key, self.now() + max(0.0, delay), callback)
+
+    def every(self, key: Hashable, interval: float, callback: JobCallback, run_now: bool = True):
+        """Davriy vazifa - oldingi bajarilish tugagach interval o'tib qayta ishga tushadi"""
+        self._intervals[key] = interval
+        self.schedule_in(key, 0 if run_now else interval, callback)
+
+    def cancel(self, key: Hashable):
+        """Vazifani bekor qilish"""
+        self._jobs.discard(key)
+        self._intervals.pop(key, None)
+
+    def when(self, key: Hashable) -> Optional[float]:
+        """Vazifaning rejalashtirilgan vaqti (yo'q bo'lsa None)"""
+        job = self._jobs.get(key)
+        return job[0] if job else None
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._jobs
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    async def run(self):
+        """Asosiy sikl - eng yaqin muddatgacha uxlash va muddati kelganlarni bajarish"""
+        self._running = True
+        self._wakeup = asyncio.Event()
+        try:
+            while self._running:
+                deadline = self._jobs.peek()
+                timeout = None if deadline is None else max(0.0, deadline - self.now())
+                if timeout is None or timeout > 0:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                # Muddati kelgan barcha vazifalarni olish
+                for key, _, callback in self._jobs.pop_due(self.now()):
+                    self._start(key, callback)
+        finally:
+            self._running = False
+
+    def _start(self, key: Hashable, callback: JobCallback):
+        task = asyncio.create_task(self._run_job(key, callback))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_job(self, key: Hashable, callback: JobCallback):
+        started = self.now()
+        self._active.add(key)
+        try:
+            await callback()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Rejalashtirilgan vazifa xatosi ({key}): {e}")
+        finally:
+            self._active.discard(key)
+            interval = self._intervals.get(key)
+            # Davriy vazifa: bajarilish davomida qayta rejalashtirilmagan bo'lsa
+            if interval is not None and key not in self._jobs:
+                self.schedule_at(key, max(started + interval, self.now()), callback)
+
+    def is_active(self, key: Hashable) -> bool:
+        """Vazifa hozir bajarilayaptimi"""
+        return key in self._active
+
+    async def stop(self):
+        """Siklni to'xtatish va bajarilayotgan vazifalarni bekor qilish"""
+        self._running = False
+        if self._wakeup:
+            self._wakeup.set()
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._jobs.clear()
+        self._intervals.clear()
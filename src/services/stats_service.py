@@ -109,16 +109,24 @@ class StatsService:
     Kunlik statistikalarni saqlaydi va ko'rsatadi
     """
 
-    def __init__(self, data_dir: str = "data"):
+    def __init__(self, data_dir: str = "data", persistence=None):
+        """
+        Args:
+            data_dir: Ma'lumotlar katalogi
+            persistence: PersistenceService (berilsa - fon da saqlanadi, aks holda darhol)
+        """
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(exist_ok=True)
         self.stats_file = self.data_dir / "stats.json"
+        self._persistence = persistence
 
         # Joriy kunlik statistika
         self._today_stats: Optional[DailyStats] = None
         self._all_stats: Dict[str, DailyStats] = {}
 
         self._load_stats()
+        if self._persistence:
+            self._persistence.register("stats", self.stats_file, self._serialize_stats, indent=2)
         logger.info("StatsService ishga tushdi")
 
     def _load_stats(self):
@@ -140,10 +148,17 @@ class StatsService:
             self._all_stats[today] = DailyStats(date=today)
         self._today_stats = self._all_stats[today]
 
+    def _serialize_stats(self) -> dict:
+        """Saqlash uchun mustaqil nusxa (asdict chuqur nusxa oladi)"""
+        return {date_str: stats.to_dict() for date_str, stats in self._all_stats.items()}
+
     def _save_stats(self):
-        """Statistikalarni faylga saqlash"""
+        """Statistikalarni saqlash (fon yozuvchi bo'lsa - faqat belgilash)"""
+        if self._persistence:
+            self._persistence.mark_dirty("stats")
+            return
         try:
-            data = {date_str: stats.to_dict() for date_str, stats in self._all_stats.items()}
+            data = self._serialize_stats()
             with open(self.stats_file, "w", encoding="utf-8") as f:
                 json.dump(data, f, ensure_ascii=False, indent=2)
         except Exception as e:
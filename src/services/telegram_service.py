@@ -10,12 +10,42 @@ import random
 import uuid
 import aiohttp
 import asyncio
-from typing import Optional, Dict, Any, List, Callable
+import hashlib
+import heapq
+import itertools
+import time
+from collections import OrderedDict, deque
+from functools import partial
+from typing import Optional, Dict, Any, List, Callable, Awaitable
 from datetime import datetime, timedelta, timezone
 
+from .callback_router import CallbackRouter, ROLE_ADMIN, ROLE_OWNER
+
 logger = logging.getLogger(__name__)
 
 
+# Chiquvchi xabarlar cheklovlari (Bot API: ~30 so'rov/s umumiy, ~1 so'rov/s bitta chatga)
+TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "25"))
+TELEGRAM_CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE", "1"))
+TELEGRAM_CHAT_BURST = int(os.getenv("TELEGRAM_CHAT_BURST", "3"))
+TELEGRAM_MAX_INFLIGHT = int(os.getenv("TELEGRAM_MAX_INFLIGHT", "8"))
+TELEGRAM_MAX_RETRIES = int(os.getenv("TELEGRAM_MAX_RETRIES", "3"))
+# Oxirgi ko'rsatilgan xabar matni xeshlari (o'zgarmagan tahrirlarni o'tkazib yuborish uchun)
+TELEGRAM_EDIT_CACHE_SIZE = int(os.getenv("TELEGRAM_EDIT_CACHE_SIZE", "2000"))
+# Bir vaqtda qayta ishlanadigan kiruvchi update lar (turli chatlar; bitta chat ichida - ketma-ket)
+TELEGRAM_UPDATE_CONCURRENCY = int(os.getenv("TELEGRAM_UPDATE_CONCURRENCY", "8"))
+# Shundan sekin handlerlar log qilinadi (sekundda)
+TELEGRAM_SLOW_HANDLER = float(os.getenv("TELEGRAM_SLOW_HANDLER", "2.0"))
+
+# Navbat ustuvorligi (kichik raqam - birinchi yuboriladi)
+PRIORITY_ALERT = 0      # Buyurtma xabarlari va ogohlantirishlar
+PRIORITY_UI = 1         # Menyu / navigatsiya (tugma bosilganda tahrirlash)
+PRIORITY_BROADCAST = 2  # Xabarnomalar, ommaviy yuborish va tozalash
+
+# Dispatcher orqali o'tadigan metodlar
+DISPATCHED_METHODS = frozenset({"sendMessage", "editMessageText", "deleteMessage"})
+
+
 # Callback data prefixes
 CALLBACK_STATS = "stats"
 CALLBACK_CALLS_1 = "calls_1"
@@ -111,6 +141,245 @@ ADMIN_PHONES = {
 }
 
 
+class TokenBucket:
+    """Token bucket - sekundiga rate ta token, ko'pi bilan capacity ta to'planadi"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = 0.0
+
+    def _refill(self, now: float):
+        if self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Token olish uchun kutish vaqti (0 - hozir mavjud)"""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+
+class TelegramDispatcher:
+    """
+    Chiquvchi Telegram so'rovlari dispetcheri
+
+    - ustuvorlik navbatlari: ogohlantirishlar UI tahrirlari va xabarnomalardan oldin
+    - token bucket: umumiy va har bir chat uchun alohida
+    - bitta chatga bir vaqtda bitta so'rov (chat ichida tartib saqlanadi)
+    - 429 javobida retry_after kutiladi va so'rov qayta navbatga qo'yiladi
+    """
+
+    def __init__(
+        self,
+        request: Callable[[str, dict], Awaitable[Optional[dict]]],
+        global_rate: float = TELEGRAM_GLOBAL_RATE,
+        chat_rate: float = TELEGRAM_CHAT_RATE,
+        chat_burst: int = TELEGRAM_CHAT_BURST,
+        max_inflight: int = TELEGRAM_MAX_INFLIGHT,
+        max_retries: int = TELEGRAM_MAX_RETRIES
+    ):
+        """
+        Args:
+            request: (method, data) -> to'liq API javobi (dict) yoki None (ulanish xatosi)
+        """
+        self._request = request
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_inflight = max_inflight
+        self.max_retries = max_retries
+
+        self._global_bucket = TokenBucket(global_rate, max(1.0, global_rate))
+        self._chat_buckets: Dict[str, TokenBucket] = {}
+        self._cooldown_until: Dict[str, float] = {}  # chat_id -> retry_after tugash vaqti
+        self._global_cooldown_until = 0.0
+
+        # (priority, seq, job) - seq bir ustuvorlik ichida FIFO tartibni saqlaydi
+        self._queue: List[tuple] = []
+        self._seq = itertools.count()
+        self._busy_chats: set = set()
+        self._inflight: set = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+
+        self._stats = {"sent": 0, "failed": 0, "rate_limited": 0, "retried": 0}
+
+    async def submit(self, method: str, data: dict, priority: int = PRIORITY_UI) -> Optional[dict]:
+        """So'rovni navbatga qo'yish va javobni kutish"""
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        job = {
+            "method": method,
+            "data": data,
+            "chat_id": str(data.get("chat_id", "")),
+            "priority": priority,
+            "future": future,
+            "attempts": 0,
+            "enqueued": asyncio.get_running_loop().time(),
+            "seq": next(self._seq),
+        }
+        heapq.heappush(self._queue, (priority, job["seq"], job))
+        self._wakeup.set()
+        return await future
+
+    def _ensure_worker(self):
+        if self._worker is None or self._worker.done():
+            self._wakeup = asyncio.Event()
+            self._worker = asyncio.create_task(self._run())
+
+    def _chat_bucket(self, chat_id: str) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self.chat_rate, self.chat_burst)
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+
+    def _next_ready(self, now: float):
+        """
+        Hozir yuborish mumkin bo'lgan eng ustuvor so'rov
+
+        Returns:
+            (entry, 0) yoki (None, eng yaqin kutish vaqti)
+        """
+        skipped = []
+        ready = None
+        min_wait = None
+        while self._queue:
+            entry = heapq.heappop(self._queue)
+            chat_id = entry[2]["chat_id"]
+            if chat_id in self._busy_chats:
+                skipped.append(entry)
+                continue
+            wait = max(
+                self._cooldown_until.get(chat_id, 0.0) - now,
+                self._chat_bucket(chat_id).wait_time(now)
+            )
+            if wait <= 0:
+                ready = entry
+                break
+            min_wait = wait if min_wait is None else min(min_wait, wait)
+            skipped.append(entry)
+        for entry in skipped:
+            heapq.heappush(self._queue, entry)
+        return ready, min_wait
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._wakeup.clear()
+            now = loop.time()
+            timeout = None
+            if len(self._inflight) < self.max_inflight:
+                global_wait = max(self._global_cooldown_until - now, self._global_bucket.wait_time(now))
+                if global_wait > 0:
+                    timeout = global_wait
+                else:
+                    entry, timeout = self._next_ready(now)
+                    if entry is not None:
+                        self._dispatch(entry[2], now)
+                        continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _dispatch(self, job: dict, now: float):
+        chat_id = job["chat_id"]
+        self._global_bucket.take(now)
+        self._chat_bucket(chat_id).take(now)
+        self._busy_chats.add(chat_id)
+        task = asyncio.create_task(self._execute(job))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _execute(self, job: dict):
+        chat_id = job["chat_id"]
+        future = job["future"]
+        requeued = False
+        try:
+            job["attempts"] += 1
+            response = await self._request(job["method"], job["data"])
+
+            if response is not None and response.get("error_code") == 429:
+                self._stats["rate_limited"] += 1
+                retry_after = (response.get("parameters") or {}).get("retry_after", 1)
+                loop = asyncio.get_running_loop()
+                self._cooldown_until[chat_id] = loop.time() + retry_after
+                if not chat_id:
+                    self._global_cooldown_until = loop.time() + retry_after
+                logger.warning(
+                    f"Telegram 429: chat={chat_id or '-'}, retry_after={retry_after}s "
+                    f"({job['method']}, urinish {job['attempts']}/{self.max_retries})"
+                )
+                if job["attempts"] < self.max_retries and not future.done():
+                    self._stats["retried"] += 1
+                    # Asl seq bilan - shu chatning keyingi xabarlaridan oldin qoladi
+                    heapq.heappush(self._queue, (job["priority"], job["seq"], job))
+                    requeued = True
+                    return
+
+            if response is not None and response.get("ok"):
+                self._stats["sent"] += 1
+            else:
+                self._stats["failed"] += 1
+            if not future.done():
+                future.set_result(response)
+        except Exception as e:
+            self._stats["failed"] += 1
+            if not future.done():
+                future.set_exception(e)
+        finally:
+            self._busy_chats.discard(chat_id)
+            # done-callback dan oldin - uyg'ongan _run joy bo'shaganini ko'rishi kerak
+            self._inflight.discard(asyncio.current_task())
+            if requeued or self._queue:
+                self._wakeup.set()
+
+    def get_stats(self) -> dict:
+        """Navbat metrikalari"""
+        by_priority: Dict[int, int] = {}
+        oldest = None
+        for priority, _, job in self._queue:
+            by_priority[priority] = by_priority.get(priority, 0) + 1
+            oldest = job["enqueued"] if oldest is None else min(oldest, job["enqueued"])
+        now = asyncio.get_running_loop().time() if self._worker else 0.0
+        return {
+            "queued": len(self._queue),
+            "queued_by_priority": {
+                "alert": by_priority.get(PRIORITY_ALERT, 0),
+                "ui": by_priority.get(PRIORITY_UI, 0),
+                "broadcast": by_priority.get(PRIORITY_BROADCAST, 0),
+            },
+            "oldest_wait": round(now - oldest, 2) if oldest is not None else 0.0,
+            "inflight": len(self._inflight),
+            "cooling_chats": sum(1 for until in self._cooldown_until.values() if until > now),
+            **self._stats,
+        }
+
+    async def close(self):
+        """Dispetcherni to'xtatish - navbatdagi so'rovlar None bilan yakunlanadi"""
+        if self._worker:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+        while self._queue:
+            _, _, job = heapq.heappop(self._queue)
+            if not job["future"].done():
+                job["future"].set_result(None)
+
+
 class TelegramService:
     """
     Telegram Bot servisi
@@ -128,6 +397,15 @@ class TelegramService:
         self.base_url = f"https://api.telegram.org/bot{bot_token}"
 
         self._session: Optional[aiohttp.ClientSession] = None
+        # sendMessage / editMessageText / deleteMessage shu dispetcher orqali yuboriladi
+        self.dispatcher = TelegramDispatcher(self._raw_request)
+
+        # (chat_id, message_id) -> oxirgi matn + klaviatura xeshi (LRU)
+        self._content_hashes: "OrderedDict[tuple, str]" = OrderedDict()
+        self._edit_cache_size = TELEGRAM_EDIT_CACHE_SIZE
+        self._pending_edits: Dict[tuple, object] = {}  # (chat_id, message_id) -> eng oxirgi tahrir belgisi
+        self._edits_skipped = 0  # Lokal o'tkazib yuborilgan tahrirlar
+        self._edits_not_modified = 0  # Telegram "message is not modified" qaytargan tahrirlar
 
         logger.info("Telegram servisi ishga tushdi")
 
@@ -138,40 +416,80 @@ class TelegramService:
         return self._session
 
     async def close(self):
-        """Sessionni yopish"""
+        """Dispetcher va sessionni yopish"""
+        await self.dispatcher.close()
         if self._session and not self._session.closed:
             await self._session.close()
 
-    async def _make_request(
-        self,
-        method: str,
-        data: dict = None
-    ) -> Optional[Dict]:
-        """Telegram API so'rov"""
+    async def _raw_request(self, method: str, data: dict = None) -> Optional[Dict]:
+        """Telegram API so'rov - to'liq javob (ok, result, error_code, parameters) yoki None"""
         session = await self._get_session()
         url = f"{self.base_url}/{method}"
 
         try:
             async with session.post(url, json=data) as response:
-                result = await response.json()
+                return await response.json()
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            logger.error(f"Telegram ulanish xatosi: {e}")
+            return None
 
-                if result.get("ok"):
-                    return result.get("result")
-                else:
-                    logger.error(f"Telegram xatosi: {result.get('description')}")
-                    return None
+    async def _call(self, method: str, data: dict = None, priority: int = PRIORITY_UI) -> Optional[Dict]:
+        """To'liq javob - chiquvchi xabar metodlari dispetcher orqali"""
+        if method in DISPATCHED_METHODS:
+            return await self.dispatcher.submit(method, data or {}, priority)
+        return await self._raw_request(method, data)
 
-        except aiohttp.ClientError as e:
-            logger.error(f"Telegram ulanish xatosi: {e}")
+    async def _make_request(
+        self,
+        method: str,
+        data: dict = None,
+        priority: int = PRIORITY_UI
+    ) -> Optional[Dict]:
+        """Telegram API so'rov"""
+        result = await self._call(method, data, priority)
+        if result is None:
             return None
 
+        if result.get("ok"):
+            return result.get("result")
+        else:
+            logger.error(f"Telegram xatosi: {result.get('description')}")
+            return None
+
+    def get_queue_stats(self) -> dict:
+        """Chiquvchi navbat metrikalari"""
+        stats = self.dispatcher.get_stats()
+        stats["edits_skipped"] = self._edits_skipped
+        stats["edits_not_modified"] = self._edits_not_modified
+        stats["edit_cache_size"] = len(self._content_hashes)
+        return stats
+
+    @staticmethod
+    def _content_hash(text: str, parse_mode: Optional[str], reply_markup: Optional[dict]) -> str:
+        """Xabar ko'rinishi xeshi (matn + parse_mode + klaviatura)"""
+        markup = json.dumps(reply_markup, sort_keys=True, ensure_ascii=False) if reply_markup else ""
+        payload = f"{parse_mode or ''}\x00{text}\x00{markup}".encode("utf-8")
+        return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+    def _remember_content(self, chat_id, message_id, content_hash: str):
+        """Xabarda hozir ko'rsatilayotgan kontent xeshini saqlash"""
+        key = (str(chat_id), message_id)
+        self._content_hashes[key] = content_hash
+        self._content_hashes.move_to_end(key)
+        while len(self._content_hashes) > self._edit_cache_size:
+            self._content_hashes.popitem(last=False)
+
+    def _forget_content(self, chat_id, message_id):
+        self._content_hashes.pop((str(chat_id), message_id), None)
+
     async def send_message(
         self,
         text: str,
         chat_id: str = None,
         parse_mode: str = "Markdown",
         reply_markup: dict = None,
-        disable_notification: bool = False
+        disable_notification: bool = False,
+        priority: int = PRIORITY_UI
     ) -> Optional[int]:
         """
         Xabar yuborish
@@ -182,6 +500,7 @@ class TelegramService:
             parse_mode: Markdown yoki HTML
             reply_markup: Inline keyboard
             disable_notification: Ovossiz yuborish
+            priority: Navbat ustuvorligi (PRIORITY_ALERT / PRIORITY_UI / PRIORITY_BROADCAST)
 
         Returns:
             Message ID yoki None
@@ -204,11 +523,13 @@ class TelegramService:
         if reply_markup:
             data["reply_markup"] = reply_markup
 
-        result = await self._make_request("sendMessage", data)
+        result = await self._make_request("sendMessage", data, priority)
 
         if result:
             message_id = result.get("message_id")
             logger.info(f"Telegram xabar yuborildi: {message_id}")
+            if message_id:
+                self._remember_content(chat_id, message_id, self._content_hash(text, parse_mode, reply_markup))
             return message_id
 
         return None
@@ -219,21 +540,34 @@ class TelegramService:
         text: str,
         chat_id: str = None,
         parse_mode: str = "Markdown",
-        reply_markup: dict = None
+        reply_markup: dict = None,
+        priority: int = PRIORITY_UI
     ) -> bool:
         """
         Xabarni tahrirlash
 
+        Matn va klaviatura hozir ko'rsatilayotgani bilan bir xil bo'lsa - so'rov
+        yuborilmaydi (Telegram baribir "message is not modified" qaytaradi).
+
         Args:
             message_id: Xabar ID
             text: Yangi matn
             chat_id: Chat ID
+            priority: Navbat ustuvorligi
 
         Returns:
             Muvaffaqiyat holati
         """
         chat_id = chat_id or self.default_chat_id
 
+        content_hash = self._content_hash(text, parse_mode, reply_markup)
+        key = (str(chat_id), message_id)
+        if self._content_hashes.get(key) == content_hash:
+            self._content_hashes.move_to_end(key)
+            self._edits_skipped += 1
+            logger.debug(f"Telegram xabar o'zgarmagan, tahrir o'tkazib yuborildi: {message_id}")
+            return True
+
         data = {
             "chat_id": chat_id,
             "message_id": message_id,
@@ -244,18 +578,43 @@ class TelegramService:
         if reply_markup:
             data["reply_markup"] = reply_markup
 
-        result = await self._make_request("editMessageText", data)
+        # So'rov davomida xabarda nima ko'rsatilayotgani noma'lum - kesh kaliti o'chiriladi,
+        # xesh faqat shu xabarning eng oxirgi tahriri muvaffaqiyatli bo'lganda yoziladi
+        self._forget_content(chat_id, message_id)
+        token = object()
+        self._pending_edits[key] = token
+        try:
+            response = await self._call("editMessageText", data, priority)
+        finally:
+            latest = self._pending_edits.get(key) is token
+            if latest:
+                del self._pending_edits[key]
+        if response is None:
+            return False
 
-        if result:
+        if response.get("ok"):
             logger.info(f"Telegram xabar tahrirlandi: {message_id}")
+            if latest:
+                self._remember_content(chat_id, message_id, content_hash)
+            return True
+
+        description = response.get("description", "")
+        if "message is not modified" in description.lower():
+            # Kesh da yo'q edi (masalan, restart dan keyin) - endi bilamiz
+            if latest:
+                self._remember_content(chat_id, message_id, content_hash)
+            self._edits_not_modified += 1
             return True
 
+        logger.error(f"Telegram xatosi: {description}")
+        self._forget_content(chat_id, message_id)
         return False
 
     async def delete_message(
         self,
         message_id: int,
-        chat_id: str = None
+        chat_id: str = None,
+        priority: int = PRIORITY_ALERT
     ) -> bool:
         """
         Xabarni o'chirish
@@ -263,6 +622,7 @@ class TelegramService:
         Args:
             message_id: Xabar ID
             chat_id: Chat ID
+            priority: Navbat ustuvorligi (standart - ogohlantirish xabarlarini tozalash)
 
         Returns:
             Muvaffaqiyat holati
@@ -274,27 +634,25 @@ class TelegramService:
             "message_id": message_id
         }
 
-        # To'g'ridan-to'g'ri API chaqirish
-        session = await self._get_session()
-        url = f"{self.base_url}/deleteMessage"
-
         try:
-            async with session.post(url, json=data) as response:
-                result = await response.json()
-                logger.debug(f"Delete response: {result}")
-
-                if result.get("ok"):
-                    logger.info(f"Telegram xabar o'chirildi: {message_id}")
-                    return True
+            result = await self._call("deleteMessage", data, priority)
+            if result is None:
+                return False
+            self._forget_content(chat_id, message_id)
+            logger.debug(f"Delete response: {result}")
+
+            if result.get("ok"):
+                logger.info(f"Telegram xabar o'chirildi: {message_id}")
+                return True
+            else:
+                error_desc = result.get('description', '')
+                # Agar xabar topilmasa - bu xato emas, oddiy debug log
+                if "message to delete not found" in error_desc.lower():
+                    logger.debug(f"Telegram xabar {message_id} allaqachon o'chirilgan")
+                    return True  # Bu success deb hisoblaymiz
                 else:
-                    error_desc = result.get('description', '')
-                    # Agar xabar topilmasa - bu xato emas, oddiy debug log
-                    if "message to delete not found" in error_desc.lower():
-                        logger.debug(f"Telegram xabar {message_id} allaqachon o'chirilgan")
-                        return True  # Bu success deb hisoblaymiz
-                    else:
-                        logger.error(f"Telegram o'chirish xatosi: {error_desc}")
-                        return False
+                    logger.error(f"Telegram o'chirish xatosi: {error_desc}")
+                    return False
 
         except Exception as e:
             logger.error(f"Telegram delete xatosi: {e}")
@@ -329,7 +687,8 @@ class TelegramService:
         return await self.send_message(
             text=text,
             chat_id=chat_id,
-            parse_mode="HTML"  # HTML link ishlashi uchun
+            parse_mode="HTML",  # HTML link ishlashi uchun
+            priority=PRIORITY_ALERT
         )
 
     async def update_seller_orders_alert(
@@ -348,7 +707,8 @@ class TelegramService:
             message_id=message_id,
             text=text,
             chat_id=chat_id,
-            parse_mode="HTML"
+            parse_mode="HTML",
+            priority=PRIORITY_ALERT
         )
 
     async def send_all_sellers_alert(
@@ -554,12 +914,12 @@ SOTUVCHI:
     async def send_business_order_message(self, order_data: dict, chat_id: str) -> Optional[int]:
         """Biznes guruhiga bitta buyurtma xabari yuborish"""
         text = self._format_business_order_message(order_data)
-        return await self.send_message(text=text, chat_id=chat_id)
+        return await self.send_message(text=text, chat_id=chat_id, priority=PRIORITY_ALERT)
 
     async def update_business_order_message(self, message_id: int, order_data: dict, chat_id: str) -> bool:
         """Biznes guruhidagi buyurtma xabarini yangilash (status o'zgarganda)"""
         text = self._format_business_order_message(order_data)
-        return await self.edit_message(message_id=message_id, text=text, chat_id=chat_id)
+        return await self.edit_message(message_id=message_id, text=text, chat_id=chat_id, priority=PRIORITY_ALERT)
 
     def _format_all_sellers_alert(self, sellers_data: dict, call_attempts: int = 0) -> str:
         """
@@ -688,7 +1048,7 @@ SOTUVCHI:
 ⏰ Vaqt: {now}
             """
 
-        return await self.send_message(text=text, chat_id=chat_id)
+        return await self.send_message(text=text, chat_id=chat_id, priority=PRIORITY_ALERT)
 
     async def update_order_alert(
         self,
@@ -737,7 +1097,8 @@ SOTUVCHI:
             message_id=message_id,
             text=text,
             chat_id=chat_id,
-            reply_markup=reply_markup
+            reply_markup=reply_markup,
+            priority=PRIORITY_ALERT
         )
 
 
@@ -750,8 +1111,9 @@ class TelegramNotificationManager:
     - Dublikatlarni oldini olish
     """
 
-    def __init__(self, telegram_service: TelegramService, data_dir: str = "data"):
+    def __init__(self, telegram_service: TelegramService, data_dir: str = "data", persistence=None):
         self.telegram = telegram_service
+        self._persistence = persistence
         self._active_message_ids: list = []  # Barcha yuborilgan xabarlar
         self._seller_message_ids: dict = {}  # Sotuvchi telefon -> xabar ID mapping
         self._pending_deletions: list = []  # O'chirilmagan xabarlar (retry uchun)
@@ -764,6 +1126,8 @@ class TelegramNotificationManager:
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(exist_ok=True)
         self.messages_file = self.data_dir / "telegram_messages.json"
+        if self._persistence:
+            self._persistence.register("telegram_messages", self.messages_file, self._serialize_messages, indent=2)
         self._load_messages()
 
     def _load_messages(self):
@@ -798,19 +1162,25 @@ class TelegramNotificationManager:
                 self._pending_deletions = []
                 self._combined_message_id = None
 
+    def _serialize_messages(self) -> dict:
+        """Saqlash uchun mustaqil nusxa"""
+        # MUHIM: combined_message_id ni ham saqlash
+        return {
+            "message_ids": list(self._active_message_ids),
+            "seller_message_ids": dict(self._seller_message_ids),
+            "combined_message_id": getattr(self, '_combined_message_id', None),
+            "pending_deletions": list(self._pending_deletions)
+        }
+
     def _save_messages(self):
-        """Xabar ID larni faylga saqlash"""
+        """Xabar ID larni saqlash (fon yozuvchi bo'lsa - faqat belgilash)"""
+        if self._persistence:
+            self._persistence.mark_dirty("telegram_messages")
+            return
         try:
             import json
-            # MUHIM: combined_message_id ni ham saqlash
-            combined_id = getattr(self, '_combined_message_id', None)
             with open(self.messages_file, "w") as f:
-                json.dump({
-                    "message_ids": self._active_message_ids,
-                    "seller_message_ids": self._seller_message_ids,
-                    "combined_message_id": combined_id,
-                    "pending_deletions": self._pending_deletions
-                }, f, indent=2)
+                json.dump(self._serialize_messages(), f, indent=2)
         except Exception as e:
             logger.error(f"Telegram xabar ID lar saqlashda xato: {e}")
 
@@ -991,6 +1361,16 @@ class TelegramStatsHandler:
         self._awaiting_notif_text: Dict[str, int] = {}    # chat_id -> message_id
         self._awaiting_notif_datetime: Dict[str, int] = {}  # chat_id -> message_id
 
+        # Update larni parallel qayta ishlash (bitta chat ichida tartib saqlanadi)
+        self._update_semaphore = asyncio.Semaphore(TELEGRAM_UPDATE_CONCURRENCY)
+        self._chat_queues: Dict[str, deque] = {}          # chat_id -> navbatdagi update lar
+        self._chat_workers: Dict[str, asyncio.Task] = {}  # chat_id -> navbatni bajaruvchi task
+        # Handler kechikishlari: label -> {count, total, max}
+        self._handler_latency: Dict[str, dict] = {}
+
+        # Inline tugmalar marshrutlari
+        self._callback_router = self._build_callback_router()
+
     def set_stats_service(self, stats_service):
         """Stats servisini sozlash"""
         self.stats_service = stats_service
@@ -1204,26 +1584,10 @@ class TelegramStatsHandler:
         """Telefon raqam bo'yicha biznesni topish"""
         if not self.nonbor_service:
             return None
-        businesses = await self.nonbor_service.get_businesses()
-        if not businesses:
-            return None
-
-        # Raqamni normalizatsiya qilish
-        normalized = phone.replace(" ", "").replace("-", "").replace("(", "").replace(")", "")
-        if normalized.startswith("+"):
-            without_plus = normalized[1:]
-        else:
-            without_plus = normalized
-            normalized = "+" + normalized
-
-        for biz in businesses:
-            biz_phone = (biz.get("phone_number") or "").replace(" ", "").replace("-", "")
-            if not biz_phone:
-                continue
-            biz_without_plus = biz_phone.lstrip("+")
-            if without_plus == biz_without_plus:
-                return biz
-        return None
+        # Katalog telefon indeksi - raqam normallashtirilgan holda saqlanadi
+        catalog = self.nonbor_service.businesses
+        await catalog.ensure_fresh()
+        return catalog.get_by_phone(phone)
 
     async def _start_auth_flow(self, chat_id: str):
         """Auth jarayonini boshlash"""
@@ -1418,15 +1782,22 @@ class TelegramStatsHandler:
                 await self._polling_task
             except asyncio.CancelledError:
                 pass
+        workers = list(self._chat_workers.values())
+        for task in workers:
+            task.cancel()
+        if workers:
+            await asyncio.gather(*workers, return_exceptions=True)
+        self._chat_workers.clear()
+        self._chat_queues.clear()
         logger.info("Telegram stats polling to'xtatildi")
 
     async def _poll_updates(self):
-        """Updates polling"""
+        """Updates polling - har bir update fon da, chat bo'yicha navbat bilan qayta ishlanadi"""
         while self._running:
             try:
                 updates = await self._get_updates()
                 for update in updates:
-                    await self._handle_update(update)
+                    self._dispatch_update(update)
                 await asyncio.sleep(1)
             except asyncio.CancelledError:
                 break
@@ -1460,6 +1831,86 @@ class TelegramStatsHandler:
 
         return []
 
+    @staticmethod
+    def _update_chat_id(update: dict) -> str:
+        """Update qaysi chatga tegishli (tartib kaliti)"""
+        message = update.get("message")
+        if message:
+            return str(message.get("chat", {}).get("id", ""))
+        callback_query = update.get("callback_query") or {}
+        chat = (callback_query.get("message") or {}).get("chat") or callback_query.get("from") or {}
+        return str(chat.get("id", ""))
+
+    def _update_label(self, update: dict) -> str:
+        """Kechikish metrikasi uchun handler nomi"""
+        message = update.get("message")
+        if message:
+            text = message.get("text", "") or ""
+            if text.startswith("/"):
+                return "message:" + text.split()[0].split("@")[0]
+            return "message:text"
+        data = (update.get("callback_query") or {}).get("data", "") or ""
+        return "callback:" + (self._callback_router.match_key(data) or "other")
+
+    def _dispatch_update(self, update: dict):
+        """Update ni chat navbatiga qo'yish (chat uchun bajaruvchi yo'q bo'lsa - yaratish)"""
+        chat_id = self._update_chat_id(update)
+        queue = self._chat_queues.get(chat_id)
+        if queue is None:
+            queue = self._chat_queues[chat_id] = deque()
+        queue.append(update)
+        if chat_id not in self._chat_workers:
+            self._chat_workers[chat_id] = asyncio.create_task(self._drain_chat(chat_id))
+
+    async def _drain_chat(self, chat_id: str):
+        """Bitta chat update larini kelish tartibida bajarish"""
+        queue = self._chat_queues[chat_id]
+        try:
+            while queue:
+                update = queue.popleft()
+                async with self._update_semaphore:
+                    await self._run_update(update)
+        finally:
+            self._chat_workers.pop(chat_id, None)
+            if not queue:
+                self._chat_queues.pop(chat_id, None)
+
+    async def _run_update(self, update: dict):
+        """Update ni bajarish va kechikishni qayd etish"""
+        label = self._update_label(update)
+        started = time.perf_counter()
+        try:
+            await self._handle_update(update)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Update qayta ishlash xatosi ({label}): {e}")
+        finally:
+            elapsed = time.perf_counter() - started
+            stats = self._handler_latency.get(label)
+            if stats is None:
+                stats = self._handler_latency[label] = {"count": 0, "total": 0.0, "max": 0.0}
+            stats["count"] += 1
+            stats["total"] += elapsed
+            stats["max"] = max(stats["max"], elapsed)
+            if elapsed >= TELEGRAM_SLOW_HANDLER:
+                logger.warning(f"Sekin handler: {label} - {elapsed:.2f}s")
+
+    def get_handler_stats(self) -> dict:
+        """Handler kechikishlari va navbat holati"""
+        return {
+            "active_chats": len(self._chat_workers),
+            "queued": sum(len(q) for q in self._chat_queues.values()),
+            "handlers": {
+                label: {
+                    "count": stats["count"],
+                    "avg_ms": round(stats["total"] / stats["count"] * 1000, 1),
+                    "max_ms": round(stats["max"] * 1000, 1),
+                }
+                for label, stats in sorted(self._handler_latency.items())
+            },
+        }
+
     async def _handle_update(self, update: dict):
         """Update ni qayta ishlash"""
         # Text xabarlar (auth bilan)
@@ -1571,313 +2022,237 @@ class TelegramStatsHandler:
             return
 
         # Admin bo'lmagan foydalanuvchilar faqat ruxsat berilgan tugmalarni bosa oladi
+        role = ROLE_ADMIN if self._is_admin(chat_id) else ROLE_OWNER
+        match = self._callback_router.resolve(data, role)
+        if match is None:
+            # Boshqa barcha tugmalar bloklangan / noma'lum
+            return
+        route, args = match
+        await route.handler(message_id, chat_id, *args)
+
+    def _build_callback_router(self) -> CallbackRouter:
+        """Inline tugmalar marshrutlari (kalit/prefiks -> handler, parametr turlari, rollar)"""
+        router = CallbackRouter()
+        admin = {ROLE_ADMIN}
+        owner = {ROLE_OWNER}
+
+        # --- Biznes egasi va admin uchun umumiy ---
+        router.exact(CALLBACK_OWNER_ORDERS, self._cb_owner_orders)
+        router.exact(CALLBACK_OWNER_BACK, self._update_business_owner_message)
+        router.exact(CALLBACK_OWNER_PLANNED, self._show_owner_planned_orders)
+        router.prefix(CALLBACK_OWNER_PLANNED_PAGE, self._cb_owner_planned_page, params=(int,))
+        router.prefix(CALLBACK_OWNER_MAIN_PERIOD, self._cb_owner_main_period, params=(str,))
+        router.exact(CALLBACK_OWNER_GROUP, self._show_owner_group)
+        # Admin darhol o'chiradi, biznes egasidan tasdiqlash so'raladi
+        router.exact(CALLBACK_OWNER_GROUP_DEL, self._delete_owner_group, roles=admin)
+        router.exact(CALLBACK_OWNER_GROUP_DEL, self._confirm_delete_owner_group, roles=owner)
+        router.exact(CALLBACK_OWNER_GROUP_DEL_CONFIRM, self._delete_owner_group)
+        router.prefix(CALLBACK_OWNER_PERIOD, self._cb_owner_period, params=(str,))
+        router.prefix(CALLBACK_OWNER_PAGE, self._cb_owner_page, params=(int,))
+        router.prefix(CALLBACK_OWNER_STATUS, self._cb_owner_status, params=(str,))
+        router.prefix(CALLBACK_BIZ_ITEM, self._show_business_detail, params=(int,))
+        router.prefix(CALLBACK_BIZ_ADD_GROUP, self._cb_biz_add_group, params=(int,))
+        # Orqaga: admin - ro'yxat/menyu, biznes egasi - o'z biznesi
+        router.exact(CALLBACK_BIZ_BACK, self._show_businesses, roles=admin)
+        router.exact(CALLBACK_MENU_BACK, self._show_main_stats, roles=admin)
+        router.exact(CALLBACK_BIZ_BACK, self._cb_owner_business_detail, roles=owner)
+        router.exact(CALLBACK_MENU_BACK, self._cb_owner_business_detail, roles=owner)
+
+        # --- Faqat admin: statistika va qo'ng'iroqlar ---
+        router.exact(CALLBACK_BACK, self._show_main_stats, roles=admin)
+        router.exact(CALLBACK_CALLS_BACK, self._show_all_calls, roles=admin)
+        router.exact(CALLBACK_MENU_CALLS, self._show_all_calls, roles=admin)
+        for callback, attempts in ((CALLBACK_CALLS_1, 1), (CALLBACK_CALLS_2, 2), (CALLBACK_CALLS_3, 3)):
+            router.exact(callback, partial(self._cb_calls_list, attempts=attempts), roles=admin)
+        router.exact(CALLBACK_ANSWERED, self._show_answered_calls, roles=admin)
+        router.exact(CALLBACK_UNANSWERED, self._show_unanswered_calls, roles=admin)
+        for callback, period in ((CALLBACK_DAILY, "daily"), (CALLBACK_WEEKLY, "weekly"),
+                                 (CALLBACK_MONTHLY, "monthly"), (CALLBACK_YEARLY, "yearly")):
+            router.exact(callback, partial(self._cb_set_period, period=period), roles=admin)
+
+        # --- Admin buyurtmalar ---
+        router.exact(CALLBACK_MENU_ORDERS, self._cb_admin_orders_menu, roles=admin)
+        for callback, status in ((CALLBACK_ACCEPTED, "accepted"), (CALLBACK_REJECTED, "rejected"),
+                                 (CALLBACK_NO_TELEGRAM, "notg")):
+            router.exact(callback, partial(self._cb_admin_orders_status, status=status), roles=admin)
+        router.prefix(CALLBACK_ADMIN_ORDERS_PAGE, self._cb_admin_orders_page, params=(int,), roles=admin)
+        router.prefix(CALLBACK_ADMIN_ORDERS_STATUS, self._cb_admin_orders_status, params=(str,), roles=admin)
+        router.prefix(CALLBACK_ADMIN_ORDERS_PERIOD, self._cb_admin_orders_period, params=(str,), roles=admin)
+        router.exact(CALLBACK_MENU_PLANNED, self._show_planned_orders, roles=admin)
+        router.prefix(CALLBACK_PLANNED_PAGE, self._cb_planned_page, params=(int,), roles=admin)
+
+        # --- Admin bizneslar ---
+        router.exact(CALLBACK_MENU_BUSINESSES, self._show_businesses, roles=admin)
+        router.exact(CALLBACK_BIZ_REFRESH, self._cb_biz_refresh, roles=admin)
+        router.prefix(CALLBACK_BIZ_PAGE, self._cb_biz_page, params=(int,), roles=admin)
+        router.prefix(CALLBACK_BIZ_REGION, self._show_region_districts, params=(int,), roles=admin)
+        router.prefix(CALLBACK_BIZ_REG_PAGE, self._cb_biz_region_page, params=(int, int), roles=admin)
+        router.prefix(CALLBACK_BIZ_DISTRICT, self._show_district_businesses, params=(int, int), roles=admin)
+        router.prefix(CALLBACK_BIZ_DIST_BACK, self._show_region_districts, params=(int,), roles=admin)
+        router.prefix(CALLBACK_BIZ_TOGGLE_CALL, self._cb_biz_toggle_call, params=(int,), roles=admin)
+
+        # --- Admin xabarnomalar ---
+        router.exact(CALLBACK_MENU_NOTIF, self._show_notif_menu, roles=admin)
+        router.exact(CALLBACK_NOTIF_BACK, self._show_notif_menu, roles=admin)
+        router.exact(CALLBACK_NOTIF_NEW, self._show_notif_target_type, roles=admin)
+        router.exact(CALLBACK_NOTIF_LIST, self._show_notif_list, roles=admin)
+        router.exact(CALLBACK_NOTIF_TARGET_REGION, self._show_notif_regions, roles=admin)
+        router.exact(CALLBACK_NOTIF_TARGET_DISTRICT, partial(self._show_notif_regions, for_district=True), roles=admin)
+        router.exact(CALLBACK_NOTIF_TARGET_BIZ, self._cb_notif_target_biz, roles=admin)
+        router.prefix(CALLBACK_NOTIF_SEL_REGION, self._handle_notif_region_select, params=(str,), roles=admin)
+        router.prefix(CALLBACK_NOTIF_SEL_DISTRICT, self._handle_notif_district_select, params=(int, int), roles=admin)
+        router.prefix(CALLBACK_NOTIF_SEL_BIZ_PAGE, self._cb_notif_biz_page, params=(int,), roles=admin)
+        router.exact(CALLBACK_NOTIF_DONE_BIZ, self._cb_notif_done_biz, roles=admin)
+        router.prefix(CALLBACK_NOTIF_SEL_BIZ, self._handle_notif_biz_toggle, params=(int,), roles=admin)
+        router.exact(CALLBACK_NOTIF_CONFIRM, self._save_notif_draft, roles=admin)
+        router.exact(CALLBACK_NOTIF_CANCEL, self._cb_notif_cancel, roles=admin)
+        router.prefix(CALLBACK_NOTIF_DELETE_CONFIRM, self._delete_notification, params=(str,), roles=admin)
+        router.prefix(CALLBACK_NOTIF_DELETE, self._confirm_delete_notification, params=(str,), roles=admin)
+        router.prefix(CALLBACK_NOTIF_PAGE, self._cb_notif_list_page, params=(int,), roles=admin)
+        # ncmin_ va ncm_ - eng uzun prefiks tanlanadi, tartib muhim emas
+        router.prefix(CALLBACK_NOTIF_CAL_MIN, self._handle_notif_min_select, params=(int,), roles=admin)
+        router.prefix(CALLBACK_NOTIF_CAL_MONTH, self._show_notif_calendar, params=(int, int), roles=admin)
+        router.prefix(CALLBACK_NOTIF_CAL_DAY, self._handle_notif_day_select, params=(int, int, int), roles=admin)
+        router.prefix(CALLBACK_NOTIF_CAL_HOUR, self._handle_notif_hour_select, params=(int,), roles=admin)
+
+        return router
+
+    # --- Callback handlerlar (message_id, chat_id, *parametrlar) ---
+
+    async def _cb_owner_orders(self, message_id: int, chat_id: str):
+        """Buyurtmalar ro'yxati - state ni reset qilish"""
+        self._owner_orders_period[chat_id] = "daily"
+        self._owner_orders_page[chat_id] = 0
+        self._owner_orders_status[chat_id] = "all"
+        await self._show_owner_orders(message_id, chat_id)
+
+    async def _cb_owner_planned_page(self, message_id: int, chat_id: str, page: int):
+        await self._show_owner_planned_orders(message_id, chat_id, page=page)
+
+    async def _cb_owner_main_period(self, message_id: int, chat_id: str, period: str):
+        """Asosiy sahifada davr o'zgartirish"""
+        await self._update_business_owner_message(message_id, chat_id, period=period)
+
+    async def _cb_owner_period(self, message_id: int, chat_id: str, period: str):
+        """Davr o'zgartirish"""
+        self._owner_orders_page[chat_id] = 0  # Sahifani reset
+        await self._show_owner_orders(message_id, chat_id, period=period)
+
+    async def _cb_owner_page(self, message_id: int, chat_id: str, page: int):
+        await self._show_owner_orders(message_id, chat_id, page=page)
+
+    async def _cb_owner_status(self, message_id: int, chat_id: str, status: str):
+        """Status filter o'zgartirish"""
+        self._owner_orders_page[chat_id] = 0  # Sahifani reset
+        await self._show_owner_orders(message_id, chat_id, status_filter=status)
+
+    async def _cb_owner_business_detail(self, message_id: int, chat_id: str):
+        """Orqaga - biznes egasi uchun o'z biznesi ko'rinishiga qaytarish"""
+        user_data = self._verified_users.get(chat_id, {})
+        biz_id = user_data.get("business_id")
+        if biz_id:
+            await self._show_business_detail(message_id, chat_id, biz_id)
+
+    async def _cb_calls_list(self, message_id: int, chat_id: str, attempts: int):
+        await self._show_calls_list(message_id, chat_id, attempts)
+
+    async def _cb_set_period(self, message_id: int, chat_id: str, period: str):
+        self._current_period = period
+        await self._show_main_stats(message_id, chat_id)
+
+    async def _cb_admin_orders_menu(self, message_id: int, chat_id: str):
+        self._admin_orders_page[chat_id] = 0
+        self._admin_orders_status[chat_id] = "all"
+        await self._show_orders_menu(message_id, chat_id)
+
+    async def _cb_admin_orders_page(self, message_id: int, chat_id: str, page: int):
+        await self._show_orders_menu(message_id, chat_id, page=page)
+
+    async def _cb_admin_orders_status(self, message_id: int, chat_id: str, status: str):
+        self._admin_orders_page[chat_id] = 0  # Sahifani reset
+        await self._show_orders_menu(message_id, chat_id, status_filter=status)
+
+    async def _cb_admin_orders_period(self, message_id: int, chat_id: str, period: str):
+        self._current_period = period
+        self._admin_orders_page[chat_id] = 0
+        await self._show_orders_menu(message_id, chat_id)
+
+    async def _cb_planned_page(self, message_id: int, chat_id: str, page: int):
+        await self._show_planned_orders(message_id, chat_id, page=page)
+
+    async def _cb_biz_refresh(self, message_id: int, chat_id: str):
+        if self.nonbor_service:
+            self.nonbor_service.businesses.invalidate()
+        await self._show_businesses(message_id, chat_id)
+
+    async def _cb_biz_page(self, message_id: int, chat_id: str, page: int):
+        await self._show_businesses(message_id, chat_id, page=page)
+
+    async def _cb_biz_region_page(self, message_id: int, chat_id: str, region_idx: int, page: int):
+        await self._show_region_districts(message_id, chat_id, region_idx, page=page)
+
+    async def _cb_biz_toggle_call(self, message_id: int, chat_id: str, biz_id: int):
+        """Avtoqo'ng'iroqni yoqish/o'chirish"""
+        if biz_id in self._disabled_businesses:
+            self._disabled_businesses.discard(biz_id)
+            logger.info(f"Avtoqo'ng'iroq YOQILDI: business_id={biz_id}")
+        else:
+            self._disabled_businesses.add(biz_id)
+            logger.info(f"Avtoqo'ng'iroq O'CHIRILDI: business_id={biz_id}")
+        self._save_call_settings()
+        await self._show_business_detail(message_id, chat_id, biz_id)
+
+    async def _cb_biz_add_group(self, message_id: int, chat_id: str, biz_id: int):
+        """Biznesga guruh qo'shish - guruh ID sini so'rash"""
+        # Admin bo'lmagan foydalanuvchilar faqat o'z biznesiga guruh qo'sha oladi
         if not self._is_admin(chat_id):
-            if data.startswith(CALLBACK_BIZ_ADD_GROUP):
-                # Guruh qo'shish
-                pass
-            elif data.startswith(CALLBACK_BIZ_ITEM):
-                # Biznes ko'rish
-                pass
-            elif data == CALLBACK_OWNER_ORDERS or data == "owner_orders":
-                # Buyurtmalar ro'yxati - state ni reset qilish
-                self._owner_orders_period[chat_id] = "daily"
-                self._owner_orders_page[chat_id] = 0
-                self._owner_orders_status[chat_id] = "all"
-                await self._show_owner_orders(message_id, chat_id)
-                return
-            elif data == CALLBACK_OWNER_BACK or data == "owner_back":
-                # Asosiy menyuga qaytish
-                await self._update_business_owner_message(message_id, chat_id)
-                return
-            elif data == CALLBACK_OWNER_PLANNED:
-                await self._show_owner_planned_orders(message_id, chat_id)
-                return
-            elif data.startswith(CALLBACK_OWNER_PLANNED_PAGE):
-                try:
-                    page = int(data.replace(CALLBACK_OWNER_PLANNED_PAGE, ""))
-                    await self._show_owner_planned_orders(message_id, chat_id, page=page)
-                except ValueError:
-                    pass
-                return
-            elif data.startswith(CALLBACK_OWNER_MAIN_PERIOD):
-                # Asosiy sahifada davr o'zgartirish
-                period = data.replace(CALLBACK_OWNER_MAIN_PERIOD, "")
-                await self._update_business_owner_message(message_id, chat_id, period=period)
-                return
-            elif data == CALLBACK_OWNER_GROUP:
-                # Guruh boshqaruvi
-                await self._show_owner_group(message_id, chat_id)
-                return
-            elif data == CALLBACK_OWNER_GROUP_DEL:
-                # Guruhni o'chirish - tasdiqlash so'rash
-                await self._confirm_delete_owner_group(message_id, chat_id)
-                return
-            elif data == CALLBACK_OWNER_GROUP_DEL_CONFIRM:
-                # Guruhni o'chirish tasdiqlandi
-                await self._delete_owner_group(message_id, chat_id)
-                return
-            elif data.startswith(CALLBACK_OWNER_PERIOD):
-                # Davr o'zgartirish
-                period = data.replace(CALLBACK_OWNER_PERIOD, "")
-                self._owner_orders_page[chat_id] = 0  # Sahifani reset
-                await self._show_owner_orders(message_id, chat_id, period=period)
-                return
-            elif data.startswith(CALLBACK_OWNER_PAGE):
-                # Sahifa o'zgartirish
-                try:
-                    page = int(data.replace(CALLBACK_OWNER_PAGE, ""))
-                    await self._show_owner_orders(message_id, chat_id, page=page)
-                except ValueError:
-                    pass
-                return
-            elif data.startswith(CALLBACK_OWNER_STATUS):
-                # Status filter o'zgartirish
-                status = data.replace(CALLBACK_OWNER_STATUS, "")
-                self._owner_orders_page[chat_id] = 0  # Sahifani reset
-                await self._show_owner_orders(message_id, chat_id, status_filter=status)
-                return
-            elif data == CALLBACK_BIZ_BACK or data == CALLBACK_MENU_BACK:
-                # Orqaga - oddiy ko'rinishga qaytarish
-                user_data = self._verified_users.get(chat_id, {})
-                biz_id = user_data.get("business_id")
-                if biz_id:
-                    await self._show_business_detail(message_id, chat_id, biz_id)
-                return
-            else:
-                # Boshqa barcha tugmalar bloklangan
+            user_biz_id = self._get_user_business_id(chat_id)
+            if user_biz_id != biz_id:
+                await self.telegram.edit_message(
+                    message_id=message_id,
+                    text="🚫 Bu biznesga guruh qo'shishga ruxsat yo'q",
+                    chat_id=chat_id,
+                    parse_mode="HTML",
+                    reply_markup={"inline_keyboard": [[{"text": "◀️ Orqaga", "callback_data": CALLBACK_MENU_BACK}]]}
+                )
                 return
+        self._awaiting_group_input[chat_id] = biz_id
+        self._awaiting_message_id[chat_id] = message_id
+        # Bekor qilish - admin uchun biznes detailga, owner uchun guruh viewga
+        cancel_callback = f"{CALLBACK_BIZ_ITEM}{biz_id}" if self._is_admin(chat_id) else CALLBACK_OWNER_GROUP
+        await self.telegram.edit_message(
+            message_id=message_id,
+            text="📝 <b>Guruh ID sini yuboring:</b>\n\nMasalan: <code>-1001234567890</code>",
+            chat_id=chat_id,
+            parse_mode="HTML",
+            reply_markup={"inline_keyboard": [[
+                {"text": "❌ Bekor qilish", "callback_data": cancel_callback}
+            ]]}
+        )
 
-        if data == CALLBACK_BACK:
-            await self._show_main_stats(message_id, chat_id)
-        elif data == CALLBACK_CALLS_BACK:
-            await self._show_all_calls(message_id, chat_id)
-        elif data == CALLBACK_CALLS_1:
-            await self._show_calls_list(message_id, chat_id, 1)
-        elif data == CALLBACK_CALLS_2:
-            await self._show_calls_list(message_id, chat_id, 2)
-        elif data == CALLBACK_CALLS_3:
-            await self._show_calls_list(message_id, chat_id, 3)
-        elif data == CALLBACK_ANSWERED:
-            await self._show_answered_calls(message_id, chat_id)
-        elif data == CALLBACK_UNANSWERED:
-            await self._show_unanswered_calls(message_id, chat_id)
-        elif data == CALLBACK_ACCEPTED:
-            self._admin_orders_page[chat_id] = 0
-            await self._show_orders_menu(message_id, chat_id, status_filter="accepted")
-        elif data == CALLBACK_REJECTED:
-            self._admin_orders_page[chat_id] = 0
-            await self._show_orders_menu(message_id, chat_id, status_filter="rejected")
-        elif data == CALLBACK_NO_TELEGRAM:
-            self._admin_orders_page[chat_id] = 0
-            await self._show_orders_menu(message_id, chat_id, status_filter="notg")
-        # Davr tugmalari
-        elif data == CALLBACK_DAILY:
-            self._current_period = "daily"
-            await self._show_main_stats(message_id, chat_id)
-        elif data == CALLBACK_WEEKLY:
-            self._current_period = "weekly"
-            await self._show_main_stats(message_id, chat_id)
-        elif data == CALLBACK_MONTHLY:
-            self._current_period = "monthly"
-            await self._show_main_stats(message_id, chat_id)
-        elif data == CALLBACK_YEARLY:
-            self._current_period = "yearly"
-            await self._show_main_stats(message_id, chat_id)
-        # Menu tugmalari
-        elif data == CALLBACK_MENU_BUSINESSES or data == CALLBACK_BIZ_REFRESH:
-            await self._show_businesses(message_id, chat_id)
-        elif data == CALLBACK_MENU_CALLS:
-            await self._show_all_calls(message_id, chat_id)
-        elif data == CALLBACK_MENU_ORDERS:
-            self._admin_orders_page[chat_id] = 0
-            self._admin_orders_status[chat_id] = "all"
-            await self._show_orders_menu(message_id, chat_id)
-        elif data == CALLBACK_MENU_BACK:
-            await self._show_main_stats(message_id, chat_id)
-        # Reja buyurtmalar
-        elif data == CALLBACK_MENU_PLANNED:
-            await self._show_planned_orders(message_id, chat_id)
-        elif data.startswith(CALLBACK_PLANNED_PAGE):
-            page = int(data.replace(CALLBACK_PLANNED_PAGE, ""))
-            await self._show_planned_orders(message_id, chat_id, page=page)
-        # Xabarnomalar
-        elif data == CALLBACK_MENU_NOTIF:
-            await self._show_notif_menu(message_id, chat_id)
-        elif data == CALLBACK_NOTIF_NEW:
-            await self._show_notif_target_type(message_id, chat_id)
-        elif data == CALLBACK_NOTIF_LIST:
-            await self._show_notif_list(message_id, chat_id)
-        elif data == CALLBACK_NOTIF_BACK:
-            await self._show_notif_menu(message_id, chat_id)
-        elif data == CALLBACK_NOTIF_TARGET_REGION:
-            await self._show_notif_regions(message_id, chat_id)
-        elif data == CALLBACK_NOTIF_TARGET_DISTRICT:
-            await self._show_notif_regions(message_id, chat_id, for_district=True)
-        elif data == CALLBACK_NOTIF_TARGET_BIZ:
-            self._notif_draft[chat_id] = {"target_type": "businesses", "target_ids": [], "target_names": []}
-            self._save_notif_drafts()
-            await self._show_notif_biz_select(message_id, chat_id)
-        elif data.startswith(CALLBACK_NOTIF_SEL_REGION):
-            region_val = data.replace(CALLBACK_NOTIF_SEL_REGION, "")
-            await self._handle_notif_region_select(message_id, chat_id, region_val)
-        elif data.startswith(CALLBACK_NOTIF_SEL_DISTRICT):
-            parts = data.replace(CALLBACK_NOTIF_SEL_DISTRICT, "").split("_")
-            region_idx, district_idx = int(parts[0]), int(parts[1])
-            await self._handle_notif_district_select(message_id, chat_id, region_idx, district_idx)
-        elif data.startswith(CALLBACK_NOTIF_SEL_BIZ_PAGE):
-            page = int(data.replace(CALLBACK_NOTIF_SEL_BIZ_PAGE, ""))
-            await self._show_notif_biz_select(message_id, chat_id, page=page)
-        elif data == CALLBACK_NOTIF_DONE_BIZ:
-            draft = self._notif_draft.get(chat_id, {})
-            if not draft.get("target_ids"):
-                # Kamida bitta biznes tanlash kerak - xabar ko'rsatish
-                await self._show_notif_biz_select(message_id, chat_id, warning="❗ Kamida bitta biznes tanlang!")
-                return
-            await self._ask_notif_text(message_id, chat_id)
-        elif data.startswith(CALLBACK_NOTIF_SEL_BIZ):
-            biz_id = int(data.replace(CALLBACK_NOTIF_SEL_BIZ, ""))
-            await self._handle_notif_biz_toggle(message_id, chat_id, biz_id)
-        elif data == CALLBACK_NOTIF_CONFIRM:
-            await self._save_notif_draft(message_id, chat_id)
-        elif data == CALLBACK_NOTIF_CANCEL:
-            self._notif_draft.pop(chat_id, None)
-            self._save_notif_drafts()
-            await self._show_notif_menu(message_id, chat_id)
-        elif data.startswith(CALLBACK_NOTIF_DELETE_CONFIRM):
-            notif_id = data.replace(CALLBACK_NOTIF_DELETE_CONFIRM, "")
-            await self._delete_notification(message_id, chat_id, notif_id)
-        elif data.startswith(CALLBACK_NOTIF_DELETE):
-            notif_id = data.replace(CALLBACK_NOTIF_DELETE, "")
-            await self._confirm_delete_notification(message_id, chat_id, notif_id)
-        elif data.startswith(CALLBACK_NOTIF_PAGE):
-            page = int(data.replace(CALLBACK_NOTIF_PAGE, ""))
-            await self._show_notif_list(message_id, chat_id, page=page)
-        elif data.startswith(CALLBACK_NOTIF_CAL_MIN):
-            # MUHIM: ncmin_ tekshiruvi ncm_ dan OLDIN bo'lishi kerak (prefiks to'qnashuvi)
-            minute = int(data.replace(CALLBACK_NOTIF_CAL_MIN, ""))
-            await self._handle_notif_min_select(message_id, chat_id, minute)
-        elif data.startswith(CALLBACK_NOTIF_CAL_MONTH):
-            parts = data.replace(CALLBACK_NOTIF_CAL_MONTH, "").split("_")
-            year, month = int(parts[0]), int(parts[1])
-            await self._show_notif_calendar(message_id, chat_id, year, month)
-        elif data.startswith(CALLBACK_NOTIF_CAL_DAY):
-            parts = data.replace(CALLBACK_NOTIF_CAL_DAY, "").split("_")
-            year, month, day = int(parts[0]), int(parts[1]), int(parts[2])
-            await self._handle_notif_day_select(message_id, chat_id, year, month, day)
-        elif data.startswith(CALLBACK_NOTIF_CAL_HOUR):
-            hour = int(data.replace(CALLBACK_NOTIF_CAL_HOUR, ""))
-            await self._handle_notif_hour_select(message_id, chat_id, hour)
-        # Admin orders pagination va status filter
-        elif data.startswith(CALLBACK_ADMIN_ORDERS_PAGE):
-            try:
-                page = int(data.replace(CALLBACK_ADMIN_ORDERS_PAGE, ""))
-                await self._show_orders_menu(message_id, chat_id, page=page)
-            except ValueError:
-                pass
-        elif data.startswith(CALLBACK_ADMIN_ORDERS_STATUS):
-            status = data.replace(CALLBACK_ADMIN_ORDERS_STATUS, "")
-            self._admin_orders_page[chat_id] = 0  # Sahifani reset
-            await self._show_orders_menu(message_id, chat_id, status_filter=status)
-        elif data.startswith(CALLBACK_ADMIN_ORDERS_PERIOD):
-            period = data.replace(CALLBACK_ADMIN_ORDERS_PERIOD, "")
-            self._current_period = period
-            self._admin_orders_page[chat_id] = 0
-            await self._show_orders_menu(message_id, chat_id)
-        # Bizneslar pagination va region
-        elif data.startswith(CALLBACK_BIZ_PAGE):
-            page = int(data.replace(CALLBACK_BIZ_PAGE, ""))
-            await self._show_businesses(message_id, chat_id, page=page)
-        elif data.startswith(CALLBACK_BIZ_REGION):
-            region_idx = int(data.replace(CALLBACK_BIZ_REGION, ""))
-            await self._show_region_districts(message_id, chat_id, region_idx)
-        elif data.startswith(CALLBACK_BIZ_REG_PAGE):
-            parts = data.replace(CALLBACK_BIZ_REG_PAGE, "").split("_")
-            region_idx, page = int(parts[0]), int(parts[1])
-            await self._show_region_districts(message_id, chat_id, region_idx, page=page)
-        elif data.startswith(CALLBACK_BIZ_DISTRICT):
-            parts = data.replace(CALLBACK_BIZ_DISTRICT, "").split("_")
-            region_idx, district_idx = int(parts[0]), int(parts[1])
-            await self._show_district_businesses(message_id, chat_id, region_idx, district_idx)
-        elif data.startswith(CALLBACK_BIZ_DIST_BACK):
-            region_idx = int(data.replace(CALLBACK_BIZ_DIST_BACK, ""))
-            await self._show_region_districts(message_id, chat_id, region_idx)
-        elif data.startswith(CALLBACK_BIZ_ITEM):
-            biz_id = int(data.replace(CALLBACK_BIZ_ITEM, ""))
-            await self._show_business_detail(message_id, chat_id, biz_id)
-        elif data.startswith(CALLBACK_BIZ_TOGGLE_CALL):
-            biz_id = int(data.replace(CALLBACK_BIZ_TOGGLE_CALL, ""))
-            if not self._is_admin(chat_id):
-                return
-            # Toggle
-            if biz_id in self._disabled_businesses:
-                self._disabled_businesses.discard(biz_id)
-                logger.info(f"Avtoqo'ng'iroq YOQILDI: business_id={biz_id}")
-            else:
-                self._disabled_businesses.add(biz_id)
-                logger.info(f"Avtoqo'ng'iroq O'CHIRILDI: business_id={biz_id}")
-            self._save_call_settings()
-            await self._show_business_detail(message_id, chat_id, biz_id)
-        elif data.startswith(CALLBACK_BIZ_ADD_GROUP):
-            biz_id = int(data.replace(CALLBACK_BIZ_ADD_GROUP, ""))
-            # Admin bo'lmagan foydalanuvchilar faqat o'z biznesiga guruh qo'sha oladi
-            if not self._is_admin(chat_id):
-                user_biz_id = self._get_user_business_id(chat_id)
-                if user_biz_id != biz_id:
-                    await self.telegram.edit_message(
-                        message_id=message_id,
-                        text="🚫 Bu biznesga guruh qo'shishga ruxsat yo'q",
-                        chat_id=chat_id,
-                        parse_mode="HTML",
-                        reply_markup={"inline_keyboard": [[{"text": "◀️ Orqaga", "callback_data": CALLBACK_MENU_BACK}]]}
-                    )
-                    return
-            self._awaiting_group_input[chat_id] = biz_id
-            self._awaiting_message_id[chat_id] = message_id
-            # Bekor qilish - admin uchun biznes detailga, owner uchun guruh viewga
-            cancel_callback = f"{CALLBACK_BIZ_ITEM}{biz_id}" if self._is_admin(chat_id) else CALLBACK_OWNER_GROUP
-            await self.telegram.edit_message(
-                message_id=message_id,
-                text="📝 <b>Guruh ID sini yuboring:</b>\n\nMasalan: <code>-1001234567890</code>",
-                chat_id=chat_id,
-                parse_mode="HTML",
-                reply_markup={"inline_keyboard": [[
-                    {"text": "❌ Bekor qilish", "callback_data": cancel_callback}
-                ]]}
-            )
-        elif data == CALLBACK_BIZ_BACK:
-            await self._show_businesses(message_id, chat_id)
-        elif data == CALLBACK_OWNER_ORDERS or data == "owner_orders":
-            # Buyurtmalar ro'yxati - state ni reset qilish
-            self._owner_orders_period[chat_id] = "daily"
-            self._owner_orders_page[chat_id] = 0
-            self._owner_orders_status[chat_id] = "all"
-            await self._show_owner_orders(message_id, chat_id)
-        elif data == CALLBACK_OWNER_BACK or data == "owner_back":
-            await self._update_business_owner_message(message_id, chat_id)
-        elif data.startswith(CALLBACK_OWNER_MAIN_PERIOD):
-            period = data.replace(CALLBACK_OWNER_MAIN_PERIOD, "")
-            await self._update_business_owner_message(message_id, chat_id, period=period)
-        elif data == CALLBACK_OWNER_GROUP:
-            await self._show_owner_group(message_id, chat_id)
-        elif data == CALLBACK_OWNER_GROUP_DEL:
-            await self._delete_owner_group(message_id, chat_id)
-        elif data.startswith(CALLBACK_OWNER_PERIOD):
-            # Davr o'zgartirish
-            period = data.replace(CALLBACK_OWNER_PERIOD, "")
-            self._owner_orders_page[chat_id] = 0  # Sahifani reset
-            await self._show_owner_orders(message_id, chat_id, period=period)
-        elif data.startswith(CALLBACK_OWNER_PAGE):
-            # Sahifa o'zgartirish
-            try:
-                page = int(data.replace(CALLBACK_OWNER_PAGE, ""))
-                await self._show_owner_orders(message_id, chat_id, page=page)
-            except ValueError:
-                pass
-        elif data.startswith(CALLBACK_OWNER_STATUS):
-            # Status filter o'zgartirish
-            status = data.replace(CALLBACK_OWNER_STATUS, "")
-            self._owner_orders_page[chat_id] = 0  # Sahifani reset
-            await self._show_owner_orders(message_id, chat_id, status_filter=status)
+    async def _cb_notif_target_biz(self, message_id: int, chat_id: str):
+        self._notif_draft[chat_id] = {"target_type": "businesses", "target_ids": [], "target_names": []}
+        self._save_notif_drafts()
+        await self._show_notif_biz_select(message_id, chat_id)
+
+    async def _cb_notif_biz_page(self, message_id: int, chat_id: str, page: int):
+        await self._show_notif_biz_select(message_id, chat_id, page=page)
+
+    async def _cb_notif_done_biz(self, message_id: int, chat_id: str):
+        draft = self._notif_draft.get(chat_id, {})
+        if not draft.get("target_ids"):
+            # Kamida bitta biznes tanlash kerak - xabar ko'rsatish
+            await self._show_notif_biz_select(message_id, chat_id, warning="❗ Kamida bitta biznes tanlang!")
+            return
+        await self._ask_notif_text(message_id, chat_id)
+
+    async def _cb_notif_cancel(self, message_id: int, chat_id: str):
+        self._notif_draft.pop(chat_id, None)
+        self._save_notif_drafts()
+        await self._show_notif_menu(message_id, chat_id)
+
+    async def _cb_notif_list_page(self, message_id: int, chat_id: str, page: int):
+        await self._show_notif_list(message_id, chat_id, page=page)
 
     async def _answer_callback(self, callback_id: str):
         """Callback query javob"""
@@ -2698,13 +3073,8 @@ class TelegramStatsHandler:
                 )
                 return
 
-        # Viloyat bo'yicha guruhlash (cache uchun)
-        regions = {}
-        for biz in businesses:
-            region = biz.get("region_name_uz") or "Noma'lum"
-            if region not in regions:
-                regions[region] = []
-            regions[region].append(biz)
+        # Viloyat bo'yicha guruhlash (katalogda tayyor indeks)
+        regions = self.nonbor_service.businesses.regions()
 
         self._biz_regions = sorted(regions.keys())
         self._biz_regions_data = regions
@@ -2814,13 +3184,8 @@ class TelegramStatsHandler:
         region_name = self._biz_regions[region_idx]
         region_businesses = self._biz_regions_data.get(region_name, [])
 
-        # Tuman bo'yicha guruhlash
-        districts = {}
-        for biz in region_businesses:
-            district = biz.get("district_name_uz") or "Noma'lum"
-            if district not in districts:
-                districts[district] = []
-            districts[district].append(biz)
+        # Tuman bo'yicha guruhlash (katalogda tayyor indeks)
+        districts = self.nonbor_service.businesses.districts(region_name)
 
         # Cache tumanlar
         self._biz_current_districts = sorted(districts.keys())
@@ -3010,20 +3375,11 @@ class TelegramStatsHandler:
                 )
                 return
 
-        # Biznesni topish
+        # Biznesni topish (katalog ID indeksi)
         biz = None
-        if hasattr(self, '_biz_all') and self._biz_all:
-            for b in self._biz_all:
-                if b.get("id") == biz_id:
-                    biz = b
-                    break
-
-        if not biz and self.nonbor_service:
-            businesses = await self.nonbor_service.get_businesses()
-            for b in businesses:
-                if b.get("id") == biz_id:
-                    biz = b
-                    break
+        if self.nonbor_service:
+            await self.nonbor_service.businesses.ensure_fresh()
+            biz = self.nonbor_service.businesses.get(biz_id)
 
         if not biz:
             await self.telegram.edit_message(
@@ -3752,12 +4108,7 @@ Bu buyurtmalar 3 daqiqa ichida (Telegram yuborilmasdan) qabul qilingan."""
             )
             return
 
-        regions = {}
-        for biz in businesses:
-            region = biz.get("region_name_uz") or "Noma'lum"
-            if region not in regions:
-                regions[region] = []
-            regions[region].append(biz)
+        regions = self.nonbor_service.businesses.regions()
 
         self._notif_regions = sorted(regions.keys())
         self._notif_regions_data = regions
@@ -3834,14 +4185,8 @@ Bu buyurtmalar 3 daqiqa ichida (Telegram yuborilmasdan) qabul qilingan."""
             return
 
         region_name = self._notif_regions[region_idx]
-        region_businesses = self._notif_regions_data.get(region_name, [])
 
-        districts = {}
-        for biz in region_businesses:
-            district = biz.get("district_name_uz") or "Noma'lum"
-            if district not in districts:
-                districts[district] = []
-            districts[district].append(biz)
+        districts = self.nonbor_service.businesses.districts(region_name)
 
         self._notif_districts = sorted(districts.keys())
         self._notif_districts_data = districts
@@ -3992,11 +4337,10 @@ Bu buyurtmalar 3 daqiqa ichida (Telegram yuborilmasdan) qabul qilingan."""
         else:
             selected_ids.append(biz_id)
             if self.nonbor_service:
-                businesses = await self.nonbor_service.get_businesses()
-                for b in businesses:
-                    if b.get("id") == biz_id:
-                        selected_names.append(b.get("title", f"#{biz_id}"))
-                        break
+                await self.nonbor_service.businesses.ensure_fresh()
+                b = self.nonbor_service.businesses.get(biz_id)
+                if b:
+                    selected_names.append(b.get("title", f"#{biz_id}"))
 
         draft["target_ids"] = selected_ids
         draft["target_names"] = selected_names
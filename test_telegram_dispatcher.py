@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""TelegramDispatcher test - parallel so'rovlar bir vaqtda tugaganda navbat to'xtab qolmasligi"""
+import asyncio
+import sys
+sys.stdout.reconfigure(encoding='utf-8')
+sys.path.insert(0, 'src')
+
+from services.telegram_service import TelegramDispatcher
+
+
+async def _run_burst(chats: int, max_inflight: int, latency: float) -> dict:
+    async def request(method, data):
+        # Barcha parallel so'rovlar bir tick da tugaydi
+        await asyncio.sleep(latency)
+        return {"ok": True, "result": {}}
+
+    dispatcher = TelegramDispatcher(request, global_rate=1000, chat_rate=100, chat_burst=10, max_inflight=max_inflight)
+    try:
+        await asyncio.wait_for(
+            asyncio.gather(*(
+                dispatcher.submit("sendMessage", {"chat_id": i, "text": f"#{i}"}) for i in range(chats)
+            )),
+            timeout=5
+        )
+        return dispatcher.get_stats()
+    finally:
+        await dispatcher.close()
+
+
+def test_single_inflight_slot():
+    stats = asyncio.run(_run_burst(chats=3, max_inflight=1, latency=0))
+    assert stats["sent"] == 3, stats
+
+
+def test_inflight_complete_same_tick():
+    stats = asyncio.run(_run_burst(chats=30, max_inflight=8, latency=0.01))
+    assert stats["sent"] == 30, stats
+
+
+if __name__ == "__main__":
+    test_single_inflight_slot()
+    test_inflight_complete_same_tick()
+    print("OK")